@@ -3,7 +3,7 @@ Dynamic BI Routes - Rotas para múltiplas collections
 Fleet Copilot Enhanced API
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_cors import cross_origin
 import requests
 import pandas as pd
@@ -11,6 +11,26 @@ import logging
 from datetime import datetime, timedelta
 import os
 
+try:
+    from src.fleet_stream import iter_response_records, record_path_for
+except ImportError:
+    from fleet_stream import iter_response_records, record_path_for
+
+try:
+    from src.fleet_fuel import normalize_supplies, summarize_supplies
+except ImportError:
+    from fleet_fuel import normalize_supplies, summarize_supplies
+
+try:
+    from src.fleet_paging import PageRequest, PageError, page_records
+except ImportError:
+    from fleet_paging import PageRequest, PageError, page_records
+
+try:
+    from src.fleet_export import iter_stream, stream_format, STREAM_MIMETYPES
+except ImportError:
+    from fleet_export import iter_stream, stream_format, STREAM_MIMETYPES
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +41,11 @@ dynamic_bi_bp = Blueprint('dynamic_bi', __name__)
 # Configuração da API Firebase
 FIREBASE_API_URL = os.getenv('FIREBASE_API_URL', 'https://firebase-bi-api.onrender.com')
 
+# Collections cujo nome na API é diferente do nome no BI
+UPSTREAM_COLLECTIONS = {
+    'fuel': 'alelo-supply-history'
+}
+
 class DynamicBIProcessor:
     """Processador dinâmico para múltiplas collections"""
     
@@ -30,7 +55,9 @@ class DynamicBIProcessor:
     def fetch_collection_data(self, collection_name: str, enterprise_id: str = None, days: int = 30):
         """Busca dados de qualquer collection"""
         try:
-            url = f"{self.firebase_url}/{collection_name}"
+            upstream_name = UPSTREAM_COLLECTIONS.get(collection_name, collection_name)
+            record_path = record_path_for(f"/{upstream_name}")
+            url = f"{self.firebase_url}/{upstream_name}"
             params = {}
             
             if enterprise_id:
@@ -40,22 +67,24 @@ class DynamicBIProcessor:
                 
             logger.info(f"🔗 Buscando dados de {collection_name}: {url}")
             
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
+            # Leitura em streaming: o corpo da resposta não fica inteiro em memória
+            with requests.get(url, params=params, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                data = list(iter_response_records(response, record_path))
             
-            data = response.json()
             logger.info(f"✅ Recebidos {len(data)} registros de /{collection_name}")
             
             return data
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             logger.error(f"❌ Erro ao buscar {collection_name}: {e}")
             raise Exception(f"Erro na API externa: {str(e)}")
     
-    def process_checklist_data(self, data, enterprise_id: str, days: int):
+    def process_checklist_data(self, data, enterprise_id: str, days: int, page: PageRequest = None,
+                               stream: bool = False):
         """Processa dados de checklist"""
         if not data:
-            return self._empty_checklist_response(enterprise_id, days)
+            return self._empty_checklist_response(enterprise_id, days, page, stream)
             
         df = pd.DataFrame(data)
         
@@ -94,13 +123,14 @@ class DynamicBIProcessor:
             "drivers": drivers,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": data[:50]  # Primeiros 50 registros para tabela
+            **self._table_page(df, page, stream)
         }
     
-    def process_trips_data(self, data, enterprise_id: str, days: int):
+    def process_trips_data(self, data, enterprise_id: str, days: int, page: PageRequest = None,
+                           stream: bool = False):
         """Processa dados de viagens"""
         if not data:
-            return self._empty_trips_response(enterprise_id, days)
+            return self._empty_trips_response(enterprise_id, days, page, stream)
             
         df = pd.DataFrame(data)
         
@@ -125,13 +155,14 @@ class DynamicBIProcessor:
             "vehicles": vehicles,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": data[:50]
+            **self._table_page(df, page, stream)
         }
     
-    def process_alerts_data(self, data, enterprise_id: str, days: int):
+    def process_alerts_data(self, data, enterprise_id: str, days: int, page: PageRequest = None,
+                            stream: bool = False):
         """Processa dados de alertas"""
         if not data:
-            return self._empty_alerts_response(enterprise_id, days)
+            return self._empty_alerts_response(enterprise_id, days, page, stream)
             
         df = pd.DataFrame(data)
         
@@ -156,13 +187,14 @@ class DynamicBIProcessor:
             "avg_resolution_time": avg_resolution_time,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": data[:50]
+            **self._table_page(df, page, stream)
         }
     
-    def process_maintenance_data(self, data, enterprise_id: str, days: int):
+    def process_maintenance_data(self, data, enterprise_id: str, days: int, page: PageRequest = None,
+                                 stream: bool = False):
         """Processa dados de manutenção"""
         if not data:
-            return self._empty_maintenance_response(enterprise_id, days)
+            return self._empty_maintenance_response(enterprise_id, days, page, stream)
             
         df = pd.DataFrame(data)
         
@@ -185,10 +217,75 @@ class DynamicBIProcessor:
             "vehicles": vehicles,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": data[:50]
+            **self._table_page(df, page, stream)
         }
     
-    def _empty_checklist_response(self, enterprise_id: str, days: int):
+    def process_fuel_data(self, data, enterprise_id: str, days: int, page: PageRequest = None,
+                          stream: bool = False):
+        """Processa dados de abastecimento (Alelo)"""
+        if not data:
+            return self._empty_fuel_response(enterprise_id, days, page, stream)
+        
+        df = pd.DataFrame(data)
+        
+        # Filtrar por enterprise_id se especificado
+        if enterprise_id and 'enterpriseId' in df.columns:
+            df = df[df['enterpriseId'] == enterprise_id]
+        
+        # Filtrar por período depois da normalização: o hodômetro dos abastecimentos
+        # anteriores à janela ainda reconstrói os km do primeiro abastecimento dela
+        supplies = normalize_supplies(df)
+        if days:
+            cutoff_date = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)
+            supplies = supplies[supplies['date'] >= cutoff_date].reset_index(drop=True)
+        if supplies.empty:
+            return self._empty_fuel_response(enterprise_id, days, page, stream)
+        
+        summary = summarize_supplies(supplies)
+        
+        return {
+            **summary['metrics'],
+            "anomalies": summary['anomalies'],
+            "period_days": days,
+            "enterprise_id": enterprise_id,
+            **self._table_page(supplies, page, stream)
+        }
+    
+    def _table_page(self, df: pd.DataFrame, page: PageRequest = None, stream: bool = False):
+        """Página da tabela sobre os registros já filtrados (padrão: 50 primeiros, todos os campos)
+
+        Em streaming, raw_data é o próprio frame filtrado (todos os registros),
+        serializado em blocos pela rota.
+        """
+        if stream:
+            return {"raw_data": df}
+        table = page_records(df, page or PageRequest())
+        return {
+            "raw_data": table['items'],
+            "pagination": table['pagination']
+        }
+    
+    def _empty_page(self, page: PageRequest = None, stream: bool = False):
+        """Página vazia com a mesma forma de _table_page (sem próxima página)"""
+        if stream:
+            return {"raw_data": []}
+        page = page or PageRequest()
+        return {
+            "raw_data": [],
+            "pagination": {
+                "limit": page.limit,
+                "sort": page.sort,
+                "order": page.order,
+                "fields": page.fields,
+                "total": 0,
+                "returned": 0,
+                "has_more": False,
+                "next_cursor": None
+            }
+        }
+    
+    def _empty_checklist_response(self, enterprise_id: str, days: int, page: PageRequest = None,
+                                  stream: bool = False):
         """Resposta vazia para checklist"""
         return {
             "total": 0,
@@ -199,10 +296,11 @@ class DynamicBIProcessor:
             "drivers": 0,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": []
+            **self._empty_page(page, stream)
         }
     
-    def _empty_trips_response(self, enterprise_id: str, days: int):
+    def _empty_trips_response(self, enterprise_id: str, days: int, page: PageRequest = None,
+                              stream: bool = False):
         """Resposta vazia para viagens"""
         return {
             "total_trips": 0,
@@ -213,10 +311,11 @@ class DynamicBIProcessor:
             "vehicles": 0,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": []
+            **self._empty_page(page, stream)
         }
     
-    def _empty_alerts_response(self, enterprise_id: str, days: int):
+    def _empty_alerts_response(self, enterprise_id: str, days: int, page: PageRequest = None,
+                               stream: bool = False):
         """Resposta vazia para alertas"""
         return {
             "total_alerts": 0,
@@ -227,10 +326,11 @@ class DynamicBIProcessor:
             "avg_resolution_time": 0,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": []
+            **self._empty_page(page, stream)
         }
     
-    def _empty_maintenance_response(self, enterprise_id: str, days: int):
+    def _empty_maintenance_response(self, enterprise_id: str, days: int, page: PageRequest = None,
+                                    stream: bool = False):
         """Resposta vazia para manutenção"""
         return {
             "total_services": 0,
@@ -240,12 +340,68 @@ class DynamicBIProcessor:
             "vehicles": 0,
             "period_days": days,
             "enterprise_id": enterprise_id,
-            "raw_data": []
+            **self._empty_page(page, stream)
+        }
+
+    def _empty_fuel_response(self, enterprise_id: str, days: int, page: PageRequest = None,
+                             stream: bool = False):
+        """Resposta vazia para combustível"""
+        return {
+            "total_supplies": 0,
+            "total_liters": 0,
+            "total_cost": 0,
+            "avg_price_per_liter": 0,
+            "avg_km_per_liter": 0,
+            "avg_cost_per_km": 0,
+            "total_km": 0,
+            "vehicles": 0,
+            "anomalous_supplies": 0,
+            "anomalies": {},
+            "period_days": days,
+            "enterprise_id": enterprise_id,
+            **self._empty_page(page, stream)
         }
 
 # Instância do processador
 processor = DynamicBIProcessor()
 
+def parse_page_request():
+    """Lê a paginação da tabela (limit, cursor, sort, order, fields); erro 400 se inválida"""
+    try:
+        return PageRequest.from_args(request.args), None
+    except PageError as e:
+        return None, page_error_response(e)
+
+def parse_stream_format():
+    """Lê o modo de streaming (?stream=json|ndjson ou Accept: application/x-ndjson); erro 400 se inválido"""
+    try:
+        return stream_format(request.args, request.headers.get('Accept', '')), None
+    except ValueError as e:
+        return None, (jsonify({
+            'success': False,
+            'message': f'Parâmetro stream inválido: {e}'
+        }), 400)
+
+def collection_response(processed_data, fmt: str = None):
+    """Resposta da collection: JSON inteiro ou, em streaming, raw_data serializado em blocos"""
+    if not fmt:
+        return jsonify({
+            'success': True,
+            'data': processed_data
+        })
+    
+    rows = processed_data.pop('raw_data', [])
+    envelope = {'success': True, 'data': processed_data}
+    return Response(stream_with_context(iter_stream(fmt, rows, envelope, path=('data', 'raw_data'))),
+                    mimetype=STREAM_MIMETYPES[fmt])
+
+def page_error_response(error: PageError):
+    """Resposta 400 para paginação inválida"""
+    return jsonify({
+        'success': False,
+        'message': f'Parâmetros de paginação inválidos: {error}'
+    }), 400
+
 @dynamic_bi_bp.route('/collections', methods=['GET'])
 @cross_origin()
 def get_collections():
@@ -279,6 +435,13 @@ def get_collections():
                 "icon": "fas fa-tools",
                 "color": "#f39c12",
                 "available": True
+            },
+            "fuel": {
+                "name": "Combustível",
+                "description": "Abastecimentos, consumo e custo por veículo",
+                "icon": "fas fa-gas-pump",
+                "color": "#14d8b4",
+                "available": True
             }
         }
         
@@ -298,6 +461,13 @@ def get_collections():
 @cross_origin()
 def get_checklist_data():
     """Dados de checklist"""
+    page, error = parse_page_request()
+    if error:
+        return error
+    fmt, error = parse_stream_format()
+    if error:
+        return error
+    
     try:
         enterprise_id = request.args.get('enterpriseId', 'sA9EmrE3ymtnBqJKcYn7')
         days = int(request.args.get('days', 30))
@@ -306,13 +476,12 @@ def get_checklist_data():
         raw_data = processor.fetch_collection_data('checklist', enterprise_id, days)
         
         # Processar dados
-        processed_data = processor.process_checklist_data(raw_data, enterprise_id, days)
+        processed_data = processor.process_checklist_data(raw_data, enterprise_id, days, page, stream=bool(fmt))
         
-        return jsonify({
-            'success': True,
-            'data': processed_data
-        })
+        return collection_response(processed_data, fmt)
         
+    except PageError as e:
+        return page_error_response(e)
     except Exception as e:
         logger.error(f"❌ Erro ao buscar dados de checklist: {e}")
         return jsonify({
@@ -328,6 +497,13 @@ def get_checklist_data():
 @cross_origin()
 def get_trips_data():
     """Dados de viagens"""
+    page, error = parse_page_request()
+    if error:
+        return error
+    fmt, error = parse_stream_format()
+    if error:
+        return error
+    
     try:
         enterprise_id = request.args.get('enterpriseId', 'sA9EmrE3ymtnBqJKcYn7')
         days = int(request.args.get('days', 30))
@@ -336,13 +512,12 @@ def get_trips_data():
         raw_data = processor.fetch_collection_data('trips', enterprise_id, days)
         
         # Processar dados
-        processed_data = processor.process_trips_data(raw_data, enterprise_id, days)
+        processed_data = processor.process_trips_data(raw_data, enterprise_id, days, page, stream=bool(fmt))
         
-        return jsonify({
-            'success': True,
-            'data': processed_data
-        })
+        return collection_response(processed_data, fmt)
         
+    except PageError as e:
+        return page_error_response(e)
     except Exception as e:
         logger.error(f"❌ Erro ao buscar dados de viagens: {e}")
         return jsonify({
@@ -358,6 +533,13 @@ def get_trips_data():
 @cross_origin()
 def get_alerts_data():
     """Dados de alertas"""
+    page, error = parse_page_request()
+    if error:
+        return error
+    fmt, error = parse_stream_format()
+    if error:
+        return error
+    
     try:
         enterprise_id = request.args.get('enterpriseId', 'sA9EmrE3ymtnBqJKcYn7')
         days = int(request.args.get('days', 30))
@@ -366,13 +548,12 @@ def get_alerts_data():
         raw_data = processor.fetch_collection_data('alerts', enterprise_id, days)
         
         # Processar dados
-        processed_data = processor.process_alerts_data(raw_data, enterprise_id, days)
+        processed_data = processor.process_alerts_data(raw_data, enterprise_id, days, page, stream=bool(fmt))
         
-        return jsonify({
-            'success': True,
-            'data': processed_data
-        })
+        return collection_response(processed_data, fmt)
         
+    except PageError as e:
+        return page_error_response(e)
     except Exception as e:
         logger.error(f"❌ Erro ao buscar dados de alertas: {e}")
         return jsonify({
@@ -388,6 +569,13 @@ def get_alerts_data():
 @cross_origin()
 def get_maintenance_data():
     """Dados de manutenção"""
+    page, error = parse_page_request()
+    if error:
+        return error
+    fmt, error = parse_stream_format()
+    if error:
+        return error
+    
     try:
         enterprise_id = request.args.get('enterpriseId', 'sA9EmrE3ymtnBqJKcYn7')
         days = int(request.args.get('days', 30))
@@ -396,13 +584,12 @@ def get_maintenance_data():
         raw_data = processor.fetch_collection_data('maintenance', enterprise_id, days)
         
         # Processar dados
-        processed_data = processor.process_maintenance_data(raw_data, enterprise_id, days)
+        processed_data = processor.process_maintenance_data(raw_data, enterprise_id, days, page, stream=bool(fmt))
         
-        return jsonify({
-            'success': True,
-            'data': processed_data
-        })
+        return collection_response(processed_data, fmt)
         
+    except PageError as e:
+        return page_error_response(e)
     except Exception as e:
         logger.error(f"❌ Erro ao buscar dados de manutenção: {e}")
         return jsonify({
@@ -419,6 +606,13 @@ def get_maintenance_data():
 @cross_origin()
 def get_dynamic_collection_data(collection_name):
     """Endpoint genérico para qualquer collection"""
+    page, error = parse_page_request()
+    if error:
+        return error
+    fmt, error = parse_stream_format()
+    if error:
+        return error
+    
     try:
         enterprise_id = request.args.get('enterpriseId', 'sA9EmrE3ymtnBqJKcYn7')
         days = int(request.args.get('days', 30))
@@ -428,7 +622,8 @@ def get_dynamic_collection_data(collection_name):
             'checklist': processor.process_checklist_data,
             'trips': processor.process_trips_data,
             'alerts': processor.process_alerts_data,
-            'maintenance': processor.process_maintenance_data
+            'maintenance': processor.process_maintenance_data,
+            'fuel': processor.process_fuel_data
         }
         
         if collection_name not in processors:
@@ -441,13 +636,12 @@ def get_dynamic_collection_data(collection_name):
         raw_data = processor.fetch_collection_data(collection_name, enterprise_id, days)
         
         # Processar dados
-        processed_data = processors[collection_name](raw_data, enterprise_id, days)
+        processed_data = processors[collection_name](raw_data, enterprise_id, days, page, stream=bool(fmt))
         
-        return jsonify({
-            'success': True,
-            'data': processed_data
-        })
+        return collection_response(processed_data, fmt)
         
+    except PageError as e:
+        return page_error_response(e)
     except Exception as e:
         logger.error(f"❌ Erro ao buscar dados de {collection_name}: {e}")
         
@@ -456,7 +650,8 @@ def get_dynamic_collection_data(collection_name):
             'checklist': processor._empty_checklist_response,
             'trips': processor._empty_trips_response,
             'alerts': processor._empty_alerts_response,
-            'maintenance': processor._empty_maintenance_response
+            'maintenance': processor._empty_maintenance_response,
+            'fuel': processor._empty_fuel_response
         }
         
         empty_data = empty_responses.get(collection_name, processor._empty_checklist_response)(
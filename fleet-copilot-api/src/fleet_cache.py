@@ -0,0 +1,221 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Cache Compartilhado de Respostas da API (TTL + LRU)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+def default_cache_path() -> str:
+    """Caminho padrão do cache em disco, compartilhado pelos workers da mesma máquina"""
+    return os.getenv('FLEET_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'fleet_copilot_cache.sqlite3'))
+
+class ResponseCache:
+    """Cache de respostas da API com TTL, despejo LRU e contadores de acerto
+
+    Os dados ficam em um arquivo SQLite para que todos os workers do gunicorn
+    compartilhem as mesmas entradas e contadores. Entradas expiradas não são
+    removidas de imediato: continuam disponíveis como dado antigo (stale) até
+    serem despejadas pelo limite de tamanho ou por stale_ttl.
+    """
+
+    def __init__(self, path: str = None, ttl: int = 120, max_entries: int = 256,
+                 max_bytes: int = 64 * 1024 * 1024, stale_ttl: int = 24 * 3600):
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão curta por operação (seguro entre processos e greenlets)"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Cria as tabelas do cache se necessário"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict = None) -> str:
+        """Chave estável para (endpoint, params), independente da ordem dos parâmetros"""
+        raw = json.dumps([endpoint, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _increment(self, conn, name: str, amount: int = 1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        """Retorna o valor em cache ou None; allow_stale aceita entradas expiradas"""
+        try:
+            now = time.time()
+            with self._connect() as conn:
+                row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+
+                if row is None or (not allow_stale and now - row[1] > self.ttl):
+                    self._increment(conn, 'misses')
+                    return None
+
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self._increment(conn, 'stale_hits' if now - row[1] > self.ttl else 'hits')
+                return json.loads(row[0])
+
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Erro ao ler cache: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        """Grava o valor e aplica o despejo por TTL antigo e por tamanho (LRU)"""
+        try:
+            payload = json.dumps(value, default=str)
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now)
+                )
+                self._evict(conn, now)
+
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Erro ao gravar cache: {e}")
+
+    def _evict(self, conn, now: float):
+        """Remove entradas além de stale_ttl e, depois, as menos usadas até caber nos limites"""
+        expired = conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.stale_ttl,)).rowcount
+
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at DESC").fetchall()
+        kept_bytes = 0
+        evicted = []
+        for position, (key, size) in enumerate(rows):
+            kept_bytes += size
+            if position >= self.max_entries or kept_bytes > self.max_bytes:
+                evicted.append((key,))
+
+        if evicted:
+            conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        if expired or evicted:
+            self._increment(conn, 'evictions', expired + len(evicted))
+
+    def invalidate(self, key: str = None):
+        """Remove uma entrada ou, sem chave, limpa todo o cache"""
+        with self._connect() as conn:
+            if key:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            else:
+                conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores compartilhados e ocupação atual do cache"""
+        try:
+            with self._connect() as conn:
+                counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+                entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao ler estatísticas do cache: {e}")
+            return {'error': str(e)}
+
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        return {
+            'entries': entries,
+            'bytes': total_bytes,
+            'hits': hits,
+            'stale_hits': counters.get('stale_hits', 0),
+            'misses': misses,
+            'evictions': counters.get('evictions', 0),
+            'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0.0,
+            'ttl': self.ttl,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes
+        }
+
+class _InFlightCall:
+    """Chamada em andamento compartilhada pelos chamadores da mesma chave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Deduplicação de chamadas concorrentes idênticas (single-flight)
+
+    Chamadores concorrentes com a mesma chave aguardam uma única execução em
+    andamento e recebem o mesmo resultado (ou a mesma exceção). Com o worker
+    gevent, threading é substituído por primitivas cooperativas, então a
+    espera não bloqueia os demais greenlets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.deduplicated = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa fn uma única vez por chave entre chamadas simultâneas"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlightCall()
+            else:
+                call.waiters += 1
+                self.deduplicated += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.waiters:
+                logger.info(f"Single-flight: {call.waiters} chamada(s) compartilharam o resultado de {key[:12]}")
+            call.done.set()
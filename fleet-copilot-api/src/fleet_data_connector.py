@@ -7,12 +7,41 @@ import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Tuple, Callable
 import json
+import time
 import logging
 from dataclasses import dataclass
 from urllib.parse import urljoin
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.fleet_cache import ResponseCache, SingleFlight
+except ImportError:
+    from fleet_cache import ResponseCache, SingleFlight
+
+try:
+    from src.fleet_resilience import RetryPolicy, CircuitBreakerRegistry, is_retryable
+except ImportError:
+    from fleet_resilience import RetryPolicy, CircuitBreakerRegistry, is_retryable
+
+try:
+    from src.fleet_stream import records_to_frame, record_path_for, select_records, stream_frame, flatten_nested
+except ImportError:
+    from fleet_stream import records_to_frame, record_path_for, select_records, stream_frame, flatten_nested
+
+try:
+    from src.fleet_sync import FleetLocalStore, FleetDeltaSync
+except ImportError:
+    from fleet_sync import FleetLocalStore, FleetDeltaSync
+
+try:
+    from src.fleet_rollups import (FleetRollupStore, ChecklistRollup, checklist_rollup, day_bounds, to_day,
+                                   REBUILD_BATCH_DAYS)
+except ImportError:
+    from fleet_rollups import (FleetRollupStore, ChecklistRollup, checklist_rollup, day_bounds, to_day,
+                               REBUILD_BATCH_DAYS)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -91,16 +120,167 @@ def safe_percentage(numerator: Any, denominator: Any, decimals: int = 2) -> floa
     result = (num / den) * 100
     return round(result, decimals)
 
+def clean_string_series(series: pd.Series) -> pd.Series:
+    """Versão vetorizada de safe_string(x, ""): remove espaços e troca vazios por NA"""
+    cleaned = series.astype('string').str.strip()
+    return cleaned.mask(cleaned == '')
+
+def coerce_bool_series(series: pd.Series) -> pd.Series:
+    """Versão vetorizada de safe_bool: converte para boolean nullable (NA quando ausente)"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype('boolean')
+    
+    text = series.astype('string').str.strip().str.lower()
+    numeric = pd.to_numeric(series, errors='coerce')
+    truthy = text.isin(['true', '1', 'yes', 'sim']).fillna(False) | (numeric.fillna(0) != 0)
+    return truthy.astype('boolean').mask(series.isna())
+
+# Esquemas de normalização aplicados uma única vez quando o DataFrame é montado
+CHECKLIST_SCHEMA = {
+    'timestamp': 'datetime',
+    'issueOpenDate': 'datetime',
+    'noCompliant': 'boolean',
+    'compliant': 'boolean',
+    'vehiclePlate': 'category',
+    'driverName': 'category',
+    'itemName': 'category'
+}
+
+# Telemetria compacta: medidas em float32 e identificadores repetidos como category
+ALERTS_CHECKIN_SCHEMA = {
+    'timestamp': 'datetime',
+    'lowBattery': 'boolean',
+    'temperature': 'float32',
+    'humidity': 'float32',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'enterpriseId': 'category',
+    'deviceId': 'category',
+    'vehiclePlate': 'category'
+}
+
+# Campos aninhados da telemetria: objeto -> campos extraídos para colunas próprias
+ALERTS_CHECKIN_NESTED = {'location': ['latitude', 'longitude']}
+
+DRIVER_TRIPS_SCHEMA = {
+    'timestamp': 'datetime',
+    'vehiclePlate': 'category',
+    'driverName': 'category'
+}
+
+# Colunas usadas pelas análises; o snapshot projeta a ingestão nelas
+CHECKLIST_COLUMNS = ['id', 'enterpriseId', 'timestamp', 'issueOpenDate', 'vehiclePlate',
+                     'driverName', 'itemName', 'noCompliant', 'compliant']
+
+ALERTS_CHECKIN_COLUMNS = ['id', 'enterpriseId', 'timestamp', 'deviceId', 'vehiclePlate',
+                          'location.latitude', 'location.longitude', 'temperature', 'humidity',
+                          'lowBattery']
+
+DRIVER_TRIPS_COLUMNS = ['id', 'enterpriseId', 'timestamp', 'driverId', 'driverName',
+                        'vehiclePlate', 'status', 'duration', 'distance']
+
+# Collections disponíveis para fetch_many e o getter de cada uma
+COLLECTION_GETTERS = {
+    'checklist': 'get_checklist_data',
+    'alerts_checkin': 'get_alerts_checkin_data',
+    'driver_trips': 'get_driver_trips_data'
+}
+
+# Collections mantidas no armazenamento local quando a sincronização incremental está ativa
+SYNCED_ENDPOINTS = {'/checklist', '/alerts-checkin', '/driver-trips'}
+
+def run_parallel(tasks: Dict[str, Callable[[], Any]], max_workers: int = None) -> Dict[str, Any]:
+    """Executa as tarefas em paralelo e retorna os resultados pela mesma chave
+    
+    Usa um pool de threads, que no worker gevent (monkey patch) vira um pool
+    de greenlets: o tempo total é o da tarefa mais lenta, não a soma. A
+    primeira exceção é propagada depois que todas as tarefas terminam.
+    """
+    if not tasks:
+        return {}
+    if len(tasks) == 1:
+        key, task = next(iter(tasks.items()))
+        return {key: task()}
+    
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as executor:
+        futures = {key: executor.submit(task) for key, task in tasks.items()}
+    
+    return {key: future.result() for key, future in futures.items()}
+
+def normalize_frame(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Converte as colunas do esquema para tipos definidos com operações vetorizadas
+    
+    - datetime: datetime64 (valores inválidos viram NaT)
+    - boolean: boolean nullable, mesma regra de safe_bool (NA quando ausente)
+    - number: float (valores inválidos viram NaN), mesma regra de safe_number
+    - float32: como number, em precisão simples (metade da memória)
+    - category: texto sem espaços nas bordas, vazios viram NA
+    """
+    for column, kind in schema.items():
+        if column not in df.columns:
+            continue
+        
+        if kind == 'datetime':
+            if not pd.api.types.is_datetime64_any_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif kind == 'boolean':
+            df[column] = coerce_bool_series(df[column])
+        elif kind == 'number':
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        elif kind == 'float32':
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+        elif kind == 'category':
+            df[column] = clean_string_series(df[column]).astype('category')
+    
+    return df
+
+def prepare_checklist_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Tipos do checklist (CHECKLIST_SCHEMA) e a coluna is_compliant"""
+    if df.empty:
+        return df
+    return add_compliance_column(normalize_frame(df, CHECKLIST_SCHEMA))
+
+def add_compliance_column(df: pd.DataFrame) -> pd.DataFrame:
+    """Deriva 'is_compliant' (bool): noCompliant tem precedência sobre compliant"""
+    if 'noCompliant' in df.columns:
+        df['is_compliant'] = ~df['noCompliant'].fillna(False).astype(bool)
+    elif 'compliant' in df.columns:
+        df['is_compliant'] = df['compliant'].fillna(True).astype(bool)
+    else:
+        df['is_compliant'] = True
+    return df
+
 @dataclass
 class FleetAPIConfig:
     """Configuração da API de gestão de frotas"""
     base_url: str = None
-    timeout: int = 30
+    timeout: int = 30  # Segundos de leitura por chamada (sem dados do servidor)
+    connect_timeout: float = 5.0  # Segundos para abrir a conexão
     max_retries: int = 3
+    backoff_base: float = 0.5  # Espera base do backoff exponencial (segundos)
+    backoff_max: float = 8.0  # Espera máxima entre tentativas (segundos)
+    breaker_failure_threshold: int = 5  # Falhas consecutivas que abrem o circuito do endpoint
+    breaker_reset_timeout: float = 30.0  # Segundos com o circuito aberto antes de testar de novo
+    pushdown_filters: bool = True  # Envia janela de datas para a API
+    cache_ttl: int = 120  # Segundos; 0 desativa o cache compartilhado
+    cache_max_entries: int = 256
+    cache_path: str = None  # Padrão: FLEET_CACHE_PATH ou diretório temporário
+    local_store: bool = None  # Lê do armazenamento local com sincronização incremental
+    local_store_path: str = None  # Padrão: FLEET_STORE_PATH ou diretório temporário
+    rollup_path: str = None  # Agregações diárias; padrão: FLEET_ROLLUP_PATH ou diretório temporário
+    sync_interval: int = 60  # Segundos mínimos entre sincronizações da mesma collection
+    sync_initial_days: int = 365  # Dias buscados na primeira sincronização; None busca todo o histórico
+    store_retention_days: int = 365  # Dias mantidos no armazenamento local; None mantém tudo
+    stream_ingestion: bool = True  # Lê as respostas em streaming, sem response.json()
+    stream_chunk_size: int = 5000  # Registros por bloco ao montar o DataFrame
+    stream_cache_max_records: int = 20000  # Respostas maiores não vão para o cache
+    max_parallel_fetches: int = 4  # Requisições simultâneas em fetch_many
     
     def __post_init__(self):
         if self.base_url is None:
             self.base_url = os.getenv('FIREBASE_API_URL', 'https://firebase-bi-api.onrender.com')
+        if self.local_store is None:
+            self.local_store = os.getenv('FLEET_LOCAL_STORE', '').lower() in ('1', 'true', 'yes')
 
 class FleetDataConnector:
     """Conector para APIs de gestão de frotas"""
@@ -108,139 +288,536 @@ class FleetDataConnector:
     def __init__(self, config: FleetAPIConfig = None):
         self.config = config or FleetAPIConfig()
         self.session = requests.Session()
-        self.session.timeout = self.config.timeout
+        self.retry_policy = RetryPolicy(self.config.max_retries, self.config.backoff_base,
+                                        self.config.backoff_max)
+        self.breakers = CircuitBreakerRegistry(self.config.breaker_failure_threshold,
+                                               self.config.breaker_reset_timeout)
+        self.cache = self._create_cache()
+        self._inflight = SingleFlight()
+        self.delta_sync = self._create_delta_sync()
+        self.rollups = self._create_rollups()
+    
+    def _create_cache(self) -> Optional[ResponseCache]:
+        """Cria o cache compartilhado de respostas (None se desativado ou indisponível)"""
+        if self.config.cache_ttl <= 0:
+            return None
+        try:
+            return ResponseCache(self.config.cache_path, ttl=self.config.cache_ttl,
+                                 max_entries=self.config.cache_max_entries)
+        except Exception as e:
+            logger.warning(f"Cache compartilhado indisponível, seguindo sem cache: {e}")
+            return None
+    
+    def _create_delta_sync(self) -> Optional[FleetDeltaSync]:
+        """Cria a sincronização incremental com o armazenamento local (None se desativada)"""
+        if not self.config.local_store:
+            return None
+        try:
+            store = FleetLocalStore(self.config.local_store_path)
+            return FleetDeltaSync(self, store, min_interval=self.config.sync_interval,
+                                  initial_days=self.config.sync_initial_days,
+                                  retention_days=self.config.store_retention_days,
+                                  batch_size=self.config.stream_chunk_size)
+        except Exception as e:
+            logger.warning(f"Armazenamento local indisponível, consultando a API diretamente: {e}")
+            return None
+    
+    def _create_rollups(self) -> Optional[FleetRollupStore]:
+        """Cria as agregações diárias de checklist, mantidas a cada sincronização (None sem armazenamento local)"""
+        if not self.delta_sync:
+            return None
+        try:
+            rollups = FleetRollupStore(self.config.rollup_path)
+            self.delta_sync.add_listener('/checklist', self._update_checklist_rollups)
+            return rollups
+        except Exception as e:
+            logger.warning(f"Agregações diárias indisponíveis, calculando sobre os registros: {e}")
+            return None
+    
+    def _update_checklist_rollups(self, enterprise_id: str, days: List[str]):
+        """Recalcula por inteiro os agregados dos dias que receberam registros"""
+        records = self.delta_sync.store.read_days('/checklist', enterprise_id, days)
+        frame = prepare_checklist_frame(records_to_frame(records, CHECKLIST_COLUMNS,
+                                                         self.config.stream_chunk_size))
+        self.rollups.replace(enterprise_id, checklist_rollup(frame), days)
+    
+    def _ensure_checklist_rollups(self, enterprise_id: str):
+        """Sincroniza o delta e, na primeira vez, reconstrói os agregados de todo o histórico local"""
+        self.delta_sync.sync('/checklist', enterprise_id)
+        if self.rollups.is_built(enterprise_id):
+            return
+        
+        days = self.delta_sync.store.days('/checklist', enterprise_id)
+        for start in range(0, len(days), REBUILD_BATCH_DAYS):
+            self._update_checklist_rollups(enterprise_id, days[start:start + REBUILD_BATCH_DAYS])
+        self.rollups.mark_built(enterprise_id)
+        logger.info(f"Agregações diárias de checklist reconstruídas para {enterprise_id}: {len(days)} dias")
+    
+    def _load_frame(self, endpoint: str, enterprise_id: str = None, start_date: str = None,
+                    end_date: str = None, columns: List[str] = None,
+                    record_path: str = None) -> pd.DataFrame:
+        """Monta o DataFrame bruto da janela a partir do armazenamento local ou da API
+        
+        Com o armazenamento local ativo, apenas o delta desde o último
+        high-water mark é buscado na API antes da leitura local; janelas que
+        começam antes do histórico mantido no armazenamento vão à API. Sem ele, a
+        resposta é lida em streaming (stream_ingestion) e projetada em columns.
+        record_path localiza os registros na resposta; o padrão é o formato do
+        endpoint na API (RECORD_PATHS).
+        """
+        chunk_size = self.config.stream_chunk_size
+        record_path = record_path or record_path_for(endpoint)
+        
+        if (self.delta_sync and enterprise_id and endpoint in SYNCED_ENDPOINTS
+                and self.delta_sync.covers(start_date)):
+            try:
+                self.delta_sync.sync(endpoint, enterprise_id)
+                if self.delta_sync.store.get_state(endpoint, enterprise_id)['high_water_mark']:
+                    records = self.delta_sync.store.read(endpoint, enterprise_id, start_date, end_date)
+                    return records_to_frame(records, columns, chunk_size)
+            except Exception as e:
+                logger.warning(f"Falha no armazenamento local de {endpoint}, consultando a API: {e}")
+        
+        params = self._build_query_params(enterprise_id, start_date, end_date)
+        if not self.config.stream_ingestion:
+            data = self._make_request(endpoint, params)
+            return records_to_frame(select_records(data, record_path), columns, chunk_size)
+        
+        cache_key = ResponseCache.make_key(endpoint, {**params, '_columns': columns or '*',
+                                                      '_path': record_path})
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache: {len(cached)} registros de {endpoint}")
+                return records_to_frame(cached, columns, chunk_size)
+        
+        df = self._inflight.do(cache_key, self._stream_upstream, endpoint, params, columns,
+                               cache_key, record_path)
+        # Cópia rasa: chamadores deduplicados recebem o mesmo frame e reatribuem colunas
+        return df.copy(deep=False)
         
     def _make_request(self, endpoint: str, params: Dict = None) -> List[Dict]:
-        """Faz requisição para a API com retry automático"""
+        """Faz requisição para a API com cache compartilhado e retry automático
+        
+        Requisições simultâneas idênticas (mesmo endpoint e parâmetros) são
+        deduplicadas: apenas uma vai à API e as demais aguardam o resultado.
+        """
+        cache_key = ResponseCache.make_key(endpoint, params)
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Cache: {len(cached)} registros de {endpoint}")
+                return cached
+        
+        return self._inflight.do(cache_key, self._fetch_upstream, endpoint, params, cache_key)
+    
+    @staticmethod
+    def _latest_key(endpoint: str, params: Dict = None, **scope) -> str:
+        """Chave da última resposta de (endpoint, enterpriseId, escopo), sem a janela de datas
+        
+        Guarda a cópia usada pelo fallback: a chave da janela muda com o
+        tempo, e sem ela não haveria dado antigo depois que a janela avança.
+        """
+        return ResponseCache.make_key(endpoint, {'enterpriseId': (params or {}).get('enterpriseId'),
+                                                 **scope, '_latest': True})
+    
+    def _cache_response(self, cache_key: str, latest_key: str, data: List[Dict]):
+        """Grava a resposta na chave da janela e como última resposta do escopo"""
+        if self.cache:
+            self.cache.set(cache_key, data)
+            self.cache.set(latest_key, data)
+    
+    def _stale_fallback(self, endpoint: str, cache_key: str, latest_key: str) -> Optional[List[Dict]]:
+        """Dado antigo do cache para quando a API falha ou o circuito está aberto
+        
+        Tenta a mesma janela e, se ela não estiver no cache, a última resposta
+        do escopo; o recorte exato da janela fica com quem chama.
+        """
+        if not self.cache:
+            return None
+        stale = self.cache.get(cache_key, allow_stale=True)
+        if stale is None:
+            stale = self.cache.get(latest_key, allow_stale=True)
+        if stale is not None:
+            logger.warning(f"Servindo {len(stale)} registros antigos do cache para {endpoint}")
+        return stale
+    
+    def _fetch_upstream(self, endpoint: str, params: Dict, cache_key: str) -> List[Dict]:
+        """Busca o endpoint na API com retry e grava a resposta no cache"""
+        latest_key = self._latest_key(endpoint, params)
+        data = self._request_upstream(endpoint, params, lambda response: response.json())
+        if data is None:
+            return self._stale_fallback(endpoint, cache_key, latest_key) or []
+        
+        logger.info(f"Recebidos {len(data)} registros de {endpoint}")
+        self._cache_response(cache_key, latest_key, data)
+        return data
+    
+    def _request_upstream(self, endpoint: str, params: Dict,
+                          handler: Callable[[requests.Response], Any], stream: bool = False) -> Any:
+        """Executa a requisição e retorna handler(response); None em falha ou com o circuito aberto
+        
+        Cada tentativa tem timeout de conexão e de leitura. Falhas transitórias
+        (conexão, timeout, 5xx, 429) são repetidas com backoff exponencial e
+        jitter e contam para o circuit breaker do endpoint; um 4xx é uma resposta
+        da API e conta como sucesso. Toda tentativa libera a chamada de teste do
+        breaker, mesmo se terminar em exceção inesperada.
+        """
         url = urljoin(self.config.base_url, endpoint)
+        breaker = self.breakers.get(endpoint)
+        timeout = (self.config.connect_timeout, self.config.timeout)
         
-        for attempt in range(self.config.max_retries):
+        for attempt in self.retry_policy.attempts():
+            if not breaker.allow_request():
+                logger.warning(f"Circuit breaker de {endpoint} aberto; requisição não enviada")
+                return None
+            
             try:
                 logger.info(f"Fazendo requisição para {url} (tentativa {attempt + 1})")
-                response = self.session.get(url, params=params)
-                response.raise_for_status()
+                with self.session.get(url, params=params, stream=stream, timeout=timeout) as response:
+                    response.raise_for_status()
+                    result = handler(response)
+                breaker.record_success()
+                return result
                 
-                data = response.json()
-                logger.info(f"Recebidos {len(data)} registros de {endpoint}")
-                return data
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if not is_retryable(e):
+                    logger.error(f"Erro não recuperável em {endpoint}: {e}")
+                    if isinstance(e, requests.exceptions.HTTPError):
+                        breaker.record_success()
+                    return None
                 
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Erro na tentativa {attempt + 1}: {e}")
-                if attempt == self.config.max_retries - 1:
-                    logger.error(f"Falha após {self.config.max_retries} tentativas: {e}")
-                    return []
+                breaker.record_failure()
+                if attempt == self.retry_policy.max_retries - 1:
+                    logger.error(f"Falha após {self.retry_policy.max_retries} tentativas: {e}")
+                    return None
+                
+                delay = self.retry_policy.delay(attempt, e)
+                logger.warning(f"Erro na tentativa {attempt + 1}: {e}; nova tentativa em {delay:.2f}s")
+                time.sleep(delay)
+            
+            finally:
+                breaker.release_probe()
                     
-        return []
+        return None
     
-    def get_checklist_data(self, enterprise_id: str = None, 
-                          start_date: str = None, end_date: str = None) -> pd.DataFrame:
-        """Obtém dados de checklist"""
+    def _stream_upstream(self, endpoint: str, params: Dict, columns: Optional[List[str]],
+                         cache_key: str, record_path: str = 'item') -> pd.DataFrame:
+        """Lê a resposta em streaming direto para um DataFrame, só com as colunas pedidas"""
+        def ingest(response):
+            return stream_frame(response, columns, self.config.stream_chunk_size, record_path)
+        
+        latest_key = self._latest_key(endpoint, params, _columns=columns or '*', _path=record_path)
+        result = self._request_upstream(endpoint, params, ingest, stream=True)
+        if result is None:
+            stale = self._stale_fallback(endpoint, cache_key, latest_key)
+            return records_to_frame(stale or [], columns, self.config.stream_chunk_size)
+        
+        df, stats = result
+        logger.info(f"Streaming de {endpoint}: {stats['records']} registros, {stats['columns']} colunas, "
+                    f"{stats['frame_mb']} MB em DataFrame, pico de memória {stats['peak_rss_mb']} MB "
+                    f"(+{stats['peak_rss_growth_mb']} MB, {stats['parser']}, {stats['seconds']}s)")
+        
+        if self.cache and len(df) <= self.config.stream_cache_max_records:
+            self._cache_response(cache_key, latest_key, df.to_dict('records'))
+        return df
+    
+    def _build_query_params(self, enterprise_id: str = None, start_date: str = None,
+                            end_date: str = None, exact: bool = False) -> Dict[str, Any]:
+        """Monta parâmetros da consulta, enviando a janela de datas para a API (pushdown)
+        
+        Janelas móveis (sem fim ou terminando hoje) vão alinhadas ao início do
+        dia e sem endDate, para que a chave de cache não mude a cada minuto; o
+        recorte exato é feito em _apply_date_window. Janelas fechadas no passado
+        e as consultas com exact=True (sincronização) vão arredondadas ao minuto.
+        """
         params = {}
         if enterprise_id:
             params['enterpriseId'] = enterprise_id
-            
-        data = self._make_request('/checklist', params)
         
-        if not data:
-            return pd.DataFrame()
+        if not self.config.pushdown_filters:
+            return params
+        
+        try:
+            today = pd.Timestamp(datetime.now()).floor('D')
+            end_dt = pd.to_datetime(end_date) if end_date else None
+            rolling = not exact and (end_dt is None or end_dt.tz_localize(None) >= today)
+            if start_date:
+                start_dt = pd.to_datetime(start_date)
+                start_dt = start_dt.floor('D') if rolling else start_dt.floor('min')
+                params['startDate'] = start_dt.isoformat()
+                # Mesmo parâmetro aceito por DynamicBIProcessor.fetch_collection_data;
+                # tolera alguns segundos entre o cálculo da janela e a requisição
+                elapsed = datetime.now() - start_dt.to_pydatetime().replace(tzinfo=None)
+                params['days'] = max(1, int(np.ceil(elapsed.total_seconds() / 86400 - 1e-3)))
+            if end_dt is not None and not rolling:
+                params['endDate'] = end_dt.ceil('min').isoformat()
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Janela de datas inválida, consultando sem pushdown: {e}")
+            return {'enterpriseId': enterprise_id} if enterprise_id else {}
+        
+        return params
+    
+    def _apply_date_window(self, df: pd.DataFrame, endpoint: str,
+                           start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Recorta a janela exata localmente (a janela enviada à API pode ser alinhada ao dia)"""
+        if (not start_date and not end_date) or 'timestamp' not in df.columns:
+            return df
+        
+        in_window = df['timestamp'].notna()
+        if start_date:
+            in_window &= df['timestamp'] >= pd.to_datetime(start_date)
+        if end_date:
+            in_window &= df['timestamp'] <= pd.to_datetime(end_date)
+        
+        if in_window.all():
+            return df
+        
+        logger.info(f"Resposta de {endpoint} trouxe registros fora da janela exata; "
+                    f"descartando {int((~in_window).sum())} registros localmente")
+        return df[in_window].copy()
+    
+    def fetch_many(self, requests_by_key: Dict[str, Union[str, Dict[str, Any]]],
+                   **defaults) -> Dict[str, pd.DataFrame]:
+        """Busca várias collections em paralelo
+        
+        Cada valor é o nome da collection (ver COLLECTION_GETTERS) ou um dict
+        com 'collection' e os argumentos do getter; defaults (enterprise_id,
+        start_date, end_date, columns) valem para todas. Timeouts, retry, cache
+        e deduplicação são os de cada getter. Uma collection que falha volta
+        como DataFrame vazio.
+        """
+        def make_task(key: str, spec: Union[str, Dict[str, Any]]) -> Callable[[], pd.DataFrame]:
+            kwargs = dict(defaults)
+            if isinstance(spec, str):
+                spec = {'collection': spec}
+            kwargs.update(spec)
+            getter = getattr(self, COLLECTION_GETTERS[kwargs.pop('collection')])
             
-        df = pd.DataFrame(data)
+            def task() -> pd.DataFrame:
+                try:
+                    return getter(**kwargs)
+                except Exception as e:
+                    logger.error(f"Erro ao buscar {key} em paralelo: {e}")
+                    return pd.DataFrame()
+            return task
+        
+        tasks = {key: make_task(key, spec) for key, spec in requests_by_key.items()}
+        return run_parallel(tasks, self.config.max_parallel_fetches)
+    
+    def get_collection_data(self, endpoint: str, enterprise_id: str = None, start_date: str = None,
+                            end_date: str = None, columns: List[str] = None,
+                            record_path: str = None) -> pd.DataFrame:
+        """Obtém uma collection qualquer como DataFrame bruto (sem conversão de tipos)
+        
+        A janela de datas é enviada à API (pushdown), mas o recorte exato fica
+        com quem chama, já que o campo de data varia entre collections.
+        """
+        return self._load_frame(endpoint, enterprise_id, start_date, end_date, columns, record_path)
+    
+    def get_checklist_data(self, enterprise_id: str = None, start_date: str = None,
+                           end_date: str = None, columns: List[str] = None) -> pd.DataFrame:
+        """Obtém dados de checklist"""
+        df = self._load_frame('/checklist', enterprise_id, start_date, end_date, columns)
         
         if not df.empty:
             # Conversão de tipos com tratamento de erro
             try:
                 if 'timestamp' in df.columns:
                     df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-                if 'issueOpenDate' in df.columns:
-                    df['issueOpenDate'] = pd.to_datetime(df['issueOpenDate'], errors='coerce')
                 
-                # Filtros de data
-                if start_date and 'timestamp' in df.columns:
-                    start_dt = pd.to_datetime(start_date)
-                    df = df[df['timestamp'] >= start_dt]
-                if end_date and 'timestamp' in df.columns:
-                    end_dt = pd.to_datetime(end_date)
-                    df = df[df['timestamp'] <= end_dt]
+                # Filtros de data (fallback quando o servidor ignora o pushdown)
+                df = self._apply_date_window(df, '/checklist', start_date, end_date)
+                
+                # Normalização única das colunas usadas pelas análises
+                df = prepare_checklist_frame(df)
                     
             except Exception as e:
                 logger.warning(f"Erro na conversão de datas: {e}")
                 
         return df
     
-    def get_alerts_checkin_data(self, enterprise_id: str = None,
-                               start_date: str = None, end_date: str = None) -> pd.DataFrame:
-        """Obtém dados de alertas de check-in (telemática)"""
-        params = {}
-        if enterprise_id:
-            params['enterpriseId'] = enterprise_id
-            
-        data = self._make_request('/alerts-checkin', params)
+    def get_checklist_rollup(self, enterprise_id: str = None, start_date: str = None,
+                             end_date: str = None) -> ChecklistRollup:
+        """Agregados diários de checklist da janela (total, conformidade, distintos e falhas por item)
         
-        if not data:
-            return pd.DataFrame()
-            
-        df = pd.DataFrame(data)
+        A janela é sempre alinhada ao dia (UTC): do início do dia de start_date
+        ao fim do dia de end_date. Com o armazenamento local ativo, os
+        agregados são mantidos a cada sincronização e a consulta soma só as
+        linhas diárias. Sem ele, são calculados sobre o frame da mesma janela.
+        """
+        start_day, end_day = to_day(start_date), to_day(end_date)
+        if self.rollups and enterprise_id and self.delta_sync.covers(start_date):
+            try:
+                self._ensure_checklist_rollups(enterprise_id)
+                return self.rollups.read(enterprise_id, start_day, end_day)
+            except Exception as e:
+                logger.warning(f"Falha nas agregações diárias de {enterprise_id}, calculando sobre os registros: {e}")
+        
+        start, end = day_bounds(start_day, end_day)
+        return checklist_rollup(self.get_checklist_data(enterprise_id, start, end, columns=CHECKLIST_COLUMNS))
+    
+    def get_alerts_checkin_data(self, enterprise_id: str = None, start_date: str = None,
+                                end_date: str = None, columns: List[str] = None) -> pd.DataFrame:
+        """Obtém dados de alertas de check-in (telemática)"""
+        df = self._load_frame('/alerts-checkin', enterprise_id, start_date, end_date, columns)
         
         if not df.empty:
             try:
-                # Conversão de tipos
+                # Coordenadas: sem projeção o objeto location chega inteiro e é achatado aqui
+                df = flatten_nested(df, ALERTS_CHECKIN_NESTED)
+                df = df.rename(columns={f'{parent}.{field}': field
+                                        for parent, fields in ALERTS_CHECKIN_NESTED.items()
+                                        for field in fields})
+                
                 if 'timestamp' in df.columns:
                     df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
                 
-                # Extração de coordenadas se existir
-                if 'location' in df.columns:
-                    df['latitude'] = df['location'].apply(lambda x: x.get('latitude') if isinstance(x, dict) else None)
-                    df['longitude'] = df['location'].apply(lambda x: x.get('longitude') if isinstance(x, dict) else None)
+                # Filtros de data (fallback quando o servidor ignora o pushdown)
+                df = self._apply_date_window(df, '/alerts-checkin', start_date, end_date)
                 
-                # Filtros de data
-                if start_date and 'timestamp' in df.columns:
-                    start_dt = pd.to_datetime(start_date)
-                    df = df[df['timestamp'] >= start_dt]
-                if end_date and 'timestamp' in df.columns:
-                    end_dt = pd.to_datetime(end_date)
-                    df = df[df['timestamp'] <= end_dt]
+                df = normalize_frame(df, ALERTS_CHECKIN_SCHEMA)
                     
             except Exception as e:
                 logger.warning(f"Erro no processamento de alertas: {e}")
                 
         return df
     
-    def get_driver_trips_data(self, enterprise_id: str = None,
-                             start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    def get_driver_trips_data(self, enterprise_id: str = None, start_date: str = None,
+                              end_date: str = None, columns: List[str] = None) -> pd.DataFrame:
         """Obtém dados de viagens de motoristas"""
-        params = {}
-        if enterprise_id:
-            params['enterpriseId'] = enterprise_id
-            
-        data = self._make_request('/driver-trips', params)
-        
-        if not data:
-            return pd.DataFrame()
-            
-        df = pd.DataFrame(data)
+        df = self._load_frame('/driver-trips', enterprise_id, start_date, end_date, columns)
         
         if not df.empty:
             try:
                 # Assumindo que existe campo de timestamp
                 if 'timestamp' in df.columns:
                     df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-                    if start_date:
-                        start_dt = pd.to_datetime(start_date)
-                        df = df[df['timestamp'] >= start_dt]
-                    if end_date:
-                        end_dt = pd.to_datetime(end_date)
-                        df = df[df['timestamp'] <= end_dt]
+                    df = self._apply_date_window(df, '/driver-trips', start_date, end_date)
+                
+                df = normalize_frame(df, DRIVER_TRIPS_SCHEMA)
                         
             except Exception as e:
                 logger.warning(f"Erro no processamento de viagens: {e}")
                     
         return df
 
+# Colunas carregadas pelo snapshot para cada collection
+SNAPSHOT_COLUMNS = {
+    'checklist': CHECKLIST_COLUMNS,
+    'alerts_checkin': ALERTS_CHECKIN_COLUMNS,
+    'driver_trips': DRIVER_TRIPS_COLUMNS
+}
+
+class FleetDataSnapshot:
+    """Snapshot dos dados de uma análise, chaveado por (enterprise_id, janela)
+    
+    Expõe a mesma interface de leitura do FleetDataConnector, mas busca cada
+    collection uma única vez e entrega o mesmo DataFrame a todas as análises
+    que compartilham o snapshot.
+    """
+    
+    def __init__(self, connector: FleetDataConnector, enterprise_id: str = None,
+                 days: int = 30, end_date: datetime = None):
+        self.connector = connector
+        self.enterprise_id = enterprise_id
+        self.days = days
+        self.end_date = end_date or datetime.now()
+        self.start_date = self.end_date - timedelta(days=days)
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._rollup: Optional[ChecklistRollup] = None
+    
+    @property
+    def key(self) -> Tuple[Optional[str], str, str]:
+        """Chave do snapshot: (enterprise_id, início da janela, fim da janela)"""
+        return (self.enterprise_id, self.start_date.isoformat(), self.end_date.isoformat())
+    
+    def _get_frame(self, collection: str, loader: Callable[..., pd.DataFrame], columns: List[str],
+                   enterprise_id: str = None, start_date: str = None) -> pd.DataFrame:
+        """Carrega a collection uma única vez (só as colunas das análises) e recorta a janela em memória"""
+        if enterprise_id and enterprise_id != self.enterprise_id:
+            logger.warning(f"Snapshot {self.key} consultado com enterprise_id {enterprise_id}; buscando direto")
+            return loader(enterprise_id=enterprise_id, start_date=start_date, columns=columns)
+        
+        if collection not in self._frames:
+            self._frames[collection] = loader(
+                enterprise_id=self.enterprise_id,
+                start_date=self.start_date.isoformat(),
+                end_date=self.end_date.isoformat(),
+                columns=columns
+            )
+        
+        df = self._frames[collection]
+        
+        # Janelas mais estreitas que a do snapshot são filtradas localmente;
+        # consultas sem janela recebem a janela completa do snapshot
+        if start_date and not df.empty and 'timestamp' in df.columns:
+            start_dt = pd.to_datetime(start_date)
+            if start_dt > self.start_date:
+                df = df[df['timestamp'] >= start_dt]
+        
+        # Cópia para que uma análise não altere o frame visto pelas demais
+        return df.copy()
+    
+    def prefetch(self, collections: List[str] = None) -> 'FleetDataSnapshot':
+        """Carrega em paralelo as collections ainda não buscadas (padrão: todas)"""
+        pending = [name for name in (collections or SNAPSHOT_COLUMNS) if name not in self._frames]
+        if pending:
+            self._frames.update(self.connector.fetch_many(
+                {name: {'collection': name, 'columns': SNAPSHOT_COLUMNS[name]} for name in pending},
+                enterprise_id=self.enterprise_id,
+                start_date=self.start_date.isoformat(),
+                end_date=self.end_date.isoformat()
+            ))
+        return self
+    
+    def get_checklist_data(self, enterprise_id: str = None,
+                           start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Obtém dados de checklist do snapshot"""
+        return self._get_frame('checklist', self.connector.get_checklist_data,
+                               SNAPSHOT_COLUMNS['checklist'], enterprise_id, start_date)
+    
+    def get_checklist_rollup(self, enterprise_id: str = None,
+                             start_date: str = None, end_date: str = None) -> ChecklistRollup:
+        """Agregados diários do snapshot: das tabelas de agregação quando existem, senão do frame já carregado"""
+        if enterprise_id and enterprise_id != self.enterprise_id:
+            return self.connector.get_checklist_rollup(enterprise_id, start_date, end_date)
+        
+        if self._rollup is None:
+            if self.connector.rollups and self.enterprise_id:
+                self._rollup = self.connector.get_checklist_rollup(
+                    self.enterprise_id, self.start_date.isoformat(), self.end_date.isoformat()
+                )
+            else:
+                self._rollup = checklist_rollup(self.get_checklist_data())
+        
+        start_day = to_day(start_date)
+        if start_day and start_day > to_day(self.start_date):
+            return self._rollup.window(start_day)
+        return self._rollup
+    
+    def get_alerts_checkin_data(self, enterprise_id: str = None,
+                                start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Obtém dados de alertas de check-in do snapshot"""
+        return self._get_frame('alerts_checkin', self.connector.get_alerts_checkin_data,
+                               SNAPSHOT_COLUMNS['alerts_checkin'], enterprise_id, start_date)
+    
+    def get_driver_trips_data(self, enterprise_id: str = None,
+                              start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """Obtém dados de viagens do snapshot"""
+        return self._get_frame('driver_trips', self.connector.get_driver_trips_data,
+                               SNAPSHOT_COLUMNS['driver_trips'], enterprise_id, start_date)
+
 class FleetDataProcessor:
     """Processador de dados de frota para análises"""
     
     def __init__(self, connector: FleetDataConnector):
         self.connector = connector
+    
+    def with_snapshot(self, enterprise_id: str = None, days: int = 30) -> 'FleetDataProcessor':
+        """Retorna um processador que lê de um snapshot único da janela informada"""
+        snapshot = FleetDataSnapshot(self.connector, enterprise_id, days)
+        return type(self)(snapshot)
         
     def get_checklist_summary(self, enterprise_id: str = None, days: int = 7) -> Dict[str, Any]:
         """Gera resumo de checklists com validação robusta"""
@@ -248,13 +825,14 @@ class FleetDataProcessor:
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
             
-            df = self.connector.get_checklist_data(
+            # Agregados diários da janela (sem varrer os registros brutos quando mantidos)
+            rollup = self.connector.get_checklist_rollup(
                 enterprise_id=enterprise_id,
                 start_date=start_date.isoformat(),
                 end_date=end_date.isoformat()
             )
             
-            if df.empty:
+            if rollup.empty:
                 return {
                     "total": 0, 
                     "compliant": 0, 
@@ -265,44 +843,17 @@ class FleetDataProcessor:
                     "drivers": 0
                 }
             
-            # Calcular métricas de conformidade baseado na estrutura real
-            total = len(df)
-            
-            # Verificar diferentes campos de conformidade com validação
-            compliant = 0
-            non_compliant = 0
-            
-            if 'noCompliant' in df.columns:
-                # noCompliant: True = não conforme, False = conforme
-                non_compliant_mask = df['noCompliant'].apply(lambda x: safe_bool(x, False))
-                non_compliant = int(non_compliant_mask.sum())
-                compliant = total - non_compliant
-            elif 'compliant' in df.columns:
-                # compliant: True = conforme, False = não conforme
-                compliant_mask = df['compliant'].apply(lambda x: safe_bool(x, True))
-                compliant = int(compliant_mask.sum())
-                non_compliant = total - compliant
-            else:
-                # Se não há campo de conformidade, assumir todos conformes
-                compliant = total
-                non_compliant = 0
+            totals = rollup.summary()
+            total = totals['total']
+            compliant = totals['compliant']
+            non_compliant = totals['non_compliant']
             
             # Calcular taxa de conformidade de forma segura
             compliance_rate = safe_percentage(compliant, total)
             
-            # Contar veículos e motoristas únicos com validação
-            vehicles = 0
-            drivers = 0
-            
-            if 'vehiclePlate' in df.columns:
-                valid_plates = df['vehiclePlate'].apply(lambda x: safe_string(x, "")).str.strip()
-                valid_plates = valid_plates[valid_plates != ""]
-                vehicles = len(valid_plates.unique()) if not valid_plates.empty else 0
-            
-            if 'driverName' in df.columns:
-                valid_drivers = df['driverName'].apply(lambda x: safe_string(x, "")).str.strip()
-                valid_drivers = valid_drivers[valid_drivers != ""]
-                drivers = len(valid_drivers.unique()) if not valid_drivers.empty else 0
+            # Veículos e motoristas distintos na janela (NA não é contado)
+            vehicles = totals['vehicles']
+            drivers = totals['drivers']
             
             result = {
                 "total": int(total),
@@ -330,6 +881,46 @@ class FleetDataProcessor:
                 "error": str(e)
             }
     
+    def _performance_frame(self, checklist_df: pd.DataFrame) -> pd.DataFrame:
+        """Frame único usado pelas agregações de performance"""
+        frame = pd.DataFrame(index=checklist_df.index)
+        
+        # Colunas de texto já normalizadas pelo conector; 'N/A' não identifica ninguém
+        for column in ['vehiclePlate', 'driverName', 'itemName']:
+            if column in checklist_df.columns:
+                frame[column] = checklist_df[column].mask(checklist_df[column] == 'N/A')
+            else:
+                frame[column] = pd.Series(pd.NA, index=checklist_df.index, dtype='string')
+        
+        frame['compliant'] = checklist_df['is_compliant']
+        frame['timestamp'] = checklist_df['timestamp'] if 'timestamp' in checklist_df.columns else pd.NaT
+        
+        return frame
+    
+    def _aggregate_performance(self, frame: pd.DataFrame, key: str) -> pd.DataFrame:
+        """Agrega contagens, conformidade, última atividade e veículos distintos por chave"""
+        grouped = frame.dropna(subset=[key]).groupby(key, sort=False, observed=True)
+        stats = grouped.agg(
+            total_checks=('compliant', 'size'),
+            compliant_checks=('compliant', 'sum'),
+            last_activity=('timestamp', 'max'),
+            vehicles_operated=('vehiclePlate', 'nunique')
+        )
+        stats['compliance_rate'] = (stats['compliant_checks'] / stats['total_checks'] * 100).round(2)
+        
+        # Ordenação estável preserva a ordem de aparição em empates
+        return stats.sort_values('compliance_rate', ascending=False, kind='stable')
+    
+    def _top_items_by(self, frame: pd.DataFrame, key: str, limit: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        """Top itens verificados por chave, calculados em um único groupby"""
+        counts = frame.dropna(subset=[key, 'itemName']).groupby([key, 'itemName'], sort=False, observed=True).size()
+        top = counts.sort_values(ascending=False, kind='stable').groupby(level=0, sort=False, observed=True).head(limit)
+        
+        top_items: Dict[str, List[Dict[str, Any]]] = {}
+        for (group, item), count in top.items():
+            top_items.setdefault(group, []).append({"item": item, "count": int(count)})
+        return top_items
+    
     def get_vehicle_performance(self, enterprise_id: str = None, days: int = 30) -> List[Dict[str, Any]]:
         """Análise de performance por veículo com validação robusta"""
         try:
@@ -346,59 +937,21 @@ class FleetDataProcessor:
             if checklist_df.empty or 'vehiclePlate' not in checklist_df.columns:
                 return []
             
-            performance_data = []
+            frame = self._performance_frame(checklist_df)
+            stats = self._aggregate_performance(frame, 'vehiclePlate')
+            top_items = self._top_items_by(frame, 'vehiclePlate')
             
-            # Análise por veículo
-            for vehicle in checklist_df['vehiclePlate'].unique():
-                vehicle_str = safe_string(vehicle, "")
-                if vehicle_str == "" or vehicle_str == "N/A":
-                    continue
-                    
-                vehicle_data = checklist_df[checklist_df['vehiclePlate'] == vehicle]
-                
-                # Métricas de checklist
-                total_checks = len(vehicle_data)
-                
-                # Calcular conformidade com validação
-                compliant_checks = 0
-                if 'noCompliant' in vehicle_data.columns:
-                    compliant_mask = vehicle_data['noCompliant'].apply(lambda x: not safe_bool(x, False))
-                    compliant_checks = int(compliant_mask.sum())
-                elif 'compliant' in vehicle_data.columns:
-                    compliant_mask = vehicle_data['compliant'].apply(lambda x: safe_bool(x, True))
-                    compliant_checks = int(compliant_mask.sum())
-                else:
-                    compliant_checks = total_checks
-                
-                compliance_rate = safe_percentage(compliant_checks, total_checks)
-                
-                # Última atividade com validação
-                last_check = None
-                if 'timestamp' in vehicle_data.columns:
-                    valid_timestamps = vehicle_data['timestamp'].dropna()
-                    if not valid_timestamps.empty:
-                        last_check = valid_timestamps.max()
-                
-                # Itens mais verificados com validação
-                top_items = []
-                if 'itemName' in vehicle_data.columns:
-                    valid_items = vehicle_data['itemName'].apply(lambda x: safe_string(x, "")).str.strip()
-                    valid_items = valid_items[valid_items != ""]
-                    if not valid_items.empty:
-                        item_counts = valid_items.value_counts().head(3)
-                        top_items = [{"item": item, "count": int(count)} for item, count in item_counts.items()]
-                
+            performance_data = []
+            for vehicle, row in zip(stats.index, stats.itertuples(index=False)):
                 performance_data.append({
-                    'vehicle_plate': vehicle_str,
-                    'total_checks': int(total_checks),
-                    'compliance_rate': float(compliance_rate),
-                    'last_check': last_check.isoformat() if last_check and pd.notna(last_check) else None,
-                    'top_items': top_items,
-                    'status': 'active' if total_checks > 0 else 'inactive'
+                    'vehicle_plate': str(vehicle),
+                    'total_checks': int(row.total_checks),
+                    'compliance_rate': float(row.compliance_rate),
+                    'last_check': row.last_activity.isoformat() if pd.notna(row.last_activity) else None,
+                    'top_items': top_items.get(vehicle, []),
+                    'status': 'active' if row.total_checks > 0 else 'inactive'
                 })
             
-            # Ordenar por taxa de conformidade
-            performance_data.sort(key=lambda x: safe_number(x['compliance_rate'], 0), reverse=True)
             return performance_data
             
         except Exception as e:
@@ -420,54 +973,19 @@ class FleetDataProcessor:
             if checklist_df.empty or 'driverName' not in checklist_df.columns:
                 return []
             
-            driver_performance = []
+            frame = self._performance_frame(checklist_df)
+            stats = self._aggregate_performance(frame, 'driverName')
             
-            for driver in checklist_df['driverName'].unique():
-                driver_str = safe_string(driver, "")
-                if driver_str == "" or driver_str == "N/A":
-                    continue
-                    
-                driver_data = checklist_df[checklist_df['driverName'] == driver]
-                
-                total_checks = len(driver_data)
-                
-                # Calcular conformidade com validação
-                compliant_checks = 0
-                if 'noCompliant' in driver_data.columns:
-                    compliant_mask = driver_data['noCompliant'].apply(lambda x: not safe_bool(x, False))
-                    compliant_checks = int(compliant_mask.sum())
-                elif 'compliant' in driver_data.columns:
-                    compliant_mask = driver_data['compliant'].apply(lambda x: safe_bool(x, True))
-                    compliant_checks = int(compliant_mask.sum())
-                else:
-                    compliant_checks = total_checks
-                
-                compliance_rate = safe_percentage(compliant_checks, total_checks)
-                
-                # Veículos operados com validação
-                vehicles_operated = 0
-                if 'vehiclePlate' in driver_data.columns:
-                    valid_plates = driver_data['vehiclePlate'].apply(lambda x: safe_string(x, "")).str.strip()
-                    valid_plates = valid_plates[valid_plates != ""]
-                    vehicles_operated = len(valid_plates.unique()) if not valid_plates.empty else 0
-                
-                # Última atividade com validação
-                last_activity = None
-                if 'timestamp' in driver_data.columns:
-                    valid_timestamps = driver_data['timestamp'].dropna()
-                    if not valid_timestamps.empty:
-                        last_activity = valid_timestamps.max()
-                
+            driver_performance = []
+            for driver, row in zip(stats.index, stats.itertuples(index=False)):
                 driver_performance.append({
-                    'driver_name': driver_str,
-                    'total_checks': int(total_checks),
-                    'compliance_rate': float(compliance_rate),
-                    'vehicles_operated': int(vehicles_operated),
-                    'last_activity': last_activity.isoformat() if last_activity and pd.notna(last_activity) else None
+                    'driver_name': str(driver),
+                    'total_checks': int(row.total_checks),
+                    'compliance_rate': float(row.compliance_rate),
+                    'vehicles_operated': int(row.vehicles_operated),
+                    'last_activity': row.last_activity.isoformat() if pd.notna(row.last_activity) else None
                 })
             
-            # Ordenar por taxa de conformidade
-            driver_performance.sort(key=lambda x: safe_number(x['compliance_rate'], 0), reverse=True)
             return driver_performance
             
         except Exception as e:
@@ -485,51 +1003,35 @@ class FleetDataProcessor:
             alerts = []
             
             # Veículos com muitas não conformidades
-            non_compliant = pd.DataFrame()
-            
-            if 'noCompliant' in checklist_df.columns:
-                non_compliant_mask = checklist_df['noCompliant'].apply(lambda x: safe_bool(x, False))
-                non_compliant = checklist_df[non_compliant_mask]
-            elif 'compliant' in checklist_df.columns:
-                non_compliant_mask = checklist_df['compliant'].apply(lambda x: not safe_bool(x, True))
-                non_compliant = checklist_df[non_compliant_mask]
+            non_compliant = checklist_df[~checklist_df['is_compliant']]
             
             if not non_compliant.empty and 'vehiclePlate' in non_compliant.columns:
-                # Filtrar veículos válidos
-                valid_vehicles = non_compliant['vehiclePlate'].apply(lambda x: safe_string(x, "")).str.strip()
-                valid_vehicles = valid_vehicles[valid_vehicles != ""]
+                vehicle_issues = non_compliant['vehiclePlate'].value_counts().head(5)
                 
-                if not valid_vehicles.empty:
-                    vehicle_issues = valid_vehicles.value_counts().head(5)
-                    
-                    for vehicle, count in vehicle_issues.items():
-                        if count >= 2:  # Threshold reduzido para alerta
-                            priority = 'high' if count >= 3 else 'medium'
-                            alerts.append({
-                                'type': 'maintenance_required',
-                                'vehicle': safe_string(vehicle),
-                                'issue_count': int(count),
-                                'priority': priority,
-                                'message': f'Veículo {safe_string(vehicle)} tem {int(count)} não conformidades recentes'
-                            })
+                for vehicle, count in vehicle_issues.items():
+                    if count >= 2:  # Threshold reduzido para alerta
+                        priority = 'high' if count >= 3 else 'medium'
+                        alerts.append({
+                            'type': 'maintenance_required',
+                            'vehicle': safe_string(vehicle),
+                            'issue_count': int(count),
+                            'priority': priority,
+                            'message': f'Veículo {safe_string(vehicle)} tem {int(count)} não conformidades recentes'
+                        })
             
             # Alertas de itens específicos
             if 'itemName' in checklist_df.columns and not non_compliant.empty:
-                valid_items = non_compliant['itemName'].apply(lambda x: safe_string(x, "")).str.strip()
-                valid_items = valid_items[valid_items != ""]
+                critical_items = non_compliant['itemName'].value_counts().head(3)
                 
-                if not valid_items.empty:
-                    critical_items = valid_items.value_counts().head(3)
-                    
-                    for item, count in critical_items.items():
-                        if count >= 2:
-                            alerts.append({
-                                'type': 'item_alert',
-                                'item': safe_string(item),
-                                'issue_count': int(count),
-                                'priority': 'medium',
-                                'message': f'Item "{safe_string(item)}" apresenta {int(count)} não conformidades'
-                            })
+                for item, count in critical_items.items():
+                    if count >= 2:
+                        alerts.append({
+                            'type': 'item_alert',
+                            'item': safe_string(item),
+                            'issue_count': int(count),
+                            'priority': 'medium',
+                            'message': f'Item "{safe_string(item)}" apresenta {int(count)} não conformidades'
+                        })
             
             # Se não há alertas, retornar lista vazia (não None)
             return alerts if alerts else []
@@ -0,0 +1,242 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Exportação em Streaming: Excel (write-only), CSV, JSON e NDJSON em Blocos
+"""
+
+import io
+import csv
+import json
+import logging
+import tempfile
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+except ImportError:
+    Workbook = None
+
+try:
+    from src.fleet_paging import to_records
+except ImportError:
+    from fleet_paging import to_records
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Arquivos acima disso saem da memória para o disco enquanto o XLSX é montado
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+TITLE_FONT = {'size': 14, 'bold': True, 'color': '2E86AB'}
+
+# Formatos de resposta em streaming e o mimetype de cada um
+STREAM_MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Marcador do ponto do envelope JSON onde entram os registros
+_ROWS_MARKER = '__fleet_stream_rows__'
+
+def require_openpyxl():
+    """Falha com mensagem clara quando o openpyxl não está instalado"""
+    if Workbook is None:
+        raise RuntimeError("openpyxl não instalado: exportação XLSX indisponível")
+
+def plain_value(value: Any) -> Any:
+    """Valor aceito pelo openpyxl/CSV: NaN/NaT viram None, datas perdem o fuso, numpy vira Python"""
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        if pd.isna(value):
+            return None
+        return (value.tz_convert(None) if value.tzinfo else value).to_pydatetime()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+def frame_rows(frame: pd.DataFrame, chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[List[Any]]:
+    """Linhas do DataFrame como listas, convertidas bloco a bloco (nunca o frame inteiro de uma vez)"""
+    for start in range(0, len(frame), chunk_size):
+        chunk = frame.iloc[start:start + chunk_size]
+        for row in chunk.itertuples(index=False, name=None):
+            yield [plain_value(value) for value in row]
+
+def flatten_items(data: Any, prefix: str = '') -> Iterator[Tuple[str, Any]]:
+    """Percorre dicionários/listas aninhados gerando (caminho, valor) para cada folha"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from flatten_items(value, f'{prefix}.{key}' if prefix else str(key))
+    elif isinstance(data, (list, tuple)):
+        for index, value in enumerate(data):
+            yield from flatten_items(value, f'{prefix}[{index}]')
+    else:
+        yield prefix, plain_value(data)
+
+def write_sheet(workbook, title: str, header: Sequence[str], rows: Iterable[Sequence[Any]],
+                heading: str = None, widths: Sequence[float] = None, header_style: Dict[str, Any] = None):
+    """Escreve uma aba linha a linha em um Workbook(write_only=True)
+
+    As larguras precisam ser definidas antes da primeira linha; o título
+    (heading) ocupa a linha 1 e o cabeçalho estilizado vem em seguida.
+    As linhas já devem ter valores simples (ver frame_rows/plain_value);
+    só a linha atual fica em memória.
+    """
+    worksheet = workbook.create_sheet(title)
+    for index, width in enumerate(widths or []):
+        worksheet.column_dimensions[chr(65 + index)].width = width
+
+    if heading:
+        cell = WriteOnlyCell(worksheet, value=heading)
+        cell.font = Font(**TITLE_FONT)
+        worksheet.append([cell])
+
+    header_cells = []
+    for name in header:
+        cell = WriteOnlyCell(worksheet, value=name)
+        for attribute, style in (header_style or {}).items():
+            setattr(cell, attribute, style)
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
+    count = 0
+    for row in rows:
+        worksheet.append(row)
+        count += 1
+    return count
+
+def header_style() -> Dict[str, Any]:
+    """Estilo do cabeçalho das abas (mesmo do relatório)"""
+    return {
+        'font': Font(bold=True, color='FFFFFF'),
+        'fill': PatternFill(start_color='2E86AB', end_color='2E86AB', fill_type='solid'),
+        'alignment': Alignment(horizontal='center', vertical='center')
+    }
+
+def iter_csv(frame: pd.DataFrame, header: Sequence[str] = None,
+             chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """CSV em blocos de chunk_size linhas; o primeiro bloco (com BOM, para o Excel) sai imediatamente"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(header) if header is not None else list(frame.columns))
+    yield '\ufeff' + buffer.getvalue()
+
+    for start in range(0, len(frame), chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        chunk = frame.iloc[start:start + chunk_size]
+        writer.writerows([plain_value(value) for value in row]
+                         for row in chunk.itertuples(index=False, name=None))
+        yield buffer.getvalue()
+
+def iter_xlsx(sheets: Iterable[Dict[str, Any]],
+              chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Monta um XLSX write-only e o entrega em blocos de bytes
+
+    Cada item de sheets tem title, header, rows e opcionalmente heading e
+    widths. O XLSX é um zip e só fica completo no save, então o arquivo é
+    montado em um temporário (memória até SPOOL_MAX_BYTES, depois disco) e
+    lido em blocos; a memória fica limitada às linhas em escrita.
+    """
+    require_openpyxl()
+    workbook = Workbook(write_only=True)
+    style = header_style()
+    for sheet in sheets:
+        write_sheet(workbook, sheet['title'], sheet['header'], sheet['rows'],
+                    heading=sheet.get('heading'), widths=sheet.get('widths'), header_style=style)
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            block = spool.read(chunk_bytes)
+            if not block:
+                break
+            yield block
+
+def stream_format(args, accept: str = '') -> Optional[str]:
+    """Formato de streaming pedido: ?stream=json|ndjson ou Accept: application/x-ndjson
+
+    None quando a resposta normal (inteira) foi pedida; ValueError para
+    formato desconhecido.
+    """
+    fmt = (args.get('stream') or '').lower()
+    if not fmt and 'application/x-ndjson' in (accept or ''):
+        fmt = 'ndjson'
+    if not fmt or fmt in ('0', 'false'):
+        return None
+    if fmt in ('1', 'true'):
+        return 'json'
+    if fmt not in STREAM_MIMETYPES:
+        raise ValueError(f"stream deve ser um de: {', '.join(STREAM_MIMETYPES)}")
+    return fmt
+
+def _rows_frame(rows: Any) -> pd.DataFrame:
+    return rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows or []))
+
+def _json_default(value: Any) -> Any:
+    """Tipos fora do JSON padrão: numpy vira Python, datas em ISO, o resto como texto"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+def _json_chunks(frame: pd.DataFrame, chunk_size: int) -> Iterator[List[str]]:
+    """Registros do frame serializados bloco a bloco (mesma conversão das tabelas paginadas)"""
+    for start in range(0, len(frame), chunk_size):
+        yield [_dumps(record) for record in to_records(frame.iloc[start:start + chunk_size], decimals=None)]
+
+def iter_json(rows: Any, envelope: Dict[str, Any] = None, path: Sequence[str] = ('data',),
+              chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """Documento JSON em blocos: o envelope com o array de registros no caminho path
+
+    O resultado é o mesmo JSON da resposta inteira, mas o início do envelope
+    sai antes de qualquer registro e cada bloco de chunk_size linhas é
+    serializado só quando vai ser enviado.
+    """
+    frame = _rows_frame(rows)
+    document = json.loads(_dumps(envelope or {}))
+    node = document
+    for key in path[:-1]:
+        node = node.setdefault(key, {})
+    node[path[-1]] = _ROWS_MARKER
+    head, tail = _dumps(document).split(f'"{_ROWS_MARKER}"', 1)
+
+    yield head + '['
+    first = True
+    for records in _json_chunks(frame, chunk_size):
+        yield ('' if first else ',') + ','.join(records)
+        first = False
+    yield ']' + tail
+
+def iter_ndjson(rows: Any, envelope: Dict[str, Any] = None,
+                chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """NDJSON em blocos: um registro por linha; com envelope, a primeira linha traz os metadados"""
+    frame = _rows_frame(rows)
+    if envelope:
+        yield _dumps(envelope) + '\n'
+    for records in _json_chunks(frame, chunk_size):
+        yield '\n'.join(records) + '\n'
+
+def iter_stream(fmt: str, rows: Any, envelope: Dict[str, Any] = None, path: Sequence[str] = ('data',),
+                chunk_size: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """Gerador do formato pedido (ver stream_format): JSON com envelope ou NDJSON"""
+    if fmt == 'ndjson':
+        return iter_ndjson(rows, envelope, chunk_size)
+    return iter_json(rows, envelope, path, chunk_size)
@@ -0,0 +1,335 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Análise de Combustível - Abastecimentos Alelo (alelo-supply-history)
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.fleet_cache import ResponseCache
+    from src.fleet_maintenance import is_truthy, parse_dates
+    from src.fleet_paging import paginate, to_records
+except ImportError:
+    from fleet_cache import ResponseCache
+    from fleet_maintenance import is_truthy, parse_dates
+    from fleet_paging import paginate, to_records
+
+logger = logging.getLogger(__name__)
+
+# Campo normalizado -> campos de origem, em ordem de preferência (formato Alelo primeiro)
+SUPPLY_FIELDS = {
+    'vehiclePlate': ['VehiclePlate', 'vehiclePlate'],
+    'driverName': ['DriverName', 'driverName'],
+    'fuelType': ['FuelType', 'fuelType'],
+    'liters': ['AmountLiters', 'liters'],
+    'totalCost': ['StockedValue', 'totalCost'],
+    'unitValue': ['UnitValue', 'unitValue'],
+    'kmTraveled': ['KmTraveled', 'kmTraveled'],
+    'stationName': ['SupplyLocation', 'stationName'],
+    'state': ['MerchantState', 'state'],
+    'date': ['Timestamp', 'TransactionDate', 'date'],
+    'transactionStatus': ['TransactionStatus', 'status'],
+    'odometer': ['Odometer', 'odometer'],
+    'previousOdometer': ['PreviousOdometer', 'previousOdometer']
+}
+NUMERIC_FIELDS = ['liters', 'totalCost', 'unitValue', 'kmTraveled', 'odometer', 'previousOdometer']
+TEXT_FIELDS = ['vehiclePlate', 'driverName', 'fuelType', 'stationName', 'state', 'transactionStatus']
+
+# Campos lidos da API (projeção na ingestão)
+SUPPLY_COLUMNS = [column for sources in SUPPLY_FIELDS.values() for column in sources]
+
+# Filtro da tela -> coluna do abastecimento (comparação por igualdade)
+EQUALITY_FILTERS = {
+    'plate': 'vehiclePlate',
+    'driver': 'driverName',
+    'fuelType': 'fuelType',
+    'state': 'state'
+}
+
+# Limites das regras de anomalia
+PRICE_TOLERANCE = 0.20          # desvio do preço/L em relação à mediana do combustível
+LITERS_OUTLIER_FACTOR = 2.5     # litros acima de N vezes a mediana do veículo
+EFFICIENCY_DROP_FACTOR = 0.6    # km/L abaixo de N vezes a mediana do veículo
+MAX_KM_PER_LITER = 30.0         # km/L acima disso indica hodômetro errado
+MIN_REFUEL_INTERVAL = pd.Timedelta(hours=2)
+MIN_SUPPLIES_FOR_BASELINE = 3
+
+ANOMALY_RULES = ['odometer_regression', 'price_outlier', 'liters_outlier',
+                 'efficiency_drop', 'implausible_efficiency', 'rapid_refuel']
+
+SUPPLY_TABLE_COLUMNS = ['date', 'vehiclePlate', 'driverName', 'fuelType', 'liters', 'totalCost',
+                        'pricePerLiter', 'kmTraveled', 'kmSource', 'kmPerLiter', 'costPerKm',
+                        'stationName', 'state', 'anomalies']
+
+def parse_decimal(values: pd.Series) -> pd.Series:
+    """Números no formato brasileiro ('1.234,56') ou já numéricos; inválidos viram 0"""
+    text = values.astype('string').str.strip()
+    has_comma = text.str.contains(',', regex=False).fillna(False)
+    text = text.where(~has_comma, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(text, errors='coerce').fillna(0.0).astype(float)
+
+def coalesce(raw: pd.DataFrame, sources: List[str]) -> pd.Series:
+    """Primeiro valor preenchido entre os campos de origem (equivalente a `a || b`)"""
+    result = pd.Series(np.nan, index=raw.index, dtype=object)
+    for column in reversed(sources):
+        if column in raw.columns:
+            result = raw[column].where(is_truthy(raw[column]), result)
+    return result
+
+def br_number(value: float, decimals: int = 2) -> str:
+    """Número no formato brasileiro (1.234,56)"""
+    return f"{value:,.{decimals}f}".translate(str.maketrans(',.', '.,'))
+
+def safe_ratio(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """Razão apenas onde numerador e denominador são positivos; demais linhas ficam 0"""
+    valid = (numerator > 0) & (denominator > 0)
+    return (numerator / denominator.where(valid)).where(valid, 0.0)
+
+def normalize_supplies(raw: pd.DataFrame) -> pd.DataFrame:
+    """Abastecimentos com campos normalizados, quilometragem reconstruída e indicadores por linha"""
+    supplies = pd.DataFrame(index=raw.index)
+    for field, sources in SUPPLY_FIELDS.items():
+        supplies[field] = coalesce(raw, sources)
+    for field in NUMERIC_FIELDS:
+        supplies[field] = parse_decimal(supplies[field])
+    for field in TEXT_FIELDS:
+        supplies[field] = supplies[field].fillna('').astype(str).str.strip()
+    supplies['date'] = parse_dates(supplies['date'])
+
+    # Ordem cronológica por veículo para comparar com o abastecimento anterior
+    supplies = supplies.sort_values(['vehiclePlate', 'date'], kind='stable').reset_index(drop=True)
+    supplies = reconstruct_km(supplies)
+
+    supplies['pricePerLiter'] = safe_ratio(supplies['totalCost'], supplies['liters'])
+    supplies['pricePerLiter'] = supplies['pricePerLiter'].where(supplies['pricePerLiter'] > 0,
+                                                                supplies['unitValue'])
+    supplies['kmPerLiter'] = safe_ratio(supplies['kmTraveled'], supplies['liters'])
+    supplies['costPerKm'] = safe_ratio(supplies['totalCost'], supplies['kmTraveled'])
+    return flag_anomalies(supplies)
+
+def reconstruct_km(supplies: pd.DataFrame) -> pd.DataFrame:
+    """Km rodados de cada abastecimento
+
+    Ordem de preferência: KmTraveled informado; odometer - previousOdometer;
+    odometer menos o hodômetro do abastecimento anterior do mesmo veículo.
+    A origem fica em kmSource ('reported', 'odometer', 'sequence' ou 'none').
+    """
+    odometer = supplies['odometer'].where(supplies['odometer'] > 0)
+    previous_reported = supplies['previousOdometer'].where(supplies['previousOdometer'] > 0)
+    previous_in_sequence = odometer.groupby(supplies['vehiclePlate']).shift()
+    supplies['previousKnownOdometer'] = previous_reported.fillna(previous_in_sequence)
+
+    from_reported = odometer - previous_reported
+    from_sequence = odometer - previous_in_sequence
+    reported = supplies['kmTraveled'] > 0
+
+    conditions = [reported, from_reported > 0, from_sequence > 0]
+    supplies['kmSource'] = np.select(conditions, ['reported', 'odometer', 'sequence'], default='none')
+    supplies['kmTraveled'] = np.select(
+        conditions, [supplies['kmTraveled'], from_reported, from_sequence], default=0.0
+    ).astype(float)
+    return supplies
+
+def flag_anomalies(supplies: pd.DataFrame) -> pd.DataFrame:
+    """Marca abastecimentos suspeitos; cada regra vira uma coluna booleana e a lista fica em anomalies"""
+    by_plate = supplies.groupby('vehiclePlate')
+    plate_count = by_plate['liters'].transform('size')
+    has_baseline = plate_count >= MIN_SUPPLIES_FOR_BASELINE
+
+    price = supplies['pricePerLiter']
+    fuel_median = price.where(price > 0).groupby(supplies['fuelType']).transform('median')
+    liters_median = supplies['liters'].where(supplies['liters'] > 0).groupby(supplies['vehiclePlate']).transform('median')
+    efficiency = supplies['kmPerLiter']
+    efficiency_median = efficiency.where(efficiency > 0).groupby(supplies['vehiclePlate']).transform('median')
+    interval = by_plate['date'].diff()
+
+    flags = pd.DataFrame({
+        'odometer_regression': (supplies['odometer'] > 0)
+                               & (supplies['odometer'] < supplies['previousKnownOdometer']),
+        'price_outlier': (price > 0) & ((price / fuel_median - 1).abs() > PRICE_TOLERANCE),
+        'liters_outlier': has_baseline & (supplies['liters'] > liters_median * LITERS_OUTLIER_FACTOR),
+        'efficiency_drop': has_baseline & (efficiency > 0) & (efficiency < efficiency_median * EFFICIENCY_DROP_FACTOR),
+        'implausible_efficiency': efficiency > MAX_KM_PER_LITER,
+        'rapid_refuel': interval < MIN_REFUEL_INTERVAL
+    }).fillna(False).astype(bool)
+
+    supplies[ANOMALY_RULES] = flags[ANOMALY_RULES]
+    supplies['anomalyCount'] = flags.sum(axis=1).astype(int)
+    names = np.array(ANOMALY_RULES, dtype=object)
+    supplies['anomalies'] = [list(names[row]) for row in flags[ANOMALY_RULES].to_numpy()]
+    return supplies
+
+def filter_supplies(supplies: pd.DataFrame, filters: Dict[str, str]) -> pd.DataFrame:
+    """Filtros da tela: período (dias inteiros) e igualdade por placa, motorista, combustível e estado"""
+    mask = pd.Series(True, index=supplies.index)
+    start = pd.to_datetime(filters.get('startDate') or None, errors='coerce', utc=True)
+    end = pd.to_datetime(filters.get('endDate') or None, errors='coerce', utc=True)
+    if pd.notna(start):
+        mask &= supplies['date'] >= start
+    if pd.notna(end):
+        mask &= supplies['date'] < end + pd.Timedelta(days=1)
+    for name, column in EQUALITY_FILTERS.items():
+        if filters.get(name):
+            mask &= supplies[column] == filters[name]
+    return supplies[mask]
+
+def rollup(supplies: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Consumo e custo agregados por chave (placa, combustível, estado ou mês)
+
+    km/L e custo/km usam só os abastecimentos com km conhecido, para que
+    litros sem quilometragem não derrubem a média.
+    """
+    with_km = supplies['kmTraveled'] > 0
+    frame = supplies.assign(
+        kmLiters=supplies['liters'].where(with_km, 0.0),
+        kmCost=supplies['totalCost'].where(with_km, 0.0)
+    )
+    grouped = frame.groupby(key, sort=False).agg(
+        supplies=('liters', 'size'),
+        liters=('liters', 'sum'),
+        totalCost=('totalCost', 'sum'),
+        kmTraveled=('kmTraveled', 'sum'),
+        kmLiters=('kmLiters', 'sum'),
+        kmCost=('kmCost', 'sum'),
+        anomalies=('anomalyCount', 'sum'),
+        lastSupply=('date', 'max')
+    )
+    grouped['pricePerLiter'] = safe_ratio(grouped['totalCost'], grouped['liters'])
+    grouped['kmPerLiter'] = safe_ratio(grouped['kmTraveled'], grouped['kmLiters'])
+    grouped['costPerKm'] = safe_ratio(grouped['kmCost'], grouped['kmTraveled'])
+    return grouped.drop(columns=['kmLiters', 'kmCost']).reset_index()
+
+def summarize_supplies(supplies: pd.DataFrame) -> Dict[str, Any]:
+    """Métricas dos cards, gráficos e insights do período filtrado"""
+    total_liters = float(supplies['liters'].sum())
+    total_cost = float(supplies['totalCost'].sum())
+    efficiency = supplies['kmPerLiter'][supplies['kmPerLiter'] > 0]
+    cost_per_km = supplies['costPerKm'][supplies['costPerKm'] > 0]
+
+    monthly = rollup(supplies.assign(month=supplies['date'].dt.strftime('%Y-%m')).dropna(subset=['month']),
+                     'month').sort_values('month')
+    by_fuel = rollup(supplies, 'fuelType').sort_values('liters', ascending=False)
+    by_state = rollup(supplies, 'state').sort_values('totalCost', ascending=False)
+    by_vehicle = rollup(supplies, 'vehiclePlate')
+    top_efficiency = by_vehicle[by_vehicle['kmPerLiter'] > 0].nlargest(10, 'kmPerLiter')
+
+    metrics = {
+        'total_supplies': int(len(supplies)),
+        'total_liters': round(total_liters, 2),
+        'total_cost': round(total_cost, 2),
+        'avg_price_per_liter': round(total_cost / total_liters, 3) if total_liters > 0 else 0.0,
+        'avg_km_per_liter': round(float(efficiency.mean()), 2) if len(efficiency) else 0.0,
+        'avg_cost_per_km': round(float(cost_per_km.mean()), 3) if len(cost_per_km) else 0.0,
+        'total_km': round(float(supplies['kmTraveled'].sum()), 1),
+        'vehicles': int(supplies['vehiclePlate'].replace('', np.nan).nunique()),
+        'anomalous_supplies': int((supplies['anomalyCount'] > 0).sum())
+    }
+
+    return {
+        'metrics': metrics,
+        'anomalies': {rule: int(supplies[rule].sum()) for rule in ANOMALY_RULES},
+        'km_sources': {source: int(count) for source, count in supplies['kmSource'].value_counts().items()},
+        'charts': {
+            'monthly': {
+                'labels': monthly['month'].tolist(),
+                'liters': monthly['liters'].round(2).tolist(),
+                'cost': monthly['totalCost'].round(2).tolist()
+            },
+            'fuel_type_liters': dict(zip(by_fuel['fuelType'], by_fuel['liters'].round(2))),
+            'state_cost': dict(zip(by_state['state'], by_state['totalCost'].round(2))),
+            'top_efficiency': dict(zip(top_efficiency['vehiclePlate'], top_efficiency['kmPerLiter'].round(2)))
+        },
+        'by_fuel_type': to_records(by_fuel),
+        'by_state': to_records(by_state),
+        'insights': fuel_insights(metrics, by_fuel, supplies)
+    }
+
+def fuel_insights(metrics: Dict[str, Any], by_fuel: pd.DataFrame, supplies: pd.DataFrame) -> List[str]:
+    """Frases de insight do painel, com as mesmas regras da tela"""
+    if supplies.empty:
+        return []
+    insights = [f"Total de {br_number(metrics['total_liters'], 0)} litros consumidos, custando "
+                f"R$ {br_number(metrics['total_cost'])}."]
+
+    efficiency = metrics['avg_km_per_liter']
+    if efficiency > 10:
+        insights.append(f"Excelente eficiência média de {efficiency:.1f} km/L na frota.")
+    elif 0 < efficiency < 6:
+        insights.append(f"Atenção: Eficiência média baixa de {efficiency:.1f} km/L. Considere revisão da frota.")
+
+    if not by_fuel.empty and metrics['total_liters'] > 0:
+        top = by_fuel.iloc[0]
+        insights.append(f"{top['fuelType']} é o combustível mais utilizado, representando "
+                        f"{top['liters'] / metrics['total_liters'] * 100:.1f}% do consumo.")
+
+    prices = supplies['pricePerLiter'][supplies['pricePerLiter'] > 0]
+    if len(prices):
+        low, high = float(prices.min()), float(prices.max())
+        variation = (high - low) / low * 100
+        if variation > 20:
+            insights.append(f"Grande variação de preços detectada: de R$ {low:.2f} a R$ {high:.2f} "
+                            f"por litro ({variation:.1f}% de diferença).")
+
+    if metrics['anomalous_supplies']:
+        insights.append(f"{metrics['anomalous_supplies']} abastecimentos com anomalias "
+                        f"(hodômetro, preço, volume ou eficiência) merecem verificação.")
+    return insights
+
+class FleetFuelEngine:
+    """Calcula os indicadores de combustível a partir do histórico de abastecimentos Alelo"""
+
+    def __init__(self, connector, cache: Optional[ResponseCache] = None):
+        self.connector = connector
+        self.cache = cache if cache is not None else connector.cache
+
+    def load_supplies(self, enterprise_id: str) -> pd.DataFrame:
+        """Busca os abastecimentos da empresa (só os campos usados na análise)"""
+        return self.connector.get_collection_data('/alelo-supply-history', enterprise_id, columns=SUPPLY_COLUMNS)
+
+    def facets(self, supplies: pd.DataFrame) -> Dict[str, List[str]]:
+        """Valores distintos e ordenados de cada filtro da tela"""
+        return {name: sorted(value for value in supplies[column].unique() if value)
+                for name, column in EQUALITY_FILTERS.items()}
+
+    def build_analytics(self, raw: pd.DataFrame, filters: Dict[str, str] = None, page: int = 1,
+                        per_page: int = 50, vehicle_page: int = 1, vehicle_per_page: int = 20) -> Dict[str, Any]:
+        """Análise completa: agregados do período, página do ranking de veículos e página dos abastecimentos"""
+        supplies = normalize_supplies(raw)
+        filtered = filter_supplies(supplies, filters or {})
+
+        result = summarize_supplies(filtered)
+        result['facets'] = self.facets(supplies)
+
+        vehicles = rollup(filtered, 'vehiclePlate').sort_values('liters', ascending=False, kind='stable')
+        vehicle_frame, result['vehicles_pagination'] = paginate(vehicles, vehicle_page, vehicle_per_page)
+        result['vehicles'] = to_records(vehicle_frame)
+
+        latest = filtered.sort_values('date', ascending=False, kind='stable')
+        supply_frame, result['pagination'] = paginate(latest, page, per_page)
+        result['supplies'] = to_records(supply_frame[SUPPLY_TABLE_COLUMNS])
+        return result
+
+    def analytics(self, enterprise_id: str, filters: Dict[str, str] = None, page: int = 1, per_page: int = 50,
+                  vehicle_page: int = 1, vehicle_per_page: int = 20) -> Dict[str, Any]:
+        """Análise da empresa com cache por (empresa, filtros, páginas)"""
+        filters = {name: value for name, value in (filters or {}).items() if value}
+        cache_key = ResponseCache.make_key('/fuel/analytics', {
+            'enterpriseId': enterprise_id, 'page': page, 'perPage': per_page,
+            'vehiclePage': vehicle_page, 'vehiclePerPage': vehicle_per_page, **filters
+        })
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        result = self.build_analytics(self.load_supplies(enterprise_id), filters, page, per_page,
+                                      vehicle_page, vehicle_per_page)
+        result['generated_at'] = datetime.now().isoformat()
+        if self.cache:
+            self.cache.set(cache_key, result)
+        return result
@@ -0,0 +1,142 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Respostas HTTP Comprimidas (gzip/br) e Condicionais (ETag/304)
+"""
+
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Iterable, Iterator, Tuple
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Tipos de conteúdo que valem a pena comprimir (imagens PNG, XLSX e PDF já são comprimidos)
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml'
+}
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    """Texto, JSON e afins; binários já comprimidos ficam de fora"""
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+class ResponseOptimizer:
+    """Compressão e validação condicional das respostas (usado no after_request)
+
+    - Respostas GET/HEAD 200 com corpo pronto (templates dos BIs e JSON)
+      recebem um ETag com o hash do conteúdo e Cache-Control: no-cache; o
+      cliente revalida com If-None-Match e recebe 304 sem corpo se nada mudou.
+    - O corpo é comprimido com br (se o módulo brotli estiver instalado) ou
+      gzip, conforme o Accept-Encoding. O ETag leva o sufixo da codificação,
+      já que os bytes enviados são outros.
+    - Corpos comprimidos ficam em um LRU pequeno pelo hash: o mesmo template
+      ou widget não é recomprimido a cada abertura do WebView.
+    - Respostas em streaming (JSON em blocos/NDJSON) são comprimidas bloco a
+      bloco, com flush a cada bloco para não atrasar o primeiro byte; não
+      recebem ETag, já que o corpo não existe inteiro.
+    - Arquivos (send_file) e respostas já codificadas passam intactos.
+    """
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 memo_entries: int = 64, memo_max_bytes: int = 2 * 1024 * 1024):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.memo_entries = memo_entries
+        self.memo_max_bytes = memo_max_bytes
+        self._memo: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encodings(self) -> list:
+        """Codificações suportadas, na ordem de preferência"""
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def negotiate(self) -> Optional[str]:
+        """Melhor codificação aceita pelo cliente (None = sem compressão)"""
+        return request.accept_encodings.best_match(self.encodings())
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def _compressed(self, digest: str, data: bytes, encoding: str) -> bytes:
+        """Corpo comprimido, reaproveitado do LRU quando o mesmo conteúdo já foi comprimido"""
+        key = (digest, encoding)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        body = self.compress(data, encoding)
+        if len(body) <= self.memo_max_bytes:
+            with self._lock:
+                self._memo[key] = body
+                while len(self._memo) > self.memo_entries:
+                    self._memo.popitem(last=False)
+        return body
+
+    def compress_stream(self, chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+        """Comprime um corpo em streaming, liberando cada bloco assim que chega"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            for chunk in chunks:
+                block = compressor.process(chunk) + compressor.flush()
+                if block:
+                    yield block
+            yield compressor.finish()
+            return
+
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            block = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if block:
+                yield block
+        yield compressor.flush()
+
+    def process(self, response):
+        """Aplica ETag/304 e compressão à resposta, quando cabível"""
+        if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+                or response.direct_passthrough or 'Content-Encoding' in response.headers):
+            return response
+
+        compressible = is_compressible(response.mimetype)
+        encoding = self.negotiate() if compressible else None
+        if compressible:
+            response.vary.add('Accept-Encoding')
+
+        if response.is_streamed:
+            if encoding:
+                response.response = self.compress_stream(response.iter_encoded(), encoding)
+                response.headers['Content-Encoding'] = encoding
+                response.headers.pop('Content-Length', None)
+            return response
+
+        data = response.get_data()
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        encoding = encoding if encoding and len(data) >= self.min_size else None
+
+        response.set_etag(f'{digest}-{encoding}' if encoding else digest)
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+        if encoding:
+            response.set_data(self._compressed(digest, data, encoding))
+            response.headers['Content-Encoding'] = encoding
+        return response
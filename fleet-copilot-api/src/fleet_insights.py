@@ -13,6 +13,11 @@ from dataclasses import dataclass
 from collections import defaultdict
 import statistics
 
+try:
+    from src.fleet_trends import FleetTrendEngine, entity_records
+except ImportError:
+    from fleet_trends import FleetTrendEngine, entity_records
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -45,6 +50,7 @@ class FleetInsightsEngine:
         self.data_processor = data_processor
         self.insights_history = []
         self.alerts_history = []
+        self.trend_engine = FleetTrendEngine()
         
         # Thresholds configuráveis
         self.thresholds = {
@@ -58,28 +64,35 @@ class FleetInsightsEngine:
             'performance_decline_threshold': 10.0
         }
     
-    def generate_comprehensive_analysis(self, enterprise_id: str = None, days: int = 30) -> Dict[str, Any]:
-        """Gera análise abrangente da frota"""
+    def generate_comprehensive_analysis(self, enterprise_id: str = None, days: int = 30,
+                                        processor=None) -> Dict[str, Any]:
+        """Gera análise abrangente da frota (processor: snapshot da mesma janela já aberto pelo chamador)"""
         logger.info(f"Gerando análise abrangente para os últimos {days} dias")
         
+        # Snapshot único da janela: cada collection é buscada uma vez e
+        # compartilhada por todas as análises abaixo
+        processor = processor or self.data_processor.with_snapshot(enterprise_id, days)
+        processor.connector.prefetch(['checklist', 'alerts_checkin'])
+        
         analysis = {
-            'summary': self._generate_summary_insights(enterprise_id, days),
-            'vehicle_insights': self._analyze_vehicle_performance(enterprise_id, days),
-            'driver_insights': self._analyze_driver_performance(enterprise_id, days),
-            'maintenance_insights': self._analyze_maintenance_patterns(enterprise_id, days),
-            'safety_insights': self._analyze_safety_metrics(enterprise_id, days),
-            'operational_insights': self._analyze_operational_efficiency(enterprise_id, days),
-            'alerts': self._generate_alerts(enterprise_id, days),
-            'recommendations': self._generate_recommendations(enterprise_id, days),
-            'trends': self._analyze_trends(enterprise_id, days),
+            'summary': self._generate_summary_insights(enterprise_id, days, processor),
+            'vehicle_insights': self._analyze_vehicle_performance(enterprise_id, days, processor),
+            'driver_insights': self._analyze_driver_performance(enterprise_id, days, processor),
+            'maintenance_insights': self._analyze_maintenance_patterns(enterprise_id, days, processor),
+            'safety_insights': self._analyze_safety_metrics(enterprise_id, days, processor),
+            'operational_insights': self._analyze_operational_efficiency(enterprise_id, days, processor),
+            'alerts': self._generate_alerts(enterprise_id, days, processor),
+            'recommendations': self._generate_recommendations(enterprise_id, days, processor),
+            'trends': self._analyze_trends(enterprise_id, days, processor),
             'generated_at': datetime.now().isoformat()
         }
         
         return analysis
     
-    def _generate_summary_insights(self, enterprise_id: str, days: int) -> Dict[str, Any]:
+    def _generate_summary_insights(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
         """Gera insights de resumo geral"""
-        summary = self.data_processor.get_checklist_summary(enterprise_id, days)
+        processor = processor or self.data_processor
+        summary = processor.get_checklist_summary(enterprise_id, days)
         
         insights = []
         
@@ -143,9 +156,10 @@ class FleetInsightsEngine:
             'metrics': summary
         }
     
-    def _analyze_vehicle_performance(self, enterprise_id: str, days: int) -> Dict[str, Any]:
+    def _analyze_vehicle_performance(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
         """Analisa performance individual dos veículos"""
-        vehicle_perf = self.data_processor.get_vehicle_performance(enterprise_id, days)
+        processor = processor or self.data_processor
+        vehicle_perf = pd.DataFrame(processor.get_vehicle_performance(enterprise_id, days))
         
         if vehicle_perf.empty:
             return {'insights': [], 'top_performers': [], 'attention_needed': []}
@@ -161,7 +175,7 @@ class FleetInsightsEngine:
         ].sort_values('compliance_rate')
         
         # Insight sobre dispersão de performance
-        compliance_std = vehicle_perf['compliance_rate'].std()
+        compliance_std = float(vehicle_perf['compliance_rate'].std())
         if compliance_std > 15:
             insights.append(Insight(
                 title="Alta Variabilidade na Performance",
@@ -192,13 +206,14 @@ class FleetInsightsEngine:
             'insights': [insight.__dict__ for insight in insights],
             'top_performers': top_performers.to_dict('records'),
             'attention_needed': attention_needed.to_dict('records'),
-            'average_compliance': vehicle_perf['compliance_rate'].mean(),
+            'average_compliance': float(vehicle_perf['compliance_rate'].mean()),
             'total_vehicles_analyzed': len(vehicle_perf)
         }
     
-    def _analyze_driver_performance(self, enterprise_id: str, days: int) -> Dict[str, Any]:
+    def _analyze_driver_performance(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
         """Analisa performance dos motoristas"""
-        driver_perf = self.data_processor.get_driver_performance(enterprise_id, days)
+        processor = processor or self.data_processor
+        driver_perf = pd.DataFrame(processor.get_driver_performance(enterprise_id, days))
         
         if driver_perf.empty:
             return {'insights': [], 'top_performers': [], 'training_needed': []}
@@ -214,7 +229,7 @@ class FleetInsightsEngine:
         ].sort_values('compliance_rate')
         
         # Insight sobre consistência dos motoristas
-        avg_compliance = driver_perf['compliance_rate'].mean()
+        avg_compliance = float(driver_perf['compliance_rate'].mean())
         if avg_compliance >= 90:
             insights.append(Insight(
                 title="Equipe de Motoristas Bem Treinada",
@@ -248,29 +263,31 @@ class FleetInsightsEngine:
             'total_drivers_analyzed': len(driver_perf)
         }
     
-    def _analyze_maintenance_patterns(self, enterprise_id: str, days: int) -> Dict[str, Any]:
+    def _analyze_maintenance_patterns(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
         """Analisa padrões de manutenção"""
+        processor = processor or self.data_processor
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        checklist_df = self.data_processor.connector.get_checklist_data(
+        # Agregados diários da janela (falhas por item e por dia)
+        rollup = processor.connector.get_checklist_rollup(
             enterprise_id=enterprise_id,
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
         )
         
-        if checklist_df.empty:
+        if rollup.empty:
             return {'insights': [], 'common_issues': [], 'maintenance_schedule': []}
         
         insights = []
         
         # Análise de itens mais problemáticos
-        non_compliant = checklist_df[checklist_df['compliant'] == False]
-        if not non_compliant.empty:
-            common_issues = non_compliant['itemName'].value_counts().head(5)
-            
+        common_issues = rollup.item_failures().head(5)
+        common_issues = common_issues[common_issues > 0]  # categorias sem ocorrência
+        
+        if not common_issues.empty:
             most_common_issue = common_issues.index[0]
-            issue_count = common_issues.iloc[0]
+            issue_count = int(common_issues.iloc[0])
             
             insights.append(Insight(
                 title="Item de Manutenção Mais Problemático",
@@ -284,11 +301,11 @@ class FleetInsightsEngine:
             ))
         
         # Análise temporal de manutenção
-        checklist_df['date'] = checklist_df['timestamp'].dt.date
-        daily_issues = checklist_df[checklist_df['compliant'] == False].groupby('date').size()
+        daily = rollup.days.set_index('day')['non_compliant']
+        daily_issues = daily[daily > 0]
         
         if len(daily_issues) > 0:
-            avg_daily_issues = daily_issues.mean()
+            avg_daily_issues = float(daily_issues.mean())
             if avg_daily_issues > 2:
                 insights.append(Insight(
                     title="Alta Frequência de Problemas",
@@ -303,18 +320,19 @@ class FleetInsightsEngine:
         
         return {
             'insights': [insight.__dict__ for insight in insights],
-            'common_issues': common_issues.to_dict() if not non_compliant.empty else {},
-            'total_issues': len(non_compliant),
-            'issues_trend': {str(k): v for k, v in daily_issues.to_dict().items()} if len(daily_issues) > 0 else {}
+            'common_issues': {str(item): int(count) for item, count in common_issues.items()},
+            'total_issues': int(rollup.days['non_compliant'].sum()),
+            'issues_trend': {str(k): int(v) for k, v in daily_issues.items()} if len(daily_issues) > 0 else {}
         }
     
-    def _analyze_safety_metrics(self, enterprise_id: str, days: int) -> Dict[str, Any]:
+    def _analyze_safety_metrics(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
         """Analisa métricas de segurança"""
+        processor = processor or self.data_processor
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
         # Dados de telemática para análise de segurança
-        telemetry_df = self.data_processor.connector.get_alerts_checkin_data(
+        telemetry_df = processor.connector.get_alerts_checkin_data(
             enterprise_id=enterprise_id,
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
@@ -324,8 +342,8 @@ class FleetInsightsEngine:
         
         if not telemetry_df.empty and 'temperature' in telemetry_df.columns:
             # Análise de temperatura
-            avg_temp = telemetry_df['temperature'].mean()
-            max_temp = telemetry_df['temperature'].max()
+            avg_temp = float(telemetry_df['temperature'].mean())
+            max_temp = float(telemetry_df['temperature'].max())
             
             if max_temp > self.thresholds['temperature_critical']:
                 insights.append(Insight(
@@ -352,7 +370,7 @@ class FleetInsightsEngine:
         
         # Análise de bateria baixa
         if not telemetry_df.empty and 'lowBattery' in telemetry_df.columns:
-            low_battery_count = telemetry_df['lowBattery'].sum()
+            low_battery_count = int(telemetry_df['lowBattery'].sum())
             if low_battery_count > 0:
                 insights.append(Insight(
                     title="Alertas de Bateria Baixa",
@@ -368,17 +386,17 @@ class FleetInsightsEngine:
         return {
             'insights': [insight.__dict__ for insight in insights],
             'temperature_stats': {
-                'avg': telemetry_df['temperature'].mean() if not telemetry_df.empty and 'temperature' in telemetry_df.columns else None,
-                'max': telemetry_df['temperature'].max() if not telemetry_df.empty and 'temperature' in telemetry_df.columns else None,
-                'min': telemetry_df['temperature'].min() if not telemetry_df.empty and 'temperature' in telemetry_df.columns else None
+                'avg': float(telemetry_df['temperature'].mean()) if not telemetry_df.empty and 'temperature' in telemetry_df.columns else None,
+                'max': float(telemetry_df['temperature'].max()) if not telemetry_df.empty and 'temperature' in telemetry_df.columns else None,
+                'min': float(telemetry_df['temperature'].min()) if not telemetry_df.empty and 'temperature' in telemetry_df.columns else None
             },
-            'battery_alerts': telemetry_df['lowBattery'].sum() if not telemetry_df.empty and 'lowBattery' in telemetry_df.columns else 0
+            'battery_alerts': int(telemetry_df['lowBattery'].sum()) if not telemetry_df.empty and 'lowBattery' in telemetry_df.columns else 0
         }
     
-    def _analyze_operational_efficiency(self, enterprise_id: str, days: int) -> Dict[str, Any]:
+    def _analyze_operational_efficiency(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
         """Analisa eficiência operacional"""
-        summary = self.data_processor.get_checklist_summary(enterprise_id, days)
-        vehicle_perf = self.data_processor.get_vehicle_performance(enterprise_id, days)
+        processor = processor or self.data_processor
+        summary = processor.get_checklist_summary(enterprise_id, days)
         
         insights = []
         
@@ -433,12 +451,13 @@ class FleetInsightsEngine:
             }
         }
     
-    def _generate_alerts(self, enterprise_id: str, days: int) -> List[Dict[str, Any]]:
+    def _generate_alerts(self, enterprise_id: str, days: int, processor=None) -> List[Dict[str, Any]]:
         """Gera alertas baseados nos dados atuais"""
+        processor = processor or self.data_processor
         alerts = []
         
         # Usar o sistema de alertas existente
-        maintenance_alerts = self.data_processor.get_maintenance_alerts(enterprise_id)
+        maintenance_alerts = processor.get_maintenance_alerts(enterprise_id)
         
         for alert in maintenance_alerts:
             alerts.append(Alert(
@@ -453,9 +472,10 @@ class FleetInsightsEngine:
         
         return alerts
     
-    def _generate_recommendations(self, enterprise_id: str, days: int) -> List[Dict[str, Any]]:
+    def _generate_recommendations(self, enterprise_id: str, days: int, processor=None) -> List[Dict[str, Any]]:
         """Gera recomendações estratégicas"""
-        summary = self.data_processor.get_checklist_summary(enterprise_id, days)
+        processor = processor or self.data_processor
+        summary = processor.get_checklist_summary(enterprise_id, days)
         
         recommendations = []
         
@@ -481,28 +501,29 @@ class FleetInsightsEngine:
         
         return recommendations
     
-    def _analyze_trends(self, enterprise_id: str, days: int) -> Dict[str, Any]:
-        """Analisa tendências temporais"""
+    def _analyze_trends(self, enterprise_id: str, days: int, processor=None) -> Dict[str, Any]:
+        """Analisa tendências semanais (ano/semana ISO) da frota, veículos e motoristas, com previsão"""
+        processor = processor or self.data_processor
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        checklist_df = self.data_processor.connector.get_checklist_data(
+        rollup = processor.connector.get_checklist_rollup(
             enterprise_id=enterprise_id,
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
         )
         
-        if checklist_df.empty:
+        if rollup.empty:
             return {'trends': [], 'forecast': {}}
         
-        # Análise de tendência semanal
-        checklist_df['week'] = checklist_df['timestamp'].dt.isocalendar().week
-        weekly_compliance = checklist_df.groupby('week')['compliant'].mean() * 100
+        analysis = self.trend_engine.analyze(rollup)
+        weekly = analysis['weekly']
+        weekly_compliance = weekly.set_index('week')['compliance_rate'].dropna()
         
         trends = []
         
         if len(weekly_compliance) >= 2:
-            # Calcular tendência
+            # Calcular tendência (semanas em ordem cronológica, sem misturar anos)
             recent_avg = weekly_compliance.tail(2).mean()
             older_avg = weekly_compliance.head(2).mean() if len(weekly_compliance) >= 4 else weekly_compliance.mean()
             
@@ -512,15 +533,45 @@ class FleetInsightsEngine:
             trends.append({
                 'metric': 'Taxa de Conformidade',
                 'direction': trend_direction,
-                'magnitude': round(trend_magnitude, 2),
+                'magnitude': round(float(trend_magnitude), 2),
                 'description': f'Taxa de conformidade está {trend_direction} em {trend_magnitude:.1f}% nas últimas semanas'
             })
         
+        # Veículos e motoristas com variação relevante da média exponencial
+        labels = {'vehicle': 'Veículo', 'driver': 'Motorista'}
+        for direction, frame in (('piorando', analysis['declining']), ('melhorando', analysis['improving'])):
+            for entity in entity_records(frame, limit=5):
+                trends.append({
+                    'metric': f"Conformidade - {labels[entity['kind']]} {entity['name']}",
+                    'direction': direction,
+                    'magnitude': abs(entity['ewma_change']),
+                    'description': f"{labels[entity['kind']]} {entity['name']}: conformidade média "
+                                   f"{direction} {abs(entity['ewma_change']):.1f}% na última semana "
+                                   f"(EWMA {entity['ewma']:.1f}%)"
+                })
+        
+        next_week = analysis['next_week']
         return {
             'trends': trends,
-            'weekly_compliance': {str(k): v for k, v in weekly_compliance.to_dict().items()},
+            'weekly_compliance': {week: round(float(rate), 2) for week, rate in weekly_compliance.items()},
+            'weekly_stats': [
+                {
+                    'week': row.week,
+                    'checks': int(row.total),
+                    'compliance_rate': None if pd.isna(row.compliance_rate) else round(float(row.compliance_rate), 2),
+                    'rolling_rate': None if pd.isna(row.rolling_rate) else round(float(row.rolling_rate), 2),
+                    'ewma': None if pd.isna(row.ewma) else round(float(row.ewma), 2)
+                }
+                for row in weekly.itertuples(index=False)
+            ],
+            'entity_trends': {
+                'declining': entity_records(analysis['declining']),
+                'improving': entity_records(analysis['improving'])
+            },
             'forecast': {
-                'next_week_compliance': weekly_compliance.mean() if len(weekly_compliance) > 0 else 0
+                'next_week_compliance': next_week.get('value', 0),
+                'next_week': next_week,
+                'daily': analysis['daily']
             }
         }
     
@@ -0,0 +1,309 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Fila Assíncrona de Jobs de Relatório
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional, Any, Callable
+
+try:
+    from src.fleet_cache import ResponseCache
+except ImportError:
+    from fleet_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+IN_FLIGHT = (QUEUED, RUNNING)
+
+def default_jobs_dir() -> str:
+    """Diretório padrão dos jobs e artefatos, compartilhado pelos workers da mesma máquina"""
+    return os.getenv('FLEET_REPORT_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'fleet_copilot_reports'))
+
+def process_alive(pid: Optional[int]) -> bool:
+    """Indica se o processo existe nesta máquina (sem pid, considera vivo)"""
+    if not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class JobQueueFull(RuntimeError):
+    """A fila local já tem o máximo de jobs pendentes"""
+
+@dataclass
+class ReportJob:
+    """Estado de um job de relatório"""
+    id: str
+    kind: str
+    key: str
+    params: Dict[str, Any]
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    artifacts: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    worker_pid: Optional[int] = None
+    heartbeat_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação pública (sem os caminhos locais dos artefatos nem o pid do worker)"""
+        data = asdict(self)
+        data.pop('key')
+        data.pop('worker_pid')
+        data['artifacts'] = sorted(self.artifacts)
+        return data
+
+class ReportJobQueue:
+    """Executa relatórios em segundo plano: envio, status e download do artefato
+
+    - Os jobs rodam em um pool limitado de threads (max_workers) e cada
+      worker aceita no máximo max_pending jobs ainda não concluídos.
+    - Pedidos idênticos (mesmo tipo e parâmetros) enquanto um job ainda está
+      na fila ou rodando recebem o mesmo job.
+    - O estado fica em SQLite no diretório dos jobs, então qualquer worker do
+      gunicorn responde status e download; os artefatos ficam em uma pasta por
+      job e são apagados após retention segundos.
+    - Cada job guarda o pid do worker que o executa; enquanto roda, o
+      worker renova heartbeat_at a cada lease_timeout / 4 segundos. Um job
+      cujo worker morreu (ex.: reciclado pelo gunicorn) ou cujo heartbeat
+      passou de lease_timeout é marcado como falha e deixa de segurar
+      pedidos idênticos. Jobs que passam de job_timeout sem terminar também
+      são marcados como falha.
+    """
+
+    def __init__(self, base_dir: str = None, max_workers: int = 2, max_pending: int = 20,
+                 retention: int = 24 * 3600, job_timeout: int = 30 * 60, lease_timeout: int = 120):
+        self.base_dir = base_dir or default_jobs_dir()
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.job_timeout = job_timeout
+        self.lease_timeout = lease_timeout
+        self.heartbeat_interval = lease_timeout / 4
+        self.handlers: Dict[str, Callable[..., Dict[str, str]]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.path = os.path.join(self.base_dir, 'jobs.sqlite3')
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão curta por operação (seguro entre processos e greenlets)"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Cria a tabela de jobs se necessário"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    artifacts TEXT NOT NULL,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    heartbeat_at REAL
+                )
+            """)
+            # Bancos criados antes do lease por worker
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, sql_type in (('worker_pid', 'INTEGER'), ('heartbeat_at', 'REAL')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {sql_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs (key, status)")
+
+    def register(self, kind: str, handler: Callable[..., Dict[str, str]]):
+        """Registra o gerador de um tipo de relatório
+
+        O handler recebe output_dir e os parâmetros do job e retorna
+        {formato: caminho do arquivo gerado}.
+        """
+        self.handlers[kind] = handler
+
+    @staticmethod
+    def _from_row(row) -> ReportJob:
+        return ReportJob(id=row[0], kind=row[1], key=row[2], params=json.loads(row[3]), status=row[4],
+                         created_at=row[5], started_at=row[6], finished_at=row[7],
+                         artifacts=json.loads(row[8]), error=row[9], worker_pid=row[10], heartbeat_at=row[11])
+
+    def _save(self, conn, job: ReportJob):
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, kind, key, params, status, created_at, started_at, "
+            "finished_at, artifacts, error, worker_pid, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job.id, job.kind, job.key, json.dumps(job.params, default=str), job.status, job.created_at,
+             job.started_at, job.finished_at, json.dumps(job.artifacts), job.error, job.worker_pid,
+             job.heartbeat_at)
+        )
+
+    def _abandon_reason(self, job: ReportJob, now: float) -> Optional[str]:
+        """Motivo para dar como perdido um job em andamento (None se ainda vale)"""
+        if now - job.created_at > self.job_timeout:
+            return "Tempo limite do job excedido"
+        if job.worker_pid != os.getpid() and not process_alive(job.worker_pid):
+            return f"Worker {job.worker_pid} do job encerrado"
+        if job.status == RUNNING and job.heartbeat_at and now - job.heartbeat_at > self.lease_timeout:
+            return "Worker do job parou de responder"
+        return None
+
+    def _expire_abandoned(self, conn, job: ReportJob) -> bool:
+        """Marca como falha o job em andamento cujo worker se perdeu; True se o job foi marcado"""
+        if job.status not in IN_FLIGHT:
+            return False
+        reason = self._abandon_reason(job, time.time())
+        if reason is None:
+            return False
+        job.status, job.error, job.finished_at = FAILED, reason, time.time()
+        self._save(conn, job)
+        logger.warning(f"Job de relatório {job.id} marcado como falha: {reason}")
+        return True
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        """Renova o lease do job enquanto ele roda"""
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                with self._connect() as conn:
+                    conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                                 (time.time(), job_id, RUNNING))
+            except sqlite3.Error as e:
+                logger.warning(f"Falha ao renovar o lease do job {job_id}: {e}")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='fleet-report')
+                self._pid = os.getpid()
+                self._pending = 0
+            return self._executor
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> ReportJob:
+        """Enfileira o relatório ou retorna o job idêntico que ainda está em andamento
+
+        JobQueueFull quando o worker já tem max_pending jobs pendentes.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de relatório desconhecido: {kind}")
+
+        self.cleanup()
+        key = ResponseCache.make_key(f'/reports/{kind}', params)
+        executor = self._get_executor()
+
+        with self._connect() as conn:
+            # Transação exclusiva: a busca do job em andamento e a inserção são atômicas entre workers
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at DESC",
+                (key, *IN_FLIGHT)
+            ).fetchall()
+            for row in rows:
+                running = self._from_row(row)
+                if not self._expire_abandoned(conn, running):
+                    logger.info(f"Relatório {kind} já em andamento: job {running.id}")
+                    return running
+
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    raise JobQueueFull(f"Fila de relatórios cheia ({self.max_pending} pendentes)")
+                self._pending += 1
+
+            job = ReportJob(id=uuid.uuid4().hex, kind=kind, key=key, params=params, worker_pid=os.getpid())
+            self._save(conn, job)
+
+        executor.submit(self._run, job)
+        logger.info(f"Job de relatório {job.id} ({kind}) enfileirado")
+        return job
+
+    def _run(self, job: ReportJob):
+        """Executa o job e grava o resultado (artefatos ou erro)"""
+        output_dir = os.path.join(self.base_dir, job.id)
+        stop_heartbeat = threading.Event()
+        try:
+            job.status, job.started_at = RUNNING, time.time()
+            job.worker_pid, job.heartbeat_at = os.getpid(), job.started_at
+            with self._connect() as conn:
+                self._save(conn, job)
+            threading.Thread(target=self._heartbeat, args=(job.id, stop_heartbeat), daemon=True,
+                             name=f'fleet-report-lease-{job.id[:8]}').start()
+
+            os.makedirs(output_dir, exist_ok=True)
+            artifacts = self.handlers[job.kind](output_dir=output_dir, **job.params)
+            job.artifacts = {fmt: path for fmt, path in (artifacts or {}).items() if path and os.path.isfile(path)}
+            job.status = DONE
+            logger.info(f"Job de relatório {job.id} concluído em {time.time() - job.started_at:.1f}s")
+
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            logger.error(f"Erro no job de relatório {job.id}: {e}")
+
+        finally:
+            stop_heartbeat.set()
+            job.finished_at = time.time()
+            with self._connect() as conn:
+                self._save(conn, job)
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """Estado atual do job (None se não existe ou já foi removido)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = self._from_row(row)
+            self._expire_abandoned(conn, job)
+        return job
+
+    def artifact_path(self, job: ReportJob, fmt: str) -> Optional[str]:
+        """Caminho do artefato do formato pedido, se o job terminou e o arquivo ainda existe"""
+        path = job.artifacts.get(fmt) if job.status == DONE else None
+        return path if path and os.path.isfile(path) else None
+
+    def cleanup(self) -> int:
+        """Remove jobs concluídos há mais de retention segundos e os seus artefatos"""
+        cutoff = time.time() - self.retention
+        with self._connect() as conn:
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            )]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+
+        for job_id in expired:
+            shutil.rmtree(os.path.join(self.base_dir, job_id), ignore_errors=True)
+        if expired:
+            logger.info(f"{len(expired)} jobs de relatório expirados removidos")
+        return len(expired)
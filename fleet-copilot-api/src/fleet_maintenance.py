@@ -0,0 +1,300 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+BI de Manutenção - Agregação no Servidor
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.fleet_cache import ResponseCache
+    from src.fleet_data_connector import run_parallel
+    from src.fleet_scorecard import first_truthy
+except ImportError:
+    from fleet_cache import ResponseCache
+    from fleet_data_connector import run_parallel
+    from fleet_scorecard import first_truthy
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_TYPES = ['Preventiva', 'Corretiva']
+
+# Campos lidos da API (projeção na ingestão)
+ORDER_COLUMNS = ['osNumber', 'osType', 'vehiclePlate', 'assetTypePreventive', 'serviceGroup', 'IssueSource',
+                 'osOpenDate', 'estimatedCompletionDate', 'actualStartDate', 'actualCompletionDate',
+                 'assignedTo', 'openOS', 'priority', 'planName', 'ItemsPreventive']
+VEHICLE_COLUMNS = ['vehiclePlate', 'vehicleModel', 'currentMileage', 'lastPreventiveMaintenanceMileage',
+                   'maximumMileageAllowance', 'garage', 'branch', 'costCenter']
+
+# Filtro da tela -> coluna da ordem de serviço (comparação por igualdade)
+EQUALITY_FILTERS = {
+    'serviceType': 'osType',
+    'assetType': 'assetTypePreventive',
+    'vehiclePlate': 'vehiclePlate',
+    'garage': 'garage',
+    'branch': 'branch',
+    'costCenter': 'costCenter'
+}
+
+# Listas de valores dos filtros da tela
+FACET_COLUMNS = {
+    'assetType': 'assetTypePreventive',
+    'vehiclePlate': 'vehiclePlate',
+    'garage': 'garage',
+    'branch': 'branch',
+    'costCenter': 'costCenter'
+}
+
+DEFAULT_MILEAGE_ALLOWANCE = 10000
+ALERT_MARGIN_KM = 500
+TREND_MONTHS = 6
+
+# Colunas das tabelas de ordens pendentes e executadas
+TABLE_COLUMNS = {
+    'corrective_pending': ['osNumber', 'vehiclePlate', 'assetTypePreventive', 'serviceGroup', 'IssueSource',
+                           'osOpenDate', 'estimatedCompletionDate'],
+    'preventive_pending': ['osNumber', 'vehiclePlate', 'planName', 'serviceGroup', 'currentMileage',
+                           'maximumMileageAllowance', 'estimatedCompletionDate', 'nextPreventiveKm'],
+    'executed': ['osNumber', 'osType', 'vehiclePlate', 'serviceGroup', 'actualStartDate',
+                 'actualCompletionDate', 'assignedTo']
+}
+
+def is_truthy(values: pd.Series) -> pd.Series:
+    """Equivalente vetorizado do teste de verdade do JavaScript (null, '', 0 e false são falsos)"""
+    present = values.notna()
+    as_text = values.astype(str)
+    return present & ~as_text.isin(['', '0', '0.0', 'False', 'false'])
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Datas em UTC a partir de texto ISO ou epoch em milissegundos; demais valores viram NaT"""
+    numeric = pd.to_numeric(values, errors='coerce')
+    from_epoch = pd.to_datetime(numeric, unit='ms', errors='coerce', utc=True)
+    text = values.where(values.map(lambda value: isinstance(value, str)) & numeric.isna())
+    from_text = pd.to_datetime(text, errors='coerce', utc=True, format='mixed')
+    return from_epoch.fillna(from_text)
+
+def count_by(values: pd.Series, default: str = 'Outros') -> Dict[str, int]:
+    """Contagem por valor na ordem de aparição; vazios entram como default"""
+    labels = values.astype(object).where(is_truthy(values), default)
+    return {str(label): int(count) for label, count in labels.groupby(labels, sort=False).size().items()}
+
+def percent(part: float, total: float) -> float:
+    return part / total * 100 if total > 0 else 0.0
+
+class FleetMaintenanceEngine:
+    """Calcula os indicadores do BI de manutenção a partir das ordens de serviço e dos veículos"""
+
+    def __init__(self, connector, cache: Optional[ResponseCache] = None):
+        self.connector = connector
+        self.cache = cache if cache is not None else connector.cache
+
+    def load_sources(self, enterprise_id: str) -> Dict[str, pd.DataFrame]:
+        """Busca ordens de serviço (checklist) e veículos em paralelo, só com os campos usados"""
+        return run_parallel({
+            'orders': lambda: self.connector.get_collection_data(
+                '/checklist', enterprise_id, columns=ORDER_COLUMNS),
+            'vehicles': lambda: self.connector.get_collection_data(
+                '/vehicles', enterprise_id, columns=VEHICLE_COLUMNS)
+        })
+
+    def prepare_orders(self, orders: pd.DataFrame, vehicles: pd.DataFrame) -> pd.DataFrame:
+        """Ordens de manutenção (preventivas e corretivas) com os dados do veículo pela placa
+
+        vehicles deve vir de prepare_vehicles.
+        """
+        orders = orders.reindex(columns=ORDER_COLUMNS)
+        orders = orders[orders['osType'].isin(MAINTENANCE_TYPES)].reset_index(drop=True)
+
+        # Como o find() da tela: vale o primeiro veículo com a placa
+        vehicles = vehicles[vehicles['vehiclePlate'].notna()].drop_duplicates('vehiclePlate', keep='first')
+        joined = orders.merge(vehicles.drop(columns=['lastPreventive', 'status']),
+                              on='vehiclePlate', how='left', validate='many_to_one')
+
+        joined['openDate'] = parse_dates(joined['osOpenDate'])
+        return joined
+
+    def prepare_vehicles(self, vehicles: pd.DataFrame) -> pd.DataFrame:
+        """Veículos com a quilometragem da próxima preventiva e o status do alerta"""
+        vehicles = vehicles.reindex(columns=VEHICLE_COLUMNS).reset_index(drop=True)
+        current = first_truthy(vehicles['currentMileage'])
+        last = first_truthy(vehicles['lastPreventiveMaintenanceMileage'])
+        allowance = first_truthy(vehicles['maximumMileageAllowance']).replace(0, DEFAULT_MILEAGE_ALLOWANCE)
+        next_preventive = last + allowance
+
+        vehicles['lastPreventive'] = last
+        vehicles['nextPreventiveKm'] = next_preventive
+        vehicles['status'] = np.select(
+            [current >= next_preventive, current >= next_preventive - ALERT_MARGIN_KM],
+            ['Vencida', 'Alerta'], default='Normal'
+        )
+        return vehicles
+
+    def filter_orders(self, orders: pd.DataFrame, filters: Dict[str, str]) -> pd.DataFrame:
+        """Filtros da tela; ordens sem data de abertura não são cortadas pelo período"""
+        mask = pd.Series(True, index=orders.index)
+        start = pd.to_datetime(filters.get('startDate') or None, errors='coerce', utc=True)
+        end = pd.to_datetime(filters.get('endDate') or None, errors='coerce', utc=True)
+        if pd.notna(start):
+            mask &= ~(orders['openDate'] < start)
+        if pd.notna(end):
+            mask &= ~(orders['openDate'] > end)
+        for name, column in EQUALITY_FILTERS.items():
+            if filters.get(name):
+                mask &= orders[column] == filters[name]
+        return orders[mask]
+
+    def facets(self, orders: pd.DataFrame) -> Dict[str, List[str]]:
+        """Valores distintos (não vazios, na ordem de aparição) de cada filtro da tela"""
+        result = {}
+        for name, column in FACET_COLUMNS.items():
+            values = orders[column][is_truthy(orders[column])]
+            result[name] = [str(value) for value in values.drop_duplicates()]
+        return result
+
+    def summarize(self, orders: pd.DataFrame) -> Dict[str, Any]:
+        """KPIs, quebra por tipo e tendência mensal numa única agregação por (mês, tipo)"""
+        completed = is_truthy(orders['actualCompletionDate'])
+        flags = pd.DataFrame({
+            'month': orders['openDate'].dt.strftime('%Y-%m'),
+            'osType': orders['osType'],
+            'total': 1,
+            'pending': orders['openOS'].map(lambda value: value is True).astype(int),
+            'completed': completed.astype(int),
+            'onTime': (completed & (parse_dates(orders['actualCompletionDate'])
+                                    <= parse_dates(orders['estimatedCompletionDate']))).astype(int)
+        })
+        grouped = flags.groupby(['month', 'osType'], dropna=False).sum()
+
+        by_type = grouped.groupby(level='osType').sum().reindex(MAINTENANCE_TYPES, fill_value=0)
+        totals = by_type.sum()
+        by_month = grouped[grouped.index.get_level_values('month').notna()]
+        months = sorted(by_month.index.get_level_values('month').unique())[-TREND_MONTHS:]
+        monthly = by_month.groupby(level='month').sum().reindex(months, fill_value=0)
+        monthly_type = by_month['total'].unstack('osType').reindex(index=months, columns=MAINTENANCE_TYPES)
+        monthly_type = monthly_type.fillna(0).astype(int)
+
+        return {
+            'metrics': self._kpis(totals),
+            'by_type': {os_type: self._kpis(row) for os_type, row in by_type.iterrows()},
+            'monthly': {
+                'labels': months,
+                'preventive': monthly_type['Preventiva'].tolist(),
+                'corrective': monthly_type['Corretiva'].tolist(),
+                'maintenance_score': [self._kpis(row)['maintenance_score'] for _, row in monthly.iterrows()]
+            }
+        }
+
+    def _kpis(self, counts: pd.Series) -> Dict[str, Any]:
+        """Indicadores dos cards a partir das contagens (total, pendentes, concluídas, no prazo)"""
+        total, pending = int(counts['total']), int(counts['pending'])
+        completed, on_time = int(counts['completed']), int(counts['onTime'])
+        execution_rate = percent(completed, total)
+        on_time_rate = percent(on_time, completed)
+        pending_rate = percent(pending, total)
+        return {
+            'total_services': total,
+            'pending_services': pending,
+            'completed_services': completed,
+            'on_time_services': on_time,
+            'execution_rate': round(execution_rate, 2),
+            'on_time_rate': round(on_time_rate, 2),
+            'pending_rate': round(pending_rate, 2),
+            'maintenance_score': int(round(execution_rate * 0.4 + on_time_rate * 0.4 + (100 - pending_rate) * 0.2))
+        }
+
+    def charts(self, orders: pd.DataFrame) -> Dict[str, Dict[str, int]]:
+        """Contagens dos gráficos de corretivas, itens preventivos, origem e prioridade"""
+        preventive = orders.loc[orders['osType'] == 'Preventiva', 'ItemsPreventive']
+        # Cada item do plano conta uma vez; ordens sem itens contam como 'Outros'
+        items = preventive.explode().astype(object)
+        service_items = items.map(lambda item: item.get('serviceItem') if isinstance(item, dict) else None)
+        pending = orders['openOS'].map(lambda value: value is True)
+        return {
+            'corrective_by_group': count_by(orders.loc[orders['osType'] == 'Corretiva', 'serviceGroup']),
+            'preventive_by_item': count_by(service_items),
+            'origin': count_by(orders['IssueSource']),
+            'pending_by_priority': count_by(orders.loc[pending, 'priority'], default='Normal')
+        }
+
+    def alerts(self, vehicles: pd.DataFrame) -> Dict[str, Any]:
+        """Alertas de preventiva por quilometragem de todos os veículos"""
+        table = pd.DataFrame({
+            'vehiclePlate': vehicles['vehiclePlate'],
+            'vehicleModel': vehicles['vehicleModel'],
+            'currentMileage': first_truthy(vehicles['currentMileage']),
+            'lastPreventiveMileage': vehicles['lastPreventive'],
+            'nextPreventiveKm': vehicles['nextPreventiveKm'],
+            'status': vehicles['status']
+        })
+        counts = table['status'].value_counts()
+        return {
+            'summary': {status: int(counts.get(status, 0)) for status in ('Vencida', 'Alerta', 'Normal')},
+            'vehicles': self._records(table)
+        }
+
+    def tables(self, orders: pd.DataFrame, limit: int) -> Dict[str, Dict[str, Any]]:
+        """Ordens pendentes e executadas, limitadas a `limit` linhas por tabela (0 = todas)"""
+        pending = orders['openOS'].map(lambda value: value is True)
+        selections = {
+            'corrective_pending': orders[(orders['osType'] == 'Corretiva') & pending],
+            'preventive_pending': orders[(orders['osType'] == 'Preventiva') & pending],
+            'executed': orders[is_truthy(orders['actualCompletionDate'])]
+        }
+        result = {}
+        for name, selected in selections.items():
+            rows = selected[TABLE_COLUMNS[name]]
+            result[name] = {
+                'total': int(len(rows)),
+                'rows': self._records(rows.head(limit) if limit > 0 else rows)
+            }
+        return result
+
+    @staticmethod
+    def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Linhas em dicionários JSON (NaN/NA viram None)"""
+        return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+    def build_aggregate(self, orders: pd.DataFrame, vehicles: pd.DataFrame, filters: Dict[str, str] = None,
+                        table_limit: int = 100) -> Dict[str, Any]:
+        """Todos os agregados da tela para os filtros informados"""
+        filters = filters or {}
+        vehicles = self.prepare_vehicles(vehicles)
+        prepared = self.prepare_orders(orders, vehicles)
+        filtered = self.filter_orders(prepared, filters)
+
+        result = self.summarize(filtered)
+        by_type = result['by_type']
+        total = result['metrics']['total_services']
+        result['metrics']['preventive_services'] = by_type['Preventiva']['total_services']
+        result['metrics']['corrective_services'] = by_type['Corretiva']['total_services']
+        result['metrics']['preventive_ratio'] = int(round(percent(by_type['Preventiva']['total_services'], total)))
+
+        # Opções dos filtros e alertas não dependem dos filtros aplicados
+        result['facets'] = self.facets(prepared)
+        result['alerts'] = self.alerts(vehicles)
+        result['charts'] = self.charts(filtered)
+        result['tables'] = self.tables(filtered, table_limit)
+        return result
+
+    def aggregate(self, enterprise_id: str, filters: Dict[str, str] = None,
+                  table_limit: int = 100) -> Dict[str, Any]:
+        """Agregados da empresa com cache por (empresa, filtros, limite das tabelas)"""
+        filters = {name: value for name, value in (filters or {}).items() if value}
+        cache_key = ResponseCache.make_key('/maintenance/aggregate', {
+            'enterpriseId': enterprise_id, 'tableLimit': table_limit, **filters
+        })
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        sources = self.load_sources(enterprise_id)
+        result = self.build_aggregate(sources['orders'], sources['vehicles'], filters, table_limit)
+        result['generated_at'] = datetime.now().isoformat()
+        if self.cache:
+            self.cache.set(cache_key, result)
+        return result
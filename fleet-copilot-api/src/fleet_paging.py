@@ -0,0 +1,180 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Paginação de Tabelas: Página por Número, Cursor, Ordenação e Projeção de Campos
+"""
+
+import json
+import base64
+import binascii
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Campos usados como identificador estável da linha (desempate da ordenação)
+ID_COLUMNS = ['id', '_doc_id', 'uid']
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+class PageError(ValueError):
+    """Parâmetro de paginação inválido (cursor, ordenação ou limite)"""
+
+def paginate(frame: pd.DataFrame, page: int, per_page: int) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Fatia da página pedida e os metadados da paginação (per_page = 0 retorna tudo)"""
+    total = int(len(frame))
+    per_page = total if per_page <= 0 else per_page
+    page = max(1, page)
+    page_frame = frame.iloc[(page - 1) * per_page:page * per_page] if per_page else frame
+    return page_frame, {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': int(np.ceil(total / per_page)) if per_page else 1
+    }
+
+def to_records(frame: pd.DataFrame, decimals: Optional[int] = 3) -> List[Dict[str, Any]]:
+    """Linhas em dicionários JSON: floats arredondados (decimals=None mantém), datas em ISO e NaN como None"""
+    frame = frame.copy()
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            frame[column] = frame[column].map(lambda ts: ts.isoformat() if pd.notna(ts) else None)
+        elif decimals is not None and pd.api.types.is_float_dtype(frame[column]):
+            frame[column] = frame[column].round(decimals)
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Cursor opaco (base64 de JSON) seguro para URL"""
+    raw = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Lê um cursor gerado por encode_cursor; PageError se estiver corrompido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise PageError(f"Cursor inválido: {e}")
+    if not isinstance(payload, dict) or 'id' not in payload:
+        raise PageError("Cursor inválido")
+    return payload
+
+@dataclass
+class PageRequest:
+    """Pedido de página de uma tabela: tamanho, cursor, ordenação e campos"""
+    limit: int = DEFAULT_PAGE_LIMIT
+    cursor: Optional[str] = None
+    sort: Optional[str] = None
+    order: str = 'asc'
+    fields: Optional[List[str]] = None
+
+    @classmethod
+    def from_args(cls, args) -> 'PageRequest':
+        """Lê limit, cursor, sort, order e fields da query string
+
+        sort aceita o prefixo '-' como atalho para order=desc ('-timestamp').
+        PageError quando algum parâmetro é inválido.
+        """
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_LIMIT))
+        except ValueError:
+            raise PageError("limit deve ser numérico")
+        if not 1 <= limit <= MAX_PAGE_LIMIT:
+            raise PageError(f"limit deve estar entre 1 e {MAX_PAGE_LIMIT}")
+
+        sort = args.get('sort') or None
+        order = (args.get('order') or 'asc').lower()
+        if sort and sort.startswith('-'):
+            sort, order = sort[1:], 'desc'
+        if order not in ('asc', 'desc'):
+            raise PageError("order deve ser 'asc' ou 'desc'")
+
+        fields = [field.strip() for field in (args.get('fields') or '').split(',') if field.strip()]
+        return cls(limit=limit, cursor=args.get('cursor') or None, sort=sort, order=order,
+                   fields=fields or None)
+
+def row_ids(frame: pd.DataFrame) -> pd.Series:
+    """Identificador estável de cada linha: id do documento ou a posição original no resultado da API"""
+    ids = pd.Series(frame.index.map(lambda position: f'~{position:012d}' if isinstance(position, (int, np.integer))
+                                    else f'~{position}'), index=frame.index, dtype=object)
+    for column in reversed(ID_COLUMNS):
+        if column in frame.columns:
+            values = frame[column]
+            ids = values.astype(str).where(values.notna() & (values.astype(str) != ''), ids)
+    return ids
+
+def sort_key(values: pd.Series) -> pd.Series:
+    """Chave de ordenação comparável: datas em epoch (ns), números como float, demais como texto"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').astype(float).where(values.notna())
+    numeric = pd.to_numeric(values, errors='coerce')
+    if numeric.notna().sum() == values.notna().sum():
+        return numeric.astype(float)
+    return values.astype(str).where(values.notna())
+
+def page_records(frame: pd.DataFrame, page: PageRequest) -> Dict[str, Any]:
+    """Página da tabela por cursor (keyset), com ordenação no servidor e projeção de campos
+
+    A ordem é (campo de ordenação, id da linha); valores vazios ficam no fim
+    nos dois sentidos. O cursor guarda o último (valor, id) entregue, então a
+    próxima página continua do mesmo ponto mesmo que linhas anteriores
+    tenham sido removidas. Sem sort, a ordem é a do id.
+    """
+    if page.sort and page.sort not in frame.columns:
+        raise PageError(f"Campo de ordenação inexistente: {page.sort}")
+
+    ids = row_ids(frame)
+    keys = sort_key(frame[page.sort]) if page.sort else pd.Series(np.nan, index=frame.index)
+    descending = page.order == 'desc'
+
+    order = pd.DataFrame({'key': keys, 'id': ids}).sort_values(
+        ['key', 'id'], ascending=[not descending, True], na_position='last', kind='stable'
+    ).index
+    frame, ids, keys = frame.loc[order], ids.loc[order], keys.loc[order]
+    total = int(len(frame))
+
+    if page.cursor:
+        cursor = decode_cursor(page.cursor)
+        if cursor.get('sort') != page.sort or cursor.get('order') != page.order:
+            raise PageError("Cursor não corresponde à ordenação pedida")
+        value, last_id = cursor.get('value'), cursor['id']
+        after_id = ids > last_id
+        if value is None:
+            mask = keys.isna() & after_id
+        else:
+            ahead = keys < value if descending else keys > value
+            mask = ahead | ((keys == value) & after_id) | keys.isna()
+        frame, ids, keys = frame[mask], ids[mask], keys[mask]
+
+    page_frame = frame.iloc[:page.limit]
+    has_more = len(frame) > page.limit
+    next_cursor = None
+    if has_more:
+        last_key = keys.iloc[page.limit - 1]
+        next_cursor = encode_cursor({
+            'sort': page.sort,
+            'order': page.order,
+            'value': None if pd.isna(last_key) else (last_key.item() if hasattr(last_key, 'item') else last_key),
+            'id': ids.iloc[page.limit - 1]
+        })
+
+    if page.fields:
+        page_frame = page_frame[[field for field in page.fields if field in page_frame.columns]]
+
+    return {
+        'items': to_records(page_frame, decimals=None),
+        'pagination': {
+            'limit': page.limit,
+            'sort': page.sort,
+            'order': page.order,
+            'fields': page.fields,
+            'total': total,
+            'returned': int(len(page_frame)),
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+    }
@@ -0,0 +1,280 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Renderização de Gráficos fora da Requisição (Pool de Processos)
+"""
+
+import io
+import os
+import base64
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.dates as mdates
+import pandas as pd
+from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+# Perfis de saída dos gráficos: PNG de tela, PNG de impressão, SVG ou especificação JSON
+CHART_PROFILES = {
+    'screen': {'format': 'png', 'dpi': 100},
+    'print': {'format': 'png', 'dpi': 300},
+    'svg': {'format': 'svg', 'dpi': 100},
+    'json': {'format': 'json'}
+}
+
+DEFAULT_CHART_PROFILE = 'screen'
+
+def configure_style():
+    """Estilo padrão dos gráficos (aplicado em cada processo de renderização)"""
+    import seaborn as sns
+    matplotlib.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+    matplotlib.rcParams['font.size'] = 10
+    matplotlib.rcParams['axes.titlesize'] = 14
+    matplotlib.rcParams['axes.labelsize'] = 12
+    matplotlib.rcParams['xtick.labelsize'] = 10
+    matplotlib.rcParams['ytick.labelsize'] = 10
+
+def export_figure(fig: Figure, profile: Dict[str, Any]) -> str:
+    """Exporta a figura no formato do perfil: PNG em base64 ou o texto SVG"""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=profile['format'], dpi=profile['dpi'], bbox_inches='tight')
+    if profile['format'] == 'svg':
+        return buffer.getvalue().decode('utf-8')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+def _label_bars(ax, bars, labels, offset: float):
+    """Escreve o rótulo de cada barra logo acima dela"""
+    for bar, label in zip(bars, labels):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + offset,
+                label, ha='center', va='bottom', fontweight='bold')
+
+def render_checklist_summary(data: Dict[str, Any], colors: Dict[str, str]) -> Figure:
+    fig = Figure(figsize=(15, 6))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    # Pizza de conformidade
+    ax1.pie([data['compliant'], data['non_compliant']], labels=['Conformes', 'Não Conformes'],
+            colors=[colors['compliant'], colors['non_compliant']], autopct='%1.1f%%', startangle=90)
+    ax1.set_title(f'Conformidade de Checklists\n(Últimos {data["days"]} dias)', fontsize=14, fontweight='bold')
+
+    # Gráfico de barras com métricas
+    metrics = ['Total', 'Conformes', 'Não Conformes', 'Veículos', 'Motoristas']
+    values = [data['total'], data['compliant'], data['non_compliant'], data['vehicles'], data['drivers']]
+    bars = ax2.bar(metrics, values, color=[colors['info'], colors['compliant'], colors['non_compliant'],
+                                           colors['primary'], colors['secondary']])
+    ax2.set_title('Métricas Gerais', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Quantidade')
+    _label_bars(ax2, bars, [f'{value}' for value in values], 0.1)
+
+    fig.tight_layout()
+    return fig
+
+def render_vehicle_performance(data: Dict[str, Any], colors: Dict[str, str]) -> Figure:
+    fig = Figure(figsize=(15, 10))
+    ax1, ax2 = fig.subplots(2, 1)
+    vehicles = data['vehicles']
+
+    # Taxa de conformidade por veículo
+    bars1 = ax1.bar(vehicles, data['compliance_rates'], color=colors['primary'])
+    ax1.set_title('Taxa de Conformidade por Veículo (%)', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('Taxa de Conformidade (%)')
+    ax1.set_ylim(0, 100)
+    ax1.tick_params(axis='x', rotation=45)
+    _label_bars(ax1, bars1, [f'{rate}%' for rate in data['compliance_rates']], 1)
+
+    # Total de verificações por veículo
+    bars2 = ax2.bar(vehicles, data['total_checks'], color=colors['secondary'])
+    ax2.set_title('Total de Verificações por Veículo', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Número de Verificações')
+    ax2.set_xlabel('Veículos')
+    ax2.tick_params(axis='x', rotation=45)
+    _label_bars(ax2, bars2, [f'{checks}' for checks in data['total_checks']], 0.1)
+
+    fig.tight_layout()
+    return fig
+
+def render_driver_performance(data: Dict[str, Any], colors: Dict[str, str]) -> Figure:
+    fig = Figure(figsize=(15, 8))
+    ax = fig.subplots()
+    compliance_rates = data['compliance_rates']
+
+    # Cores pela taxa de conformidade
+    bar_colors = [colors['compliant'] if rate >= 95 else colors['warning'] if rate >= 80
+                  else colors['non_compliant'] for rate in compliance_rates]
+
+    bars = ax.barh(data['drivers'], compliance_rates, color=bar_colors)
+    ax.set_title('Top 10 Motoristas - Taxa de Conformidade (%)', fontsize=14, fontweight='bold')
+    ax.set_xlabel('Taxa de Conformidade (%)')
+    ax.set_xlim(0, 100)
+
+    # Valores nas barras e número de verificações
+    for bar, rate, checks in zip(bars, compliance_rates, data['total_checks']):
+        ax.text(bar.get_width() + 1, bar.get_y() + bar.get_height()/2.,
+                f'{rate}% ({checks} checks)', ha='left', va='center', fontweight='bold')
+
+    fig.tight_layout()
+    return fig
+
+def render_timeline(data: Dict[str, Any], colors: Dict[str, str]) -> Figure:
+    dates = pd.to_datetime(data['dates'])
+    fig = Figure(figsize=(15, 10))
+    ax1, ax2 = fig.subplots(2, 1)
+
+    # Taxa de conformidade ao longo do tempo
+    ax1.plot(dates, data['compliance_rates'], marker='o', linewidth=2, markersize=6, color=colors['primary'])
+    ax1.set_title('Taxa de Conformidade ao Longo do Tempo', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('Taxa de Conformidade (%)')
+    ax1.set_ylim(0, 100)
+    ax1.grid(True, alpha=0.3)
+
+    # Barras empilhadas - Verificações por dia
+    ax2.bar(dates, data['compliant_checks'], label='Conformes', color=colors['compliant'])
+    ax2.bar(dates, data['non_compliant_checks'], bottom=data['compliant_checks'],
+            label='Não Conformes', color=colors['non_compliant'])
+    ax2.set_title('Verificações Diárias', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Número de Verificações')
+    ax2.set_xlabel('Data')
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    for ax in (ax1, ax2):
+        ax.tick_params(axis='x', rotation=45)
+
+    fig.tight_layout()
+    return fig
+
+def render_temperature_humidity(data: Dict[str, Any], colors: Dict[str, str]) -> Figure:
+    hours = pd.to_datetime(data['hours'])
+    fig = Figure(figsize=(15, 10))
+    ax1, ax2 = fig.subplots(2, 1)
+
+    ax1.plot(hours, data['temperature'], marker='o', linewidth=2, markersize=4, color=colors['warning'])
+    ax1.set_title('Temperatura Média dos Veículos', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('Temperatura (°C)')
+    ax1.grid(True, alpha=0.3)
+
+    ax2.plot(hours, data['humidity'], marker='s', linewidth=2, markersize=4, color=colors['info'])
+    ax2.set_title('Umidade Média dos Veículos', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Umidade (%)')
+    ax2.set_xlabel('Data/Hora')
+    ax2.grid(True, alpha=0.3)
+
+    for ax in (ax1, ax2):
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m %H:%M'))
+        ax.tick_params(axis='x', rotation=45)
+
+    fig.tight_layout()
+    return fig
+
+def render_no_data(data: Dict[str, Any], colors: Dict[str, str]) -> Figure:
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.text(0.5, 0.5, data['message'], ha='center', va='center',
+            fontsize=16, fontweight='bold', color=colors['info'])
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis('off')
+    return fig
+
+RENDERERS = {
+    'checklist_summary': render_checklist_summary,
+    'vehicle_performance': render_vehicle_performance,
+    'driver_performance': render_driver_performance,
+    'timeline': render_timeline,
+    'temperature_humidity': render_temperature_humidity,
+    'no_data': render_no_data
+}
+
+def render_chart_job(chart: str, data: Dict[str, Any], colors: Dict[str, str], profile: str) -> str:
+    """Renderiza um gráfico do início ao fim (executado no processo de renderização)
+
+    Usa só a API orientada a objetos (Figure), sem o estado global do
+    pyplot; a figura é descartada ao sair da função.
+    """
+    fig = RENDERERS[chart](data, colors)
+    return export_figure(fig, CHART_PROFILES[profile])
+
+class ChartRenderPool:
+    """Pool de processos que renderiza gráficos fora do worker web
+
+    A renderização com matplotlib é CPU-bound; em um worker gevent ela
+    travaria o event loop e todos os greenlets do worker. Aqui cada gráfico
+    vira um job com Future: o greenlet que espera pelo resultado cede a vez
+    e os demais endpoints continuam atendendo. Os processos são criados
+    com 'spawn' (não herdam o hub do gevent) e só no primeiro uso, depois
+    do fork do gunicorn (preload_app).
+    """
+
+    def __init__(self, max_workers: int = None, timeout: float = 60.0):
+        self.max_workers = max_workers or int(os.getenv('FLEET_RENDER_WORKERS', min(2, os.cpu_count() or 1)))
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=configure_style
+                )
+                self._pid = os.getpid()
+                logger.info(f"Pool de renderização iniciado com {self.max_workers} processos")
+            return self._executor
+
+    def _reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, chart: str, data: Dict[str, Any], colors: Dict[str, str], profile: str) -> Future:
+        """Agenda a renderização e retorna o Future com o resultado exportado"""
+        if chart not in RENDERERS:
+            raise ValueError(f"Gráfico desconhecido: {chart}")
+        try:
+            return self._get_executor().submit(render_chart_job, chart, data, colors, profile)
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            # Sem pool disponível: renderiza no próprio processo para não perder o gráfico
+            logger.warning(f"Pool de renderização indisponível ({e}); renderizando no processo atual")
+            self._reset()
+            future = Future()
+            try:
+                configure_style()
+                future.set_result(render_chart_job(chart, data, colors, profile))
+            except Exception as render_error:
+                future.set_exception(render_error)
+            return future
+
+    def render(self, chart: str, data: Dict[str, Any], colors: Dict[str, str], profile: str) -> str:
+        """Renderiza e espera o resultado (até timeout segundos)"""
+        future = self.submit(chart, data, colors, profile)
+        try:
+            return future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+    def shutdown(self):
+        """Encerra os processos de renderização"""
+        self._reset()
+
+_default_pool: Optional[ChartRenderPool] = None
+
+def get_render_pool() -> ChartRenderPool:
+    """Pool de renderização compartilhado pelo processo"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = ChartRenderPool()
+    return _default_pool
@@ -6,7 +6,7 @@ Sistema de Exportação de Relatórios
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import json
 import logging
 import base64
@@ -15,18 +15,60 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.chart import BarChart, PieChart, LineChart, Reference
 from openpyxl.drawing.image import Image as OpenpyxlImage
+from openpyxl.cell import WriteOnlyCell
 import tempfile
+import itertools
+import shutil
+import subprocess
 import os
 
+try:
+    from src.fleet_data_connector import run_parallel
+except ImportError:
+    from fleet_data_connector import run_parallel
+
+try:
+    from src.fleet_export import write_sheet, frame_rows, flatten_items, plain_value
+except ImportError:
+    from fleet_export import write_sheet, frame_rows, flatten_items, plain_value
+
 logger = logging.getLogger(__name__)
 
+# Colunas das abas de performance: campo -> (rótulo, largura)
+VEHICLE_SHEET_LABELS = {
+    'vehicle_plate': ('Placa do Veículo', 15),
+    'total_checks': ('Total de Verificações', 20),
+    'compliance_rate': ('Taxa de Conformidade (%)', 25),
+    'avg_temperature': ('Temperatura Média (°C)', 20),
+    'avg_humidity': ('Umidade Média (%)', 18),
+    'total_distance': ('Distância Total (m)', 18),
+    'last_check': ('Última Verificação', 20),
+    'status': ('Status', 12)
+}
+
+DRIVER_SHEET_LABELS = {
+    'driver_name': ('Nome do Motorista', 25),
+    'total_checks': ('Total de Verificações', 20),
+    'compliance_rate': ('Taxa de Conformidade (%)', 25),
+    'vehicles_operated': ('Veículos Operados', 18),
+    'last_activity': ('Última Atividade', 20)
+}
+
+def default_report_dir() -> str:
+    """Diretório padrão dos relatórios gerados"""
+    return os.getenv('FLEET_REPORT_DIR', os.path.join(tempfile.gettempdir(), 'fleet_reports'))
+
 class FleetReportGenerator:
     """Gerador de relatórios para gestão de frotas"""
     
-    def __init__(self, data_processor, visualization_engine, insights_engine):
+    def __init__(self, data_processor, visualization_engine, insights_engine, output_dir: str = None):
         self.data_processor = data_processor
         self.visualization_engine = visualization_engine
         self.insights_engine = insights_engine
+        self.output_dir = output_dir or default_report_dir()
+        
+        # Conversor Markdown -> PDF (opcional; sem ele o relatório fica em Markdown)
+        self.pdf_converter = os.getenv('FLEET_PDF_CONVERTER', 'manus-md-to-pdf')
         
         # Estilos para Excel
         self.excel_styles = {
@@ -45,48 +87,70 @@ class FleetReportGenerator:
             )
         }
     
+    def _report_path(self, prefix: str, extension: str, output_dir: str = None) -> str:
+        """Caminho de um novo arquivo de relatório no diretório de saída"""
+        output_dir = output_dir or self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        return os.path.join(output_dir, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+    
     def generate_comprehensive_report(self, enterprise_id: str = None, days: int = 30, 
-                                    format_type: str = 'both') -> Dict[str, str]:
-        """Gera relatório abrangente em PDF e/ou Excel"""
+                                    format_type: str = 'both', output_dir: str = None) -> Dict[str, str]:
+        """Gera relatório abrangente em PDF e/ou Excel (output_dir substitui o diretório padrão)"""
         logger.info(f"Gerando relatório abrangente para os últimos {days} dias")
         
-        # Obter dados e análises
-        analysis = self.insights_engine.generate_comprehensive_analysis(enterprise_id, days)
-        summary = self.data_processor.get_checklist_summary(enterprise_id, days)
-        vehicle_perf = self.data_processor.get_vehicle_performance(enterprise_id, days)
-        driver_perf = self.data_processor.get_driver_performance(enterprise_id, days)
+        # Snapshot único da janela: cada collection é carregada uma vez (mesma
+        # projeção de colunas) e compartilhada por análise, resumos e gráficos
+        processor = self.data_processor.with_snapshot(enterprise_id, days)
+        processor.connector.prefetch(['checklist', 'alerts_checkin'])
+        
+        # Obter dados e análises em paralelo, todos lendo do mesmo snapshot
+        results = run_parallel({
+            'analysis': lambda: self.insights_engine.generate_comprehensive_analysis(enterprise_id, days, processor),
+            'summary': lambda: processor.get_checklist_summary(enterprise_id, days),
+            'vehicle_perf': lambda: processor.get_vehicle_performance(enterprise_id, days),
+            'driver_perf': lambda: processor.get_driver_performance(enterprise_id, days)
+        })
+        analysis = results['analysis']
+        summary = results['summary']
+        vehicle_perf = pd.DataFrame(results['vehicle_perf'])
+        driver_perf = pd.DataFrame(results['driver_perf'])
         
         # Gerar visualizações
-        charts = self._generate_report_charts(enterprise_id, days)
+        charts = self._generate_report_charts(enterprise_id, days, processor)
         
         report_files = {}
         
         if format_type in ['pdf', 'both']:
-            pdf_file = self._generate_pdf_report(analysis, summary, vehicle_perf, driver_perf, charts, days)
-            report_files['pdf'] = pdf_file
+            pdf_file = self._generate_pdf_report(analysis, summary, vehicle_perf, driver_perf, charts, days,
+                                                 output_dir)
+            # Sem o conversor o relatório fica em Markdown e é publicado como 'md', não como 'pdf'
+            report_files['pdf' if pdf_file.endswith('.pdf') else 'md'] = pdf_file
         
         if format_type in ['excel', 'both']:
-            excel_file = self._generate_excel_report(analysis, summary, vehicle_perf, driver_perf, charts, days)
+            excel_file = self._generate_excel_report(analysis, summary, vehicle_perf, driver_perf, charts, days,
+                                                     output_dir)
             report_files['excel'] = excel_file
         
         return report_files
     
-    def _generate_report_charts(self, enterprise_id: str, days: int) -> Dict[str, str]:
-        """Gera gráficos para o relatório"""
+    def _generate_report_charts(self, enterprise_id: str, days: int, processor=None) -> Dict[str, str]:
+        """Gera gráficos para o relatório (processor: snapshot do relatório, sem nova busca)"""
         charts = {}
+        visualization_engine = (self.visualization_engine.with_processor(processor) if processor
+                                else self.visualization_engine)
         
         try:
             # Gráfico de resumo
-            charts['summary'] = self.visualization_engine.create_checklist_summary_chart(enterprise_id, days)
+            charts['summary'] = visualization_engine.create_checklist_summary_chart(enterprise_id, days, profile='print')
             
             # Gráfico de performance de veículos
-            charts['vehicles'] = self.visualization_engine.create_vehicle_performance_chart(enterprise_id, days)
+            charts['vehicles'] = visualization_engine.create_vehicle_performance_chart(enterprise_id, days, profile='print')
             
             # Gráfico de performance de motoristas
-            charts['drivers'] = self.visualization_engine.create_driver_performance_chart(enterprise_id, days)
+            charts['drivers'] = visualization_engine.create_driver_performance_chart(enterprise_id, days, profile='print')
             
             # Gráfico de timeline
-            charts['timeline'] = self.visualization_engine.create_timeline_chart(enterprise_id, days)
+            charts['timeline'] = visualization_engine.create_timeline_chart(enterprise_id, days, profile='print')
             
         except Exception as e:
             logger.warning(f"Erro ao gerar gráficos: {e}")
@@ -94,24 +158,28 @@ class FleetReportGenerator:
         return charts
     
     def _generate_pdf_report(self, analysis: Dict, summary: Dict, vehicle_perf: pd.DataFrame, 
-                           driver_perf: pd.DataFrame, charts: Dict, days: int) -> str:
-        """Gera relatório em PDF usando Markdown"""
+                           driver_perf: pd.DataFrame, charts: Dict, days: int, output_dir: str = None) -> str:
+        """Gera relatório em PDF usando Markdown; retorna o .md se a conversão não for possível"""
         
         # Criar conteúdo Markdown
         markdown_content = self._create_markdown_report(analysis, summary, vehicle_perf, driver_perf, charts, days)
         
         # Salvar arquivo Markdown
-        md_file = f"/home/ubuntu/fleet_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+        md_file = self._report_path('fleet_report', 'md', output_dir)
         with open(md_file, 'w', encoding='utf-8') as f:
             f.write(markdown_content)
         
         # Converter para PDF usando utilitário
         pdf_file = md_file.replace('.md', '.pdf')
         
+        converter = shutil.which(self.pdf_converter)
+        if not converter:
+            logger.warning(f"Conversor de PDF '{self.pdf_converter}' não encontrado; mantendo o Markdown")
+            return md_file
+        
         try:
-            import subprocess
-            result = subprocess.run(['manus-md-to-pdf', md_file, pdf_file], 
-                                  capture_output=True, text=True)
+            result = subprocess.run([converter, md_file, pdf_file], 
+                                  capture_output=True, text=True, timeout=300)
             if result.returncode == 0:
                 logger.info(f"Relatório PDF gerado: {pdf_file}")
                 return pdf_file
@@ -248,39 +316,50 @@ class FleetReportGenerator:
         return "\n".join(content)
     
     def _generate_excel_report(self, analysis: Dict, summary: Dict, vehicle_perf: pd.DataFrame, 
-                             driver_perf: pd.DataFrame, charts: Dict, days: int) -> str:
-        """Gera relatório em Excel"""
+                             driver_perf: pd.DataFrame, charts: Dict, days: int, output_dir: str = None) -> str:
+        """Gera relatório em Excel
         
-        excel_file = f"/home/ubuntu/fleet_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        As abas são escritas linha a linha em um Workbook write-only: a memória
+        não cresce com o número de veículos, motoristas ou insights.
+        """
         
-        with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
-            
-            # Aba 1: Resumo
-            self._create_summary_sheet(writer, analysis, summary, days)
-            
-            # Aba 2: Performance de Veículos
-            if not vehicle_perf.empty:
-                self._create_vehicles_sheet(writer, vehicle_perf)
-            
-            # Aba 3: Performance de Motoristas
-            if not driver_perf.empty:
-                self._create_drivers_sheet(writer, driver_perf)
-            
-            # Aba 4: Insights e Alertas
-            self._create_insights_sheet(writer, analysis)
-            
-            # Aba 5: Dados Brutos
-            self._create_raw_data_sheet(writer, analysis, summary, days)
+        excel_file = self._report_path('fleet_report', 'xlsx', output_dir)
+        workbook = Workbook(write_only=True)
         
+        # Aba 1: Resumo
+        self._create_summary_sheet(workbook, analysis, summary, days)
+        
+        # Aba 2: Performance de Veículos
+        if not vehicle_perf.empty:
+            self._create_vehicles_sheet(workbook, vehicle_perf)
+        
+        # Aba 3: Performance de Motoristas
+        if not driver_perf.empty:
+            self._create_drivers_sheet(workbook, driver_perf)
+        
+        # Aba 4: Insights e Alertas
+        self._create_insights_sheet(workbook, analysis)
+        
+        # Aba 5: Dados Brutos
+        self._create_raw_data_sheet(workbook, analysis, summary, days)
+        
+        workbook.save(excel_file)
         logger.info(f"Relatório Excel gerado: {excel_file}")
         return excel_file
     
-    def _create_summary_sheet(self, writer, analysis: Dict, summary: Dict, days: int):
+    def _header_style(self) -> Dict[str, Any]:
+        """Estilo do cabeçalho das abas"""
+        return {
+            'font': self.excel_styles['header'],
+            'fill': self.excel_styles['header_fill'],
+            'alignment': self.excel_styles['center']
+        }
+    
+    def _create_summary_sheet(self, workbook, analysis: Dict, summary: Dict, days: int):
         """Cria aba de resumo no Excel"""
         
-        # Criar DataFrame com métricas principais
+        # Métricas principais
         metrics_data = [
-            ['Métrica', 'Valor'],
             ['Período Analisado', f'{days} dias'],
             ['Total de Verificações', summary['total']],
             ['Taxa de Conformidade', f"{summary['compliance_rate']}%"],
@@ -291,194 +370,108 @@ class FleetReportGenerator:
             ['Data de Geração', datetime.now().strftime('%d/%m/%Y %H:%M')]
         ]
         
-        df_metrics = pd.DataFrame(metrics_data[1:], columns=metrics_data[0])
-        df_metrics.to_excel(writer, sheet_name='Resumo', index=False, startrow=2)
-        
-        # Aplicar formatação
-        worksheet = writer.sheets['Resumo']
-        
-        # Título
-        worksheet['A1'] = 'Relatório de Gestão de Frotas'
-        worksheet['A1'].font = Font(size=16, bold=True, color='2E86AB')
-        
-        # Formatar cabeçalhos
-        for col in ['A', 'B']:
-            cell = worksheet[f'{col}3']
-            cell.font = self.excel_styles['header']
-            cell.fill = self.excel_styles['header_fill']
-            cell.alignment = self.excel_styles['center']
-        
-        # Ajustar largura das colunas
+        worksheet = workbook.create_sheet('Resumo')
         worksheet.column_dimensions['A'].width = 25
         worksheet.column_dimensions['B'].width = 20
+        
+        # Título e linha em branco antes da tabela
+        title = WriteOnlyCell(worksheet, value='Relatório de Gestão de Frotas')
+        title.font = Font(size=16, bold=True, color='2E86AB')
+        worksheet.append([title])
+        worksheet.append([])
+        
+        header = []
+        for name in ['Métrica', 'Valor']:
+            cell = WriteOnlyCell(worksheet, value=name)
+            for attribute, style in self._header_style().items():
+                setattr(cell, attribute, style)
+            header.append(cell)
+        worksheet.append(header)
+        
+        for row in metrics_data:
+            worksheet.append([plain_value(value) for value in row])
+    
+    def _create_labeled_sheet(self, workbook, title: str, heading: str, frame: pd.DataFrame,
+                              labels: Dict[str, Tuple[str, int]]):
+        """Aba com as colunas conhecidas do frame, na ordem e com os rótulos/larguras de labels"""
+        columns = [column for column in labels if column in frame.columns]
+        write_sheet(workbook, title, [labels[column][0] for column in columns], frame_rows(frame[columns]),
+                    heading=heading, widths=[labels[column][1] for column in columns],
+                    header_style=self._header_style())
     
-    def _create_vehicles_sheet(self, writer, vehicle_perf: pd.DataFrame):
+    def _create_vehicles_sheet(self, workbook, vehicle_perf: pd.DataFrame):
         """Cria aba de performance de veículos"""
-        
-        # Renomear colunas para português e tratar timezone
-        vehicle_perf_pt = vehicle_perf.copy()
-        
-        # Remover timezone se existir
-        if 'last_check' in vehicle_perf_pt.columns:
-            vehicle_perf_pt['last_check'] = pd.to_datetime(vehicle_perf_pt['last_check']).dt.tz_localize(None)
-        
-        vehicle_perf_pt.columns = [
-            'Placa do Veículo', 'Total de Verificações', 'Taxa de Conformidade (%)',
-            'Temperatura Média (°C)', 'Umidade Média (%)', 'Distância Total (m)',
-            'Última Verificação'
-        ]
-        
-        vehicle_perf_pt.to_excel(writer, sheet_name='Veículos', index=False, startrow=1)
-        
-        worksheet = writer.sheets['Veículos']
-        
-        # Título
-        worksheet['A1'] = 'Performance de Veículos'
-        worksheet['A1'].font = Font(size=14, bold=True, color='2E86AB')
-        
-        # Formatar cabeçalhos
-        for col_num, col_letter in enumerate(['A', 'B', 'C', 'D', 'E', 'F', 'G'], 1):
-            cell = worksheet[f'{col_letter}2']
-            cell.font = self.excel_styles['header']
-            cell.fill = self.excel_styles['header_fill']
-            cell.alignment = self.excel_styles['center']
-        
-        # Ajustar largura das colunas
-        column_widths = [15, 20, 25, 20, 18, 18, 20]
-        for i, width in enumerate(column_widths):
-            worksheet.column_dimensions[chr(65 + i)].width = width
+        self._create_labeled_sheet(workbook, 'Veículos', 'Performance de Veículos', vehicle_perf, VEHICLE_SHEET_LABELS)
     
-    def _create_drivers_sheet(self, writer, driver_perf: pd.DataFrame):
+    def _create_drivers_sheet(self, workbook, driver_perf: pd.DataFrame):
         """Cria aba de performance de motoristas"""
-        
-        # Renomear colunas para português e tratar timezone
-        driver_perf_pt = driver_perf.copy()
-        
-        # Remover timezone se existir
-        if 'last_activity' in driver_perf_pt.columns:
-            driver_perf_pt['last_activity'] = pd.to_datetime(driver_perf_pt['last_activity']).dt.tz_localize(None)
-        
-        driver_perf_pt.columns = [
-            'Nome do Motorista', 'Total de Verificações', 'Taxa de Conformidade (%)',
-            'Veículos Operados', 'Última Atividade'
-        ]
-        
-        driver_perf_pt.to_excel(writer, sheet_name='Motoristas', index=False, startrow=1)
-        
-        worksheet = writer.sheets['Motoristas']
-        
-        # Título
-        worksheet['A1'] = 'Performance de Motoristas'
-        worksheet['A1'].font = Font(size=14, bold=True, color='2E86AB')
-        
-        # Formatar cabeçalhos
-        for col_letter in ['A', 'B', 'C', 'D', 'E']:
-            cell = worksheet[f'{col_letter}2']
-            cell.font = self.excel_styles['header']
-            cell.fill = self.excel_styles['header_fill']
-            cell.alignment = self.excel_styles['center']
-        
-        # Ajustar largura das colunas
-        column_widths = [25, 20, 25, 18, 20]
-        for i, width in enumerate(column_widths):
-            worksheet.column_dimensions[chr(65 + i)].width = width
+        self._create_labeled_sheet(workbook, 'Motoristas', 'Performance de Motoristas', driver_perf,
+                                   DRIVER_SHEET_LABELS)
     
-    def _create_insights_sheet(self, writer, analysis: Dict):
-        """Cria aba de insights e alertas"""
-        
-        insights_data = []
-        
-        # Coletar todos os insights
-        all_insights = []
+    def _insight_rows(self, analysis: Dict):
+        """Linhas da aba de insights, geradas sob demanda"""
         for category in ['summary', 'vehicle_insights', 'driver_insights', 'maintenance_insights', 'safety_insights']:
-            if category in analysis and 'insights' in analysis[category]:
-                all_insights.extend(analysis[category]['insights'])
-        
-        # Preparar dados para Excel
-        for insight in all_insights:
-            priority_icon = "🔴" if insight['priority'] == 'high' else "🟡" if insight['priority'] == 'medium' else "🟢"
-            impact_icon = "✅" if insight['impact'] == 'positive' else "❌" if insight['impact'] == 'negative' else "➖"
-            
-            insights_data.append([
-                f"{priority_icon} {insight['priority'].upper()}",
-                insight['category'].title(),
-                insight['title'],
-                insight['description'],
-                insight['recommendation'],
-                f"{impact_icon} {insight['impact'].title()}"
-            ])
-        
-        if insights_data:
-            df_insights = pd.DataFrame(insights_data, columns=[
-                'Prioridade', 'Categoria', 'Título', 'Descrição', 'Recomendação', 'Impacto'
-            ])
-            df_insights.to_excel(writer, sheet_name='Insights', index=False, startrow=1)
-            
-            worksheet = writer.sheets['Insights']
-            
-            # Título
-            worksheet['A1'] = 'Insights e Recomendações'
-            worksheet['A1'].font = Font(size=14, bold=True, color='2E86AB')
-            
-            # Formatar cabeçalhos
-            for col_letter in ['A', 'B', 'C', 'D', 'E', 'F']:
-                cell = worksheet[f'{col_letter}2']
-                cell.font = self.excel_styles['header']
-                cell.fill = self.excel_styles['header_fill']
-                cell.alignment = self.excel_styles['center']
-            
-            # Ajustar largura das colunas
-            column_widths = [15, 15, 25, 40, 40, 15]
-            for i, width in enumerate(column_widths):
-                worksheet.column_dimensions[chr(65 + i)].width = width
+            if category not in analysis or 'insights' not in analysis[category]:
+                continue
+            for insight in analysis[category]['insights']:
+                priority_icon = "🔴" if insight['priority'] == 'high' else "🟡" if insight['priority'] == 'medium' else "🟢"
+                impact_icon = "✅" if insight['impact'] == 'positive' else "❌" if insight['impact'] == 'negative' else "➖"
+                
+                yield [
+                    f"{priority_icon} {insight['priority'].upper()}",
+                    insight['category'].title(),
+                    insight['title'],
+                    insight['description'],
+                    insight['recommendation'],
+                    f"{impact_icon} {insight['impact'].title()}"
+                ]
     
-    def _create_raw_data_sheet(self, writer, analysis: Dict, summary: Dict, days: int):
-        """Cria aba com dados brutos em JSON"""
-        
-        # Converter análise para formato tabular
-        raw_data = [
-            ['Seção', 'Dados JSON'],
-            ['Resumo', json.dumps(summary, indent=2, ensure_ascii=False)],
-            ['Análise Completa', json.dumps(analysis, indent=2, ensure_ascii=False, default=str)]
-        ]
-        
-        df_raw = pd.DataFrame(raw_data[1:], columns=raw_data[0])
-        df_raw.to_excel(writer, sheet_name='Dados Brutos', index=False, startrow=1)
-        
-        worksheet = writer.sheets['Dados Brutos']
-        
-        # Título
-        worksheet['A1'] = 'Dados Brutos (JSON)'
-        worksheet['A1'].font = Font(size=14, bold=True, color='2E86AB')
-        
-        # Ajustar largura das colunas
-        worksheet.column_dimensions['A'].width = 20
-        worksheet.column_dimensions['B'].width = 100
+    def _create_insights_sheet(self, workbook, analysis: Dict):
+        """Cria aba de insights e alertas"""
+        rows = self._insight_rows(analysis)
+        first = next(rows, None)
+        if first is None:
+            return
+        
+        write_sheet(workbook, 'Insights', [
+            'Prioridade', 'Categoria', 'Título', 'Descrição', 'Recomendação', 'Impacto'
+        ], itertools.chain([first], rows), heading='Insights e Recomendações',
+            widths=[15, 15, 25, 40, 40, 15], header_style=self._header_style())
+    
+    def _create_raw_data_sheet(self, workbook, analysis: Dict, summary: Dict, days: int):
+        """Cria aba com os dados brutos, um campo por linha"""
+        
+        # Cada folha do resumo e da análise vira uma linha (seção, campo, valor)
+        rows = itertools.chain(
+            (['Resumo', path, value] for path, value in flatten_items(summary)),
+            (['Análise Completa', path, value] for path, value in flatten_items(analysis))
+        )
+        write_sheet(workbook, 'Dados Brutos', ['Seção', 'Campo', 'Valor'], rows,
+                    heading='Dados Brutos', widths=[20, 60, 60], header_style=self._header_style())
     
-    def generate_quick_summary_excel(self, enterprise_id: str = None, days: int = 7) -> str:
+    def generate_quick_summary_excel(self, enterprise_id: str = None, days: int = 7,
+                                     output_dir: str = None) -> str:
         """Gera planilha Excel com resumo rápido"""
         
         summary = self.data_processor.get_checklist_summary(enterprise_id, days)
-        vehicle_perf = self.data_processor.get_vehicle_performance(enterprise_id, days)
+        vehicle_perf = pd.DataFrame(self.data_processor.get_vehicle_performance(enterprise_id, days))
         
-        excel_file = f"/home/ubuntu/fleet_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        excel_file = self._report_path('fleet_summary', 'xlsx', output_dir)
+        workbook = Workbook(write_only=True)
         
-        with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
-            
-            # Resumo rápido
-            summary_data = pd.DataFrame([
-                ['Total de Verificações', summary['total']],
-                ['Taxa de Conformidade', f"{summary['compliance_rate']}%"],
-                ['Veículos', summary['vehicles']],
-                ['Motoristas', summary['drivers']]
-            ], columns=['Métrica', 'Valor'])
-            
-            summary_data.to_excel(writer, sheet_name='Resumo', index=False)
-            
-            # Performance de veículos (se disponível)
-            if not vehicle_perf.empty:
-                vehicle_perf.to_excel(writer, sheet_name='Veículos', index=False)
+        # Resumo rápido
+        write_sheet(workbook, 'Resumo', ['Métrica', 'Valor'], [
+            ['Total de Verificações', summary['total']],
+            ['Taxa de Conformidade', f"{summary['compliance_rate']}%"],
+            ['Veículos', summary['vehicles']],
+            ['Motoristas', summary['drivers']]
+        ])
+        
+        # Performance de veículos (se disponível)
+        if not vehicle_perf.empty:
+            write_sheet(workbook, 'Veículos', list(vehicle_perf.columns), frame_rows(vehicle_perf))
         
+        workbook.save(excel_file)
         logger.info(f"Resumo Excel gerado: {excel_file}")
         return excel_file
 
@@ -0,0 +1,161 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Resiliência nas Chamadas à API: Backoff com Jitter e Circuit Breaker
+"""
+
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Iterator
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Status HTTP que indicam falha transitória do servidor (vale repetir)
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(error: Exception) -> bool:
+    """Indica se o erro é transitório: conexão, timeout, 5xx/429 ou corpo inválido"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = error.response
+        return response is None or response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (requests.exceptions.ConnectionError,
+                              requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError,
+                              ValueError))
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Lê o cabeçalho Retry-After (em segundos) de respostas 429/503"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class RetryPolicy:
+    """Política de repetição com backoff exponencial e jitter completo"""
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+
+    def delay(self, attempt: int, error: Exception = None) -> float:
+        """Espera antes da próxima tentativa: aleatória entre 0 e base * 2^attempt (limitada)"""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def attempts(self) -> Iterator[int]:
+        """Números das tentativas (0, 1, ...)"""
+        return iter(range(max(1, self.max_retries)))
+
+class CircuitBreaker:
+    """Circuit breaker de um endpoint da API
+
+    - closed: chamadas liberadas; falhas consecutivas são contadas
+    - open: após failure_threshold falhas, chamadas são recusadas por reset_timeout segundos
+    - half_open: passado reset_timeout, uma única chamada de teste é liberada;
+      sucesso fecha o circuito, falha o reabre
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        """Estado atual, considerando a passagem de open para half_open pelo tempo"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Indica se a chamada pode seguir para a API"""
+        state = self.state
+        with self._lock:
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Registra sucesso: fecha o circuito e zera as falhas"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit breaker {self.name}: fechado")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Libera a chamada de teste sem mudar o estado (ela terminou sem sucesso nem falha registrados)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        """Registra falha transitória; abre o circuito ao atingir o limite (ou se o teste falhar)"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                    logger.warning(f"Circuit breaker {self.name}: aberto por {self.reset_timeout}s "
+                                   f"após {self._failures} falhas")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado e contadores do breaker"""
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            'opened': self.opened,
+            'rejected': self.rejected
+        }
+
+class CircuitBreakerRegistry:
+    """Um circuit breaker por endpoint, criado na primeira chamada"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Breaker do endpoint informado"""
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+            return self._breakers[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estado de todos os breakers por endpoint"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,293 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Agregações Diárias de Checklist (Rollups) por Empresa
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DAY_COLUMNS = ['day', 'total', 'compliant', 'non_compliant', 'vehicles', 'drivers']
+ENTITY_COLUMNS = ['day', 'kind', 'name', 'total', 'compliant']
+ITEM_COLUMNS = ['day', 'item', 'checks', 'failures']
+
+# Entidades agregadas por dia: tipo -> coluna do checklist
+ENTITY_KINDS = {'vehicle': 'vehiclePlate', 'driver': 'driverName'}
+
+# Dias por lote ao reconstruir as agregações a partir do armazenamento local
+REBUILD_BATCH_DAYS = 31
+
+def default_rollup_path() -> str:
+    """Caminho padrão das agregações, compartilhado pelos workers da mesma máquina"""
+    return os.getenv('FLEET_ROLLUP_PATH', os.path.join(tempfile.gettempdir(), 'fleet_copilot_rollups.sqlite3'))
+
+def to_day(value: Any) -> Optional[str]:
+    """Dia (YYYY-MM-DD, UTC como no armazenamento local) de uma data ou timestamp"""
+    if value is None:
+        return None
+    ts = pd.to_datetime(value, errors='coerce')
+    if pd.isna(ts):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.strftime('%Y-%m-%d')
+
+def day_bounds(start_day: Optional[str], end_day: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Limites (ISO, inclusivos) da janela de dias inteiros entre start_day e end_day"""
+    return (f'{start_day}T00:00:00' if start_day else None,
+            f'{end_day}T23:59:59.999999' if end_day else None)
+
+@dataclass
+class ChecklistRollup:
+    """Agregados diários de checklist de uma janela
+
+    - days: total, conformes, não conformes, veículos e motoristas distintos por dia
+    - entities: verificações e conformes por dia e veículo/motorista
+    - items: verificações e falhas por dia e item
+    """
+    days: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=DAY_COLUMNS))
+    entities: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=ENTITY_COLUMNS))
+    items: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=ITEM_COLUMNS))
+
+    @property
+    def empty(self) -> bool:
+        return self.days.empty or int(self.days['total'].sum()) == 0
+
+    def window(self, start_day: str = None, end_day: str = None) -> 'ChecklistRollup':
+        """Recorte dos dias [start_day, end_day] (limites inclusivos)"""
+        def cut(frame: pd.DataFrame) -> pd.DataFrame:
+            mask = pd.Series(True, index=frame.index)
+            if start_day:
+                mask &= frame['day'] >= start_day
+            if end_day:
+                mask &= frame['day'] <= end_day
+            return frame[mask]
+        return ChecklistRollup(cut(self.days), cut(self.entities), cut(self.items))
+
+    def summary(self) -> Dict[str, int]:
+        """Totais da janela; veículos e motoristas distintos vêm das entidades (não da soma diária)"""
+        total = int(self.days['total'].sum())
+        compliant = int(self.days['compliant'].sum())
+        kinds = self.entities['kind']
+        return {
+            'total': total,
+            'compliant': compliant,
+            'non_compliant': total - compliant,
+            'vehicles': int(self.entities.loc[kinds == 'vehicle', 'name'].nunique()),
+            'drivers': int(self.entities.loc[kinds == 'driver', 'name'].nunique())
+        }
+
+    def item_failures(self) -> pd.Series:
+        """Falhas por item na janela, da maior para a menor"""
+        failures = self.items.groupby('item', sort=False)['failures'].sum()
+        return failures.sort_values(ascending=False, kind='stable').astype(int)
+
+def checklist_rollup(frame: pd.DataFrame) -> ChecklistRollup:
+    """Calcula os agregados diários de um frame de checklist normalizado (is_compliant, timestamp)"""
+    if frame.empty or 'timestamp' not in frame.columns or 'is_compliant' not in frame.columns:
+        return ChecklistRollup()
+
+    timestamps = frame['timestamp']
+    if getattr(timestamps.dt, 'tz', None) is not None:
+        timestamps = timestamps.dt.tz_convert(None)
+    base = pd.DataFrame({
+        'day': timestamps.dt.strftime('%Y-%m-%d'),
+        'compliant': frame['is_compliant'].astype(bool)
+    })
+    has_day = base['day'].notna()
+
+    entity_frames = []
+    for kind, column in ENTITY_KINDS.items():
+        if column not in frame.columns:
+            continue
+        names = frame[column].astype('string')
+        valid = has_day & names.notna()
+        grouped = pd.DataFrame({'day': base['day'][valid], 'name': names[valid].astype(str),
+                                'compliant': base['compliant'][valid]}).groupby(['day', 'name'], sort=True)
+        counts = grouped['compliant'].agg(total='size', compliant='sum').reset_index()
+        counts.insert(1, 'kind', kind)
+        entity_frames.append(counts)
+    entities = (pd.concat(entity_frames, ignore_index=True) if entity_frames
+                else pd.DataFrame(columns=ENTITY_COLUMNS))
+
+    daily = base[has_day].groupby('day', sort=True)['compliant'].agg(total='size', compliant='sum')
+    daily['non_compliant'] = daily['total'] - daily['compliant']
+    for kind, column in (('vehicle', 'vehicles'), ('driver', 'drivers')):
+        per_day = entities[entities['kind'] == kind].groupby('day').size()
+        daily[column] = per_day.reindex(daily.index, fill_value=0)
+    days = daily.reset_index()[DAY_COLUMNS]
+
+    if 'itemName' in frame.columns:
+        item_names = frame['itemName'].astype('string')
+        valid = has_day & item_names.notna()
+        failures = ~base['compliant'][valid]
+        items = pd.DataFrame({'day': base['day'][valid], 'item': item_names[valid].astype(str),
+                              'failures': failures}).groupby(['day', 'item'], sort=True)['failures'].agg(
+            checks='size', failures='sum').reset_index()
+    else:
+        items = pd.DataFrame(columns=ITEM_COLUMNS)
+
+    return ChecklistRollup(days.astype({'total': int, 'compliant': int, 'non_compliant': int,
+                                        'vehicles': int, 'drivers': int}),
+                           entities.astype({'total': int, 'compliant': int}),
+                           items.astype({'checks': int, 'failures': int}))
+
+class FleetRollupStore:
+    """Tabelas de agregação diária por empresa, em SQLite compartilhado pelos workers
+
+    Cada dia é sempre recalculado por inteiro e substituído (replace), então
+    reprocessar registros repetidos ou atualizados não duplica contagens.
+    Consultas de qualquer janela somam só as linhas diárias, sem ler os
+    registros brutos.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or default_rollup_path()
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão curta por operação (seguro entre processos e greenlets)"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Cria as tabelas de agregação se necessário"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily (
+                    enterprise_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    compliant INTEGER NOT NULL,
+                    non_compliant INTEGER NOT NULL,
+                    vehicles INTEGER NOT NULL,
+                    drivers INTEGER NOT NULL,
+                    PRIMARY KEY (enterprise_id, day)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_entities (
+                    enterprise_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    compliant INTEGER NOT NULL,
+                    PRIMARY KEY (enterprise_id, day, kind, name)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_items (
+                    enterprise_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    checks INTEGER NOT NULL,
+                    failures INTEGER NOT NULL,
+                    PRIMARY KEY (enterprise_id, day, item)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollup_state (
+                    enterprise_id TEXT PRIMARY KEY,
+                    built_at REAL,
+                    updated_at REAL
+                )
+            """)
+
+    def replace(self, enterprise_id: str, rollup: ChecklistRollup, days: Iterable[str]) -> int:
+        """Substitui os agregados dos dias informados (dias sem registros ficam vazios)"""
+        days = sorted({day for day in days if day})
+        if not days:
+            return 0
+
+        with self._connect() as conn:
+            for start in range(0, len(days), 500):
+                batch = days[start:start + 500]
+                marks = ', '.join('?' * len(batch))
+                for table in ('daily', 'daily_entities', 'daily_items'):
+                    conn.execute(f"DELETE FROM {table} WHERE enterprise_id = ? AND day IN ({marks})",
+                                 [enterprise_id, *batch])
+
+            rollup = rollup.window(days[0], days[-1])
+            conn.executemany(
+                "INSERT INTO daily (enterprise_id, day, total, compliant, non_compliant, vehicles, drivers) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(enterprise_id, *row) for row in rollup.days[DAY_COLUMNS].itertuples(index=False, name=None)]
+            )
+            conn.executemany(
+                "INSERT INTO daily_entities (enterprise_id, day, kind, name, total, compliant) VALUES (?, ?, ?, ?, ?, ?)",
+                [(enterprise_id, *row) for row in rollup.entities[ENTITY_COLUMNS].itertuples(index=False, name=None)]
+            )
+            conn.executemany(
+                "INSERT INTO daily_items (enterprise_id, day, item, checks, failures) VALUES (?, ?, ?, ?, ?)",
+                [(enterprise_id, *row) for row in rollup.items[ITEM_COLUMNS].itertuples(index=False, name=None)]
+            )
+            conn.execute(
+                "INSERT INTO rollup_state (enterprise_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(enterprise_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (enterprise_id, time.time())
+            )
+        return len(days)
+
+    def is_built(self, enterprise_id: str) -> bool:
+        """Se a empresa já teve as agregações reconstruídas a partir de todo o histórico local"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT built_at FROM rollup_state WHERE enterprise_id = ?",
+                               (enterprise_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_built(self, enterprise_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO rollup_state (enterprise_id, built_at, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(enterprise_id) DO UPDATE SET built_at = excluded.built_at",
+                (enterprise_id, time.time(), time.time())
+            )
+
+    def read(self, enterprise_id: str, start_day: str = None, end_day: str = None) -> ChecklistRollup:
+        """Agregados diários da empresa entre start_day e end_day (inclusivos)"""
+        where = "enterprise_id = ?"
+        args: List[Any] = [enterprise_id]
+        if start_day:
+            where += " AND day >= ?"
+            args.append(start_day)
+        if end_day:
+            where += " AND day <= ?"
+            args.append(end_day)
+
+        with self._connect() as conn:
+            frames = {
+                name: pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table} WHERE {where} ORDER BY day",
+                                        conn, params=args)
+                for name, table, columns in (('days', 'daily', DAY_COLUMNS),
+                                             ('entities', 'daily_entities', ENTITY_COLUMNS),
+                                             ('items', 'daily_items', ITEM_COLUMNS))
+            }
+        return ChecklistRollup(**frames)
+
+    def invalidate(self, enterprise_id: str = None) -> int:
+        """Descarta as agregações de uma empresa (ou de todas); serão reconstruídas no próximo uso"""
+        with self._connect() as conn:
+            for table in ('daily_entities', 'daily_items', 'rollup_state'):
+                if enterprise_id:
+                    conn.execute(f"DELETE FROM {table} WHERE enterprise_id = ?", (enterprise_id,))
+                else:
+                    conn.execute(f"DELETE FROM {table}")
+            if enterprise_id:
+                return conn.execute("DELETE FROM daily WHERE enterprise_id = ?", (enterprise_id,)).rowcount
+            return conn.execute("DELETE FROM daily").rowcount
@@ -0,0 +1,234 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Scorecard Preditivo de Risco - Cálculo no Servidor
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Contadores de eventos por motorista: campo do scorecard -> campo da viagem
+EVENT_FIELDS = {
+    # 1. Movimento do Veículo
+    'vehicleInMotion': 'AmountOfVehicleInMotionEvents',
+    'vehicleStopped': 'AmountOfVehicleStoppedEvents',
+    'idling': 'AmountOfIdlingEvents',
+    'accEvents': 'accEvents',
+    # 2. Direção Agressiva
+    'frequentAcceleration': 'AmountOfFrequentAccelerationEvents',
+    'highAcceleration': 'AmountOfHighAccEvents',
+    'frequentBraking': 'AmountOfFrequentBrakingEvents',
+    'highDeceleration': 'AmountOfHighDecEvents',
+    'frequentStops': 'AmountOfFrequentStopEvents',
+    'decAfterCurve': 'AmountOfDecAfterCurveEvents',
+    'cornering': 'AmountOfCorneringEvents',
+    'accBeforeCurve': 'AmountOfAccBeforeCurveEvents',
+    'swerving': 'AmountOfSwervingEvents',
+    'speedOverLimit': 'AmountOfSpeedOverLimitEvents',
+    # 3. Distrações / Fadiga
+    'smartphoneUsage': 'AmountOfSmartphoneUsageEvents',
+    'phoneMovement': 'amountOfPhoneMovementEvents',
+    'driverFatigue': 'AmountOfDriverFatigueEvents',
+    # 4. Condições Técnicas
+    'highTemperature': 'AmountOfHighTemperatureEvents',
+    'lowBattery': 'AmountOfLowBatteryEvents',
+    'inertiaEvents': 'inertiaEvents',
+    # Total
+    'totalEvents': 'totalEvents'
+}
+
+# Peso de cada incidente crítico (por viagem) somado à chance de acidentes
+CRITICAL_WEIGHTS = {
+    'smartphoneUsage': 15,
+    'driverFatigue': 12,
+    'swerving': 10,
+    'speedOverLimit': 8,
+    'frequentBraking': 5,
+    'phoneMovement': 5
+}
+
+# Chance de acidentes (%) a partir da qual o motorista é médio / alto risco
+RISK_THRESHOLDS = {'medium': 40, 'high': 70}
+
+INCIDENT_CATEGORIES = {
+    'Aceleração': ['frequentAcceleration', 'highAcceleration'],
+    'Frenagem': ['frequentBraking', 'highDeceleration', 'frequentStops', 'decAfterCurve'],
+    'Curvas': ['cornering', 'accBeforeCurve', 'swerving'],
+    'Smartphone': ['smartphoneUsage', 'phoneMovement'],
+    'Excesso Velocidade': ['speedOverLimit'],
+    'Fadiga': ['driverFatigue'],
+    'Inércia': ['inertiaEvents']
+}
+
+FREQUENCY_BINS = [0, 10, 25, 50, np.inf]
+FREQUENCY_LABELS = ['1-10', '11-25', '26-50', '50+']
+
+# Campos da viagem lidos da API (projeção na ingestão)
+TRIP_COLUMNS = ['UserString', 'TimestampDate', 'TimeStamp', 'TripDistance', 'distanceAverage',
+                'score', 'scoreML', *EVENT_FIELDS.values()]
+
+def first_truthy(*series: pd.Series) -> pd.Series:
+    """Equivalente vetorizado de `a || b || 0` do JavaScript para campos numéricos"""
+    result = pd.Series(0.0, index=series[0].index)
+    for values in reversed(series):
+        numeric = pd.to_numeric(values, errors='coerce')
+        result = numeric.where(numeric.notna() & (numeric != 0), result)
+    return result
+
+def parse_trip_dates(trips: pd.DataFrame) -> pd.Series:
+    """Data da viagem (TimestampDate ou TimeStamp) em UTC; números são epoch em milissegundos"""
+    raw = pd.Series(pd.NA, index=trips.index, dtype=object)
+    for column in ('TimeStamp', 'TimestampDate'):
+        if column in trips.columns:
+            values = trips[column]
+            raw = values.where(values.notna() & (values.astype(str) != ''), raw)
+
+    numeric = pd.to_numeric(raw, errors='coerce')
+    from_epoch = pd.to_datetime(numeric, unit='ms', errors='coerce', utc=True)
+    from_text = pd.to_datetime(raw.where(numeric.isna()), errors='coerce', utc=True, format='mixed')
+    return from_epoch.fillna(from_text)
+
+class FleetScorecardEngine:
+    """Calcula o scorecard preditivo de acidentes por motorista a partir das viagens"""
+
+    def __init__(self, connector):
+        self.connector = connector
+
+    def load_trips(self, enterprise_id: str, days: Optional[int] = None) -> pd.DataFrame:
+        """Busca as viagens da empresa (só os campos usados no scorecard)"""
+        start_date = (datetime.now() - timedelta(days=days)).isoformat() if days else None
+        return self.connector.get_collection_data('/trips', enterprise_id, start_date, columns=TRIP_COLUMNS)
+
+    def score_drivers(self, trips: pd.DataFrame, names: Dict[str, str] = None,
+                      days: Optional[int] = None) -> pd.DataFrame:
+        """Agrega as viagens por motorista e calcula chance de acidentes e nível de risco"""
+        if trips.empty or 'UserString' not in trips.columns:
+            return pd.DataFrame()
+
+        trips = trips.reindex(columns=TRIP_COLUMNS)
+        frame = pd.DataFrame({
+            'userString': trips['UserString'].astype('string').str.strip(),
+            'date': parse_trip_dates(trips),
+            'totalDistance': first_truthy(trips['TripDistance'], trips['distanceAverage']),
+            'totalScore': first_truthy(trips['score']),
+            'totalScoreML': first_truthy(trips['scoreML'])
+        })
+        for field, source in EVENT_FIELDS.items():
+            frame[field] = first_truthy(trips[source])
+
+        frame = frame[frame['userString'].notna() & (frame['userString'] != '')]
+        if days:
+            cutoff = pd.Timestamp(datetime.now(timezone.utc) - timedelta(days=days))
+            frame = frame[frame['date'] >= cutoff]
+        if frame.empty:
+            return pd.DataFrame()
+
+        grouped = frame.groupby('userString', sort=False)
+        drivers = grouped[['totalDistance', 'totalScore', 'totalScoreML', *EVENT_FIELDS]].sum()
+        drivers['totalTrips'] = grouped.size()
+        drivers['lastTrip'] = grouped['date'].max()
+
+        trip_count = drivers['totalTrips']
+        drivers['avgScore'] = drivers['totalScore'] / trip_count
+        drivers['avgScoreML'] = drivers['totalScoreML'] / trip_count
+
+        # Score alto = baixa chance; incidentes críticos por viagem aumentam a chance
+        critical = sum(drivers[field] / trip_count * weight for field, weight in CRITICAL_WEIGHTS.items())
+        drivers['accidentChance'] = (100 - drivers['avgScore'] + critical).clip(0, 100)
+        drivers['riskLevel'] = np.select(
+            [drivers['accidentChance'] >= RISK_THRESHOLDS['high'],
+             drivers['accidentChance'] >= RISK_THRESHOLDS['medium']],
+            ['high', 'medium'], default='low'
+        )
+
+        drivers = drivers.reset_index()
+        fallback = 'Motorista ' + drivers['userString'].str[:8] + '...'
+        mapped = drivers['userString'].map(names or {})
+        drivers['driverName'] = mapped.where(mapped.notna() & (mapped != 'N/A'), fallback).astype(str)
+
+        drivers[list(EVENT_FIELDS)] = drivers[list(EVENT_FIELDS)].round().astype(int)
+        return drivers.sort_values('accidentChance', ascending=False, kind='stable').reset_index(drop=True)
+
+    def summarize(self, drivers: pd.DataFrame) -> Dict[str, Any]:
+        """Métricas e dados dos gráficos do scorecard"""
+        if drivers.empty:
+            return {
+                'metrics': {'total_drivers': 0, 'total_trips': 0, 'total_distance': 0.0, 'avg_accident_chance': 0.0},
+                'risk_distribution': {'low': 0, 'medium': 0, 'high': 0},
+                'top_drivers': [],
+                'risk_by_frequency': dict.fromkeys(FREQUENCY_LABELS, 0.0),
+                'incident_types': {category: 0 for category in INCIDENT_CATEGORIES},
+                'incident_breakdown': {},
+                'risk_distance': []
+            }
+
+        risk_counts = drivers['riskLevel'].value_counts()
+        frequency = pd.cut(drivers['totalTrips'], FREQUENCY_BINS, labels=FREQUENCY_LABELS)
+        by_frequency = drivers['accidentChance'].groupby(frequency, observed=False).mean().fillna(0)
+        event_totals = drivers[list(EVENT_FIELDS)].sum()
+
+        return {
+            'metrics': {
+                'total_drivers': int(len(drivers)),
+                'total_trips': int(drivers['totalTrips'].sum()),
+                'total_distance': round(float(drivers['totalDistance'].sum()), 1),
+                'avg_accident_chance': round(float(drivers['accidentChance'].mean()), 2)
+            },
+            'risk_distribution': {level: int(risk_counts.get(level, 0)) for level in ('low', 'medium', 'high')},
+            'top_drivers': drivers.head(10)[['driverName', 'accidentChance', 'riskLevel']].round(2).to_dict('records'),
+            'risk_by_frequency': {label: round(float(value), 2) for label, value in by_frequency.items()},
+            'incident_types': {category: int(event_totals[fields].sum())
+                               for category, fields in INCIDENT_CATEGORIES.items()},
+            'incident_breakdown': {field: int(event_totals[field]) for field in EVENT_FIELDS},
+            'risk_distance': [{'x': round(x, 1), 'y': round(y, 2)} for x, y in
+                              zip(drivers['totalDistance'].tolist(), drivers['accidentChance'].tolist())]
+        }
+
+    def filter_drivers(self, drivers: pd.DataFrame, risk: str = 'all', name: str = '',
+                       min_chance: float = 0) -> pd.DataFrame:
+        """Filtros da tabela: nível de risco, trecho do nome e chance mínima"""
+        if drivers.empty:
+            return drivers
+        mask = drivers['accidentChance'] >= (min_chance or 0)
+        if risk and risk != 'all':
+            mask &= drivers['riskLevel'] == risk
+        if name:
+            mask &= drivers['driverName'].str.lower().str.contains(name.lower(), regex=False)
+        return drivers[mask]
+
+    def build_scorecard(self, trips: pd.DataFrame, names: Dict[str, str] = None, days: Optional[int] = None,
+                        risk: str = 'all', name: str = '', min_chance: float = 0,
+                        page: int = 1, per_page: int = 50) -> Dict[str, Any]:
+        """Scorecard completo: agregados de todos os motoristas e a página filtrada da tabela
+
+        per_page = 0 retorna todos os motoristas filtrados numa única página.
+        """
+        drivers = self.score_drivers(trips, names, days)
+        result = self.summarize(drivers)
+
+        filtered = self.filter_drivers(drivers, risk, name, min_chance)
+        total = int(len(filtered))
+        per_page = total if per_page <= 0 else per_page
+        page = max(1, page)
+        page_frame = filtered.iloc[(page - 1) * per_page:page * per_page] if per_page else filtered
+
+        columns = ['driverName', 'userString', 'totalTrips', 'totalDistance', 'avgScore', 'avgScoreML',
+                   'accidentChance', 'riskLevel', 'lastTrip', *EVENT_FIELDS]
+        table = page_frame[columns].copy() if not page_frame.empty else pd.DataFrame(columns=columns)
+        table[['totalDistance', 'avgScore', 'avgScoreML', 'accidentChance']] = \
+            table[['totalDistance', 'avgScore', 'avgScoreML', 'accidentChance']].astype(float).round(2)
+        table['lastTrip'] = table['lastTrip'].map(lambda ts: ts.isoformat() if pd.notna(ts) else None)
+
+        result['drivers'] = table.to_dict('records')
+        result['pagination'] = {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': int(np.ceil(total / per_page)) if per_page else 1
+        }
+        return result
@@ -0,0 +1,295 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Ingestão em Streaming das Respostas JSON da API
+"""
+
+import sys
+import json
+import time
+import codecs
+import logging
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
+
+import pandas as pd
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\r\n'
+
+# Caminho dos registros na resposta de cada endpoint da API (notação do ijson);
+# os endpoints fora desta tabela respondem um array na raiz
+RECORD_PATHS = {
+    '/checklist': 'data.item',
+    '/vehicles': 'data.item',
+    '/trips': 'data.item',
+    '/users': 'data.item',
+    '/alelo-supply-history': 'data.item',
+}
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def iter_json_array(chunks: Iterable[bytes], keys: Iterable[str] = ()) -> Iterator[Any]:
+    """Decodifica incrementalmente um array JSON, item a item, a partir de blocos de bytes
+
+    Mantém em memória apenas o trecho ainda não decodificado. Com keys, o
+    array é procurado dentro de objetos aninhados ({"data": [...]} com
+    keys=['data']): os demais campos do caminho são decodificados e
+    descartados, e um caminho ausente não produz registros. Sem keys,
+    respostas que não são um array são decodificadas inteiras (listas são
+    expandidas).
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    keys = list(keys)
+    state = {'buffer': '', 'exhausted': False}
+
+    def fill() -> bool:
+        """Acrescenta o próximo bloco ao buffer; False quando o corpo terminou"""
+        if state['exhausted']:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            state['exhausted'] = True
+            state['buffer'] += text_decoder.decode(b'', final=True)
+        else:
+            state['buffer'] += text_decoder.decode(chunk)
+        return True
+
+    def skip(pos: int, chars: str) -> int:
+        """Avança pos sobre os caracteres dados, lendo mais blocos se preciso"""
+        while True:
+            buffer = state['buffer']
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return pos
+
+    def decode(pos: int, closers: str) -> Tuple[Any, int]:
+        """Decodifica o valor em pos, lendo mais blocos até ele ficar completo"""
+        while True:
+            buffer = state['buffer']
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # Valor incompleto: lê mais um bloco e tenta de novo
+                if not fill():
+                    raise
+                continue
+
+            # Um número pode continuar no próximo bloco ("12" + ".5", "-3" + "e10"):
+            # o valor só é aceito quando seguido de um dos delimitadores
+            after = end
+            while after < len(buffer) and buffer[after] in _WHITESPACE:
+                after += 1
+            if (after == len(buffer) or buffer[after] not in closers) and fill():
+                continue
+            return value, end
+
+    def compact(pos: int) -> int:
+        """Descarta o trecho já decodificado para não acumular o corpo inteiro"""
+        if pos > 65536:
+            state['buffer'] = state['buffer'][pos:]
+            return 0
+        return pos
+
+    pos = skip(0, _WHITESPACE)
+    for key in keys:
+        if pos >= len(state['buffer']) or state['buffer'][pos] != '{':
+            return
+        pos += 1
+        while True:
+            pos = skip(pos, _WHITESPACE + ',')
+            if pos >= len(state['buffer']):
+                raise ValueError("JSON truncado: objeto não foi fechado")
+            if state['buffer'][pos] == '}':
+                return
+            name, pos = decode(pos, ':')
+            pos = skip(pos, _WHITESPACE + ':')
+            if name == key:
+                break
+            _, pos = decode(pos, ',}')
+            pos = compact(pos)
+
+    if pos >= len(state['buffer']):
+        return
+    if state['buffer'][pos] != '[':
+        if keys:
+            return
+        # Não é um array: decodifica o corpo inteiro
+        while fill():
+            pass
+        data = json.loads(state['buffer'][pos:])
+        yield from (data if isinstance(data, list) else [data])
+        return
+
+    pos += 1
+    while True:
+        pos = skip(pos, _WHITESPACE + ',')
+        if pos >= len(state['buffer']):
+            raise ValueError("JSON truncado: array não foi fechado")
+        if state['buffer'][pos] == ']':
+            return
+
+        item, pos = decode(pos, ',]')
+        yield item
+        pos = compact(pos)
+
+def record_path_for(endpoint: str) -> str:
+    """Caminho dos registros na resposta do endpoint ('data.item' para {"data": [...]})"""
+    return RECORD_PATHS.get(endpoint, 'item')
+
+def select_records(data: Any, record_path: str = 'item') -> Iterator[Any]:
+    """Percorre um JSON já decodificado pelo caminho no formato do ijson ('item', 'data.item')"""
+    parts = record_path.split('.')
+
+    def walk(obj: Any, index: int) -> Iterator[Any]:
+        if index == len(parts):
+            yield obj
+        elif parts[index] == 'item':
+            if isinstance(obj, list):
+                for value in obj:
+                    yield from walk(value, index + 1)
+        elif isinstance(obj, dict) and parts[index] in obj:
+            yield from walk(obj[parts[index]], index + 1)
+
+    return walk(data, 0)
+
+def iter_response_records(response, record_path: str = 'item', chunk_size: int = 65536) -> Iterator[Any]:
+    """Itera os registros de uma resposta HTTP (stream=True) sem carregar o corpo inteiro
+
+    record_path segue a notação do ijson: 'item' para um array na raiz e
+    'data.item' para respostas no formato {"data": [...]}. Sem ijson, caminhos
+    que terminam no array ('item', 'data.item') são lidos em streaming por
+    iter_json_array; os demais são decodificados inteiros.
+    """
+    if ijson is not None:
+        # Descompacta gzip/deflate no próprio stream antes do parser
+        response.raw.decode_content = True
+        return ijson.items(response.raw, record_path, use_float=True)
+    *keys, last = record_path.split('.')
+    if last == 'item' and 'item' not in keys:
+        return iter_json_array(response.iter_content(chunk_size=chunk_size), keys)
+    return select_records(json.loads(response.content), record_path)
+
+def split_columns(columns: List[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Separa a projeção em chaves de topo e campos aninhados ('location.latitude')
+
+    As chaves de topo incluem o pai de cada campo aninhado e o próprio nome
+    com ponto, que é como o campo aparece em registros já achatados (cache).
+    """
+    keys = []
+    nested: Dict[str, List[str]] = {}
+    for column in columns:
+        parent, _, field = column.partition('.')
+        if field:
+            nested.setdefault(parent, []).append(field)
+            for key in (parent, column):
+                if key not in keys:
+                    keys.append(key)
+        elif column not in keys:
+            keys.append(column)
+    return keys, nested
+
+def flatten_nested(frame: pd.DataFrame, nested: Dict[str, List[str]],
+                   keep: Iterable[str] = ()) -> pd.DataFrame:
+    """Achata objetos aninhados em colunas 'pai.campo' de forma vetorizada
+
+    Os dicionários de cada coluna pai são convertidos de uma vez pelo
+    construtor do DataFrame; valores que não são objeto viram NaN. A coluna
+    pai é descartada (a menos que esteja em keep), então nenhum objeto
+    aninhado fica retido no DataFrame.
+    """
+    for parent, fields in nested.items():
+        if parent not in frame.columns:
+            continue
+        values = frame[parent]
+        is_object = values.map(lambda value: isinstance(value, dict)).astype(bool)
+        flat = pd.DataFrame(values[is_object].tolist(), columns=fields, index=values.index[is_object])
+        flat = flat.reindex(values.index)
+        for field in fields:
+            column = f'{parent}.{field}'
+            # Registros já achatados (ex.: vindos do cache) trazem o campo com ponto
+            frame[column] = flat[field].where(is_object, frame[column]) if column in frame.columns else flat[field]
+        if parent not in keep:
+            frame = frame.drop(columns=parent)
+    return frame
+
+def records_to_frame(records: Iterable[Dict[str, Any]], columns: List[str] = None,
+                     chunk_size: int = 5000) -> pd.DataFrame:
+    """Monta o DataFrame em blocos, mantendo apenas as colunas pedidas
+
+    Só um bloco de dicionários fica vivo por vez. Colunas pedidas que não
+    aparecem em nenhum registro são omitidas, como em pd.DataFrame(records).
+    Colunas com ponto ('location.latitude') são extraídas do objeto aninhado
+    em cada bloco, sem guardar o objeto.
+    """
+    frames = []
+    chunk = []
+    seen = set()
+    keys, nested = split_columns(columns) if columns is not None else (None, {})
+
+    def flush():
+        if columns is None:
+            frames.append(pd.DataFrame(chunk))
+        else:
+            frame = pd.DataFrame.from_records(chunk, columns=keys)
+            frames.append(flatten_nested(frame, nested, keep=columns))
+        chunk.clear()
+
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        if columns is not None:
+            record = {key: record[key] for key in keys if key in record}
+            seen.update(record)
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    if not frames:
+        return pd.DataFrame()
+
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    if columns is not None:
+        df = df[[column for column in columns if column in seen or column.partition('.')[0] in seen]]
+    return df
+
+def stream_frame(response, columns: List[str] = None, chunk_size: int = 5000,
+                 record_path: str = 'item') -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Converte uma resposta HTTP em DataFrame via streaming e retorna as métricas da ingestão"""
+    started = time.perf_counter()
+    rss_before = peak_rss_mb()
+
+    df = records_to_frame(iter_response_records(response, record_path), columns, chunk_size)
+
+    rss_after = peak_rss_mb()
+    stats = {
+        'records': len(df),
+        'columns': len(df.columns),
+        'frame_mb': round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2),
+        'peak_rss_mb': rss_after,
+        'peak_rss_growth_mb': round(rss_after - rss_before, 1) if rss_after is not None else None,
+        'parser': 'ijson' if ijson is not None else 'json',
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    return df, stats
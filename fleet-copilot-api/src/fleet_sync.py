@@ -0,0 +1,312 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Sincronização Incremental das Collections em Armazenamento Local
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from itertools import islice
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+
+import pandas as pd
+
+try:
+    from src.fleet_cache import SingleFlight
+    from src.fleet_stream import iter_response_records, record_path_for
+except ImportError:
+    from fleet_cache import SingleFlight
+    from fleet_stream import iter_response_records, record_path_for
+
+logger = logging.getLogger(__name__)
+
+def default_store_path() -> str:
+    """Caminho padrão do armazenamento local, compartilhado pelos workers da mesma máquina"""
+    return os.getenv('FLEET_STORE_PATH', os.path.join(tempfile.gettempdir(), 'fleet_copilot_store.sqlite3'))
+
+def record_id(record: Dict[str, Any]) -> str:
+    """Identificador do registro: id do documento ou hash do conteúdo"""
+    doc_id = record.get('id') or record.get('_doc_id') or record.get('uid')
+    if doc_id:
+        return str(doc_id)
+    raw = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def normalize_timestamps(values: List[Any]) -> List[Optional[str]]:
+    """Converte timestamps para ISO sem fuso (UTC), comparáveis como texto"""
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True)
+    parsed = parsed.dt.tz_localize(None)
+    return [ts.strftime('%Y-%m-%dT%H:%M:%S.%f') if pd.notna(ts) else None for ts in parsed]
+
+class FleetLocalStore:
+    """Armazenamento local das collections em SQLite, particionado por empresa e dia
+
+    Cada registro é guardado uma única vez por (collection, empresa, id), com
+    o timestamp normalizado e o dia de referência para leitura por janela e
+    limpeza por retenção.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or default_store_path()
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão curta por operação (seguro entre processos e greenlets)"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Cria as tabelas do armazenamento se necessário"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    collection TEXT NOT NULL,
+                    enterprise_id TEXT NOT NULL,
+                    record_id TEXT NOT NULL,
+                    day TEXT,
+                    timestamp TEXT,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (collection, enterprise_id, record_id)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_records_window
+                ON records (collection, enterprise_id, timestamp)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_records_day
+                ON records (collection, enterprise_id, day)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    collection TEXT NOT NULL,
+                    enterprise_id TEXT NOT NULL,
+                    high_water_mark TEXT,
+                    last_sync_at REAL,
+                    PRIMARY KEY (collection, enterprise_id)
+                )
+            """)
+
+    def upsert(self, collection: str, enterprise_id: str, records: List[Dict[str, Any]]) -> Optional[str]:
+        """Grava (ou substitui) registros e retorna o maior timestamp do lote"""
+        if not records:
+            return None
+
+        timestamps = normalize_timestamps([r.get('timestamp') for r in records])
+        rows = [
+            (collection, enterprise_id, record_id(record), ts[:10] if ts else None, ts,
+             json.dumps(record, default=str))
+            for record, ts in zip(records, timestamps)
+        ]
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO records "
+                "(collection, enterprise_id, record_id, day, timestamp, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+        valid = [ts for ts in timestamps if ts]
+        return max(valid) if valid else None
+
+    def read(self, collection: str, enterprise_id: str,
+             start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
+        """Lê os registros da empresa na janela informada (limites inclusivos)"""
+        query = "SELECT payload FROM records WHERE collection = ? AND enterprise_id = ?"
+        args: List[Any] = [collection, enterprise_id]
+
+        bounds = normalize_timestamps([start_date, end_date])
+        if start_date and bounds[0]:
+            query += " AND timestamp >= ?"
+            args.append(bounds[0])
+        if end_date and bounds[1]:
+            query += " AND timestamp <= ?"
+            args.append(bounds[1])
+
+        with self._connect() as conn:
+            return [json.loads(row[0]) for row in conn.execute(query, args)]
+
+    def read_days(self, collection: str, enterprise_id: str, days: Iterable[str]) -> List[Dict[str, Any]]:
+        """Lê os registros da empresa nos dias (partições) informados"""
+        days = sorted(set(days))
+        records: List[Dict[str, Any]] = []
+        with self._connect() as conn:
+            for start in range(0, len(days), 500):
+                batch = days[start:start + 500]
+                records.extend(json.loads(row[0]) for row in conn.execute(
+                    f"SELECT payload FROM records WHERE collection = ? AND enterprise_id = ? "
+                    f"AND day IN ({', '.join('?' * len(batch))})",
+                    [collection, enterprise_id, *batch]
+                ))
+        return records
+
+    def days(self, collection: str, enterprise_id: str) -> List[str]:
+        """Dias com registros da empresa no armazenamento"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT DISTINCT day FROM records WHERE collection = ? AND enterprise_id = ? "
+                "AND day IS NOT NULL ORDER BY day",
+                (collection, enterprise_id)
+            )]
+
+    def get_state(self, collection: str, enterprise_id: str) -> Dict[str, Any]:
+        """High-water mark e horário da última sincronização"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT high_water_mark, last_sync_at FROM sync_state WHERE collection = ? AND enterprise_id = ?",
+                (collection, enterprise_id)
+            ).fetchone()
+        return {'high_water_mark': row[0] if row else None, 'last_sync_at': row[1] if row else None}
+
+    def set_state(self, collection: str, enterprise_id: str, high_water_mark: Optional[str]):
+        """Atualiza o high-water mark (nunca retrocede) e o horário da sincronização"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sync_state (collection, enterprise_id, high_water_mark, last_sync_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(collection, enterprise_id) DO UPDATE SET "
+                "high_water_mark = MAX(COALESCE(high_water_mark, ''), COALESCE(excluded.high_water_mark, '')), "
+                "last_sync_at = excluded.last_sync_at",
+                (collection, enterprise_id, high_water_mark, time.time())
+            )
+
+    def prune(self, before_day: str, collection: str = None, enterprise_id: str = None) -> int:
+        """Remove partições (dias) anteriores a before_day (YYYY-MM-DD)"""
+        query = "DELETE FROM records WHERE day < ?"
+        args: List[Any] = [before_day]
+        if collection:
+            query += " AND collection = ?"
+            args.append(collection)
+        if enterprise_id:
+            query += " AND enterprise_id = ?"
+            args.append(enterprise_id)
+        with self._connect() as conn:
+            return conn.execute(query, args).rowcount
+
+class FleetDeltaSync:
+    """Sincroniza apenas os registros novos de cada collection por empresa
+
+    A cada sincronização busca os registros com timestamp a partir do último
+    high-water mark (menos uma sobreposição, para capturar registros que
+    chegam atrasados) e os grava no FleetLocalStore. Sincronizações da mesma
+    collection e empresa são espaçadas por min_interval segundos.
+
+    A resposta é lida em streaming e gravada em lotes. A primeira
+    sincronização busca só os últimos initial_days dias, e partições com mais
+    de retention_days dias são removidas após cada sincronização (None busca
+    e mantém todo o histórico).
+
+    Listeners registrados por collection recebem (enterprise_id, dias) com
+    os dias que receberam registros em cada sincronização.
+    """
+
+    def __init__(self, connector, store: FleetLocalStore = None, min_interval: int = 60,
+                 overlap: timedelta = timedelta(hours=6), initial_days: Optional[int] = None,
+                 retention_days: Optional[int] = None, batch_size: int = 5000):
+        self.connector = connector
+        self.store = store or FleetLocalStore()
+        self.min_interval = min_interval
+        self.overlap = overlap
+        self.initial_days = initial_days
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self._inflight = SingleFlight()
+        self._listeners: Dict[str, List[Callable[[str, List[str]], None]]] = {}
+
+    def add_listener(self, endpoint: str, callback: Callable[[str, List[str]], None]):
+        """Registra um callback chamado com (enterprise_id, dias alterados) após cada sincronização"""
+        self._listeners.setdefault(endpoint, []).append(callback)
+
+    def _notify(self, endpoint: str, enterprise_id: str, days: List[str]):
+        for callback in self._listeners.get(endpoint, []):
+            try:
+                callback(enterprise_id, days)
+            except Exception as e:
+                logger.warning(f"Falha ao processar os dias sincronizados de {endpoint} ({enterprise_id}): {e}")
+
+    def covers(self, start_date: Optional[str]) -> bool:
+        """Indica se a janela a partir de start_date cabe no histórico mantido no armazenamento"""
+        horizon = [days for days in (self.initial_days, self.retention_days) if days]
+        if not horizon:
+            return True
+        start = normalize_timestamps([start_date])[0] if start_date else None
+        oldest = datetime.utcnow() - timedelta(days=min(horizon))
+        return start is not None and start >= oldest.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+    def sync(self, endpoint: str, enterprise_id: str, force: bool = False) -> int:
+        """Sincroniza o delta da collection; retorna a quantidade de registros recebidos"""
+        return self._inflight.do(f"{endpoint}:{enterprise_id}", self._sync, endpoint, enterprise_id, force)
+
+    def _sync(self, endpoint: str, enterprise_id: str, force: bool) -> int:
+        state = self.store.get_state(endpoint, enterprise_id)
+        if not force and state['last_sync_at'] and time.time() - state['last_sync_at'] < self.min_interval:
+            return 0
+
+        since = None
+        if state['high_water_mark']:
+            since = datetime.fromisoformat(state['high_water_mark']) - self.overlap
+        elif self.initial_days:
+            since = datetime.utcnow() - timedelta(days=self.initial_days)
+
+        params = self.connector._build_query_params(enterprise_id, since.isoformat() if since else None,
+                                                    exact=True)
+        result = self.connector._request_upstream(
+            endpoint, params, lambda response: self._ingest(endpoint, enterprise_id, response, since),
+            stream=True)
+        if result is None:
+            logger.warning(f"Sincronização {endpoint} ({enterprise_id}) falhou; mantendo o armazenamento local")
+            return 0
+
+        received, high_water_mark, days = result
+        self.store.set_state(endpoint, enterprise_id, high_water_mark)
+        if days:
+            self._notify(endpoint, enterprise_id, days)
+
+        if self.retention_days:
+            before_day = (datetime.utcnow() - timedelta(days=self.retention_days)).strftime('%Y-%m-%d')
+            pruned = self.store.prune(before_day, endpoint, enterprise_id)
+            if pruned:
+                logger.info(f"Retenção {endpoint} ({enterprise_id}): {pruned} registros anteriores a {before_day} removidos")
+
+        logger.info(f"Sincronização {endpoint} ({enterprise_id}): {received} registros desde "
+                    f"{since.isoformat() if since else 'o início'}")
+        return received
+
+    def _ingest(self, endpoint: str, enterprise_id: str, response,
+                since: Optional[datetime]) -> Tuple[int, Optional[str], List[str]]:
+        """Grava a resposta em lotes, sem carregar o corpo inteiro; retorna (registros, high-water mark, dias)"""
+        records = iter_response_records(response, record_path_for(endpoint))
+        cutoff = since.strftime('%Y-%m-%dT%H:%M:%S.%f') if since is not None else None
+        received, high_water_mark, days = 0, None, set()
+
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            timestamps = normalize_timestamps([r.get('timestamp') for r in batch])
+
+            # Fallback quando o servidor ignora startDate: descarta o que já está no store
+            if cutoff is not None:
+                kept = [(r, ts) for r, ts in zip(batch, timestamps) if ts is None or ts >= cutoff]
+                batch = [r for r, _ in kept]
+                timestamps = [ts for _, ts in kept]
+
+            batch_mark = self.store.upsert(endpoint, enterprise_id, batch)
+            if batch_mark and (high_water_mark is None or batch_mark > high_water_mark):
+                high_water_mark = batch_mark
+            days.update(ts[:10] for ts in timestamps if ts)
+            received += len(batch)
+
+        return received, high_water_mark, sorted(days)
@@ -0,0 +1,259 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Tendências Semanais e Previsões sobre os Agregados Diários
+"""
+
+import logging
+from statistics import NormalDist
+from typing import Dict, List, Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    from src.fleet_rollups import ChecklistRollup
+except ImportError:
+    from fleet_rollups import ChecklistRollup
+
+logger = logging.getLogger(__name__)
+
+WEEK_COLUMNS = ['week', 'year', 'week_number', 'total', 'compliant', 'compliance_rate',
+                'rolling_rate', 'ewma']
+
+def week_label(year: int, week: int) -> str:
+    """Rótulo ISO da semana (ex.: 2025-W01), único entre anos diferentes"""
+    return f"{int(year)}-W{int(week):02d}"
+
+def week_starts(days: pd.Series) -> pd.Series:
+    """Segunda-feira da semana ISO de cada dia (YYYY-MM-DD)"""
+    dates = pd.to_datetime(days)
+    return (dates - pd.to_timedelta(dates.dt.weekday, unit='D')).dt.normalize()
+
+def _week_frame(starts: pd.DatetimeIndex) -> pd.DataFrame:
+    """Chaves (ano ISO, semana ISO) das segundas-feiras informadas"""
+    iso = starts.isocalendar()
+    return pd.DataFrame({
+        'week': [week_label(y, w) for y, w in zip(iso['year'], iso['week'])],
+        'year': iso['year'].astype(int).to_numpy(),
+        'week_number': iso['week'].astype(int).to_numpy()
+    }, index=starts)
+
+def weekly_compliance(rollup: ChecklistRollup, window: int = 4, span: int = 4) -> pd.DataFrame:
+    """Série semanal de conformidade da frota, chaveada por (ano ISO, semana)
+
+    Semanas sem verificações dentro do intervalo entram com total 0 e taxa
+    NaN, para que média móvel, EWMA e previsão respeitem o espaçamento real.
+    A média móvel é a razão das somas (ponderada pelo volume de cada semana).
+    """
+    if rollup.empty:
+        return pd.DataFrame(columns=WEEK_COLUMNS)
+
+    days = rollup.days
+    sums = days.groupby(week_starts(days['day']))[['total', 'compliant']].sum()
+    sums = sums.reindex(pd.date_range(sums.index.min(), sums.index.max(), freq='7D'), fill_value=0)
+
+    frame = _week_frame(sums.index)
+    frame['total'] = sums['total'].astype(int)
+    frame['compliant'] = sums['compliant'].astype(int)
+    frame['compliance_rate'] = (frame['compliant'] / frame['total'].where(frame['total'] > 0)) * 100
+
+    rolling = sums.rolling(window, min_periods=1).sum()
+    frame['rolling_rate'] = rolling['compliant'] / rolling['total'].where(rolling['total'] > 0) * 100
+    frame['ewma'] = frame['compliance_rate'].ewm(span=span, ignore_na=True).mean()
+    return frame[WEEK_COLUMNS]
+
+def _rolling_sum(matrix: np.ndarray, window: int) -> np.ndarray:
+    """Soma móvel por coluna (janela nas linhas) via soma acumulada, sem laço por coluna"""
+    cumulative = np.cumsum(matrix, axis=0)
+    shifted = np.zeros_like(cumulative)
+    shifted[window:] = cumulative[:-window]
+    return cumulative - shifted
+
+def entity_trends(rollup: ChecklistRollup, window: int = 4, span: int = 4) -> pd.DataFrame:
+    """Tendência semanal de todos os veículos e motoristas de uma vez
+
+    As semanas viram linhas e cada entidade (tipo, nome) uma coluna; média
+    móvel, EWMA e inclinação (mínimos quadrados, ignorando semanas sem
+    verificação) são calculadas sobre a matriz inteira, sem laço por entidade.
+    """
+    columns = ['kind', 'name', 'checks', 'weeks', 'last_rate', 'rolling_rate', 'ewma',
+               'ewma_change', 'slope']
+    entities = rollup.entities
+    if entities.empty:
+        return pd.DataFrame(columns=columns)
+
+    week = week_starts(entities['day'])
+    sums = (entities.assign(week=week).groupby(['week', 'kind', 'name'], sort=False)[['total', 'compliant']]
+            .sum().unstack(['kind', 'name'], fill_value=0))
+    weeks = pd.date_range(sums.index.min(), sums.index.max(), freq='7D')
+    totals = sums['total'].reindex(weeks, fill_value=0)
+    compliant = sums['compliant'].reindex(weeks, fill_value=0)[totals.columns]
+
+    rates = compliant / totals.where(totals > 0) * 100
+    rolling_totals = _rolling_sum(totals.to_numpy(dtype=float), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rolling = pd.DataFrame(_rolling_sum(compliant.to_numpy(dtype=float), window) / rolling_totals * 100,
+                               index=weeks, columns=totals.columns)
+    ewma = rates.ewm(span=span, ignore_na=True).mean()
+
+    # Inclinação por coluna (pontos por semana), só com as semanas observadas
+    values = rates.to_numpy()
+    mask = ~np.isnan(values)
+    x = np.arange(len(weeks), dtype=float)[:, None]
+    n = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(mask, x, 0).sum(axis=0) / n
+        y_mean = np.where(mask, values, 0).sum(axis=0) / n
+        dx = np.where(mask, x - x_mean, 0)
+        slope = (dx * np.where(mask, values - y_mean, 0)).sum(axis=0) / (dx ** 2).sum(axis=0)
+    slope = np.where(n >= 2, slope, np.nan)
+
+    last_rate = rates.ffill().iloc[-1]
+    previous_ewma = ewma.shift(1).ffill().iloc[-1] if len(weeks) > 1 else ewma.iloc[-1]
+    result = pd.DataFrame({
+        'checks': totals.sum().astype(int),
+        'weeks': pd.Series(n, index=totals.columns).astype(int),
+        'last_rate': last_rate,
+        'rolling_rate': rolling.ffill().iloc[-1],
+        'ewma': ewma.iloc[-1],
+        'ewma_change': ewma.iloc[-1] - previous_ewma,
+        'slope': pd.Series(slope, index=totals.columns)
+    })
+    return result.rename_axis(['kind', 'name']).reset_index()[columns]
+
+def _z(confidence: float) -> float:
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+def _bounded(value: float) -> float:
+    return float(min(100.0, max(0.0, value)))
+
+def linear_forecast(series: pd.Series, horizon: int = 1, confidence: float = 0.95) -> Dict[str, Any]:
+    """Previsão por regressão linear com intervalo de predição
+
+    series: taxas (%) em passos regulares; NaN marca passos sem dado e
+    mantém o espaçamento. Com menos de 3 pontos, usa a média e o desvio.
+    """
+    values = series.to_numpy(dtype=float)
+    x = np.arange(len(values), dtype=float)
+    mask = ~np.isnan(values)
+    x, y = x[mask], values[mask]
+    if len(y) == 0:
+        return {}
+
+    target = len(values) - 1 + horizon
+    z = _z(confidence)
+    if len(y) < 3:
+        value = float(y.mean())
+        margin = z * float(y.std(ddof=1)) if len(y) > 1 else 0.0
+        return {'value': round(_bounded(value), 2), 'lower': round(_bounded(value - margin), 2),
+                'upper': round(_bounded(value + margin), 2), 'slope': 0.0, 'method': 'mean',
+                'confidence': confidence}
+
+    slope, intercept = np.polyfit(x, y, 1)
+    residuals = y - (slope * x + intercept)
+    sigma = np.sqrt((residuals ** 2).sum() / (len(y) - 2))
+    sxx = ((x - x.mean()) ** 2).sum()
+    margin = z * sigma * np.sqrt(1 + 1 / len(y) + (target - x.mean()) ** 2 / sxx)
+    value = slope * target + intercept
+    return {'value': round(_bounded(value), 2), 'lower': round(_bounded(value - margin), 2),
+            'upper': round(_bounded(value + margin), 2), 'slope': round(float(slope), 3),
+            'method': 'linear', 'confidence': confidence}
+
+def seasonal_forecast(rollup: ChecklistRollup, period: int = 7, horizon: int = 7,
+                      confidence: float = 0.95) -> List[Dict[str, Any]]:
+    """Previsão diária com tendência linear + sazonalidade por dia da semana
+
+    Exige ao menos dois ciclos completos (2 x period dias com dado). A
+    inclinação e o nível de cada posição do ciclo são ajustados juntos por
+    mínimos quadrados (ajustar a tendência antes confundiria o padrão
+    semanal com inclinação); a banda vem do desvio dos resíduos.
+    """
+    days = rollup.days[rollup.days['total'] > 0]
+    if days.empty:
+        return []
+
+    dates = pd.to_datetime(days['day'])
+    full = pd.date_range(dates.min(), dates.max(), freq='D')
+    rates = (days['compliant'] / days['total'] * 100).set_axis(dates).reindex(full)
+    values = rates.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    if mask.sum() < 2 * period:
+        return []
+
+    x = np.arange(len(values), dtype=float)
+    phase = np.arange(len(values)) % period
+    observed = np.unique(phase[mask])
+    design = np.column_stack([x, phase[:, None] == observed[None, :]]).astype(float)
+    coefficients = np.linalg.lstsq(design[mask], values[mask], rcond=None)[0]
+    slope = coefficients[0]
+    # Posições do ciclo sem nenhum dado ficam com o nível médio
+    levels = np.full(period, coefficients[1:].mean())
+    levels[observed] = coefficients[1:]
+
+    residuals = values[mask] - design[mask] @ coefficients
+    sigma = float(np.sqrt((residuals ** 2).sum() / max(mask.sum() - len(observed) - 1, 1)))
+    margin = _z(confidence) * sigma * np.sqrt(1 + 1 / mask.sum())
+
+    forecast = []
+    for step in range(1, horizon + 1):
+        position = len(values) - 1 + step
+        value = slope * position + levels[position % period]
+        forecast.append({
+            'date': (full[-1] + pd.Timedelta(days=step)).strftime('%Y-%m-%d'),
+            'value': round(_bounded(value), 2),
+            'lower': round(_bounded(value - margin), 2),
+            'upper': round(_bounded(value + margin), 2)
+        })
+    return forecast
+
+class FleetTrendEngine:
+    """Tendências semanais e previsões calculadas só sobre os agregados diários
+
+    Tudo parte do ChecklistRollup (linhas por dia e por entidade), então o
+    custo depende do número de dias e entidades da janela, não do volume de
+    checklists, e cabe em toda chamada de /insights.
+    """
+
+    def __init__(self, window: int = 4, span: int = 4, confidence: float = 0.95,
+                 min_checks: int = 5, change_threshold: float = 5.0):
+        self.window = window
+        self.span = span
+        self.confidence = confidence
+        self.min_checks = min_checks
+        self.change_threshold = change_threshold
+
+    def analyze(self, rollup: ChecklistRollup) -> Dict[str, Any]:
+        """Série semanal, entidades em alta/queda e previsões (semana seguinte e próximos dias)"""
+        weekly = weekly_compliance(rollup, self.window, self.span)
+        entities = entity_trends(rollup, self.window, self.span)
+
+        significant = entities[(entities['checks'] >= self.min_checks) & (entities['weeks'] >= 2)]
+        # Variação da última semana confirmada pela inclinação de toda a janela
+        declining = significant[(significant['ewma_change'] <= -self.change_threshold)
+                                & (significant['slope'] < 0)].sort_values('ewma_change')
+        improving = significant[(significant['ewma_change'] >= self.change_threshold)
+                                & (significant['slope'] > 0)].sort_values('ewma_change', ascending=False)
+
+        return {
+            'weekly': weekly,
+            'entities': entities,
+            'declining': declining,
+            'improving': improving,
+            'next_week': linear_forecast(weekly['compliance_rate'], 1, self.confidence) if not weekly.empty else {},
+            'daily': seasonal_forecast(rollup, horizon=7, confidence=self.confidence)
+        }
+
+def entity_records(frame: pd.DataFrame, limit: int = 10) -> List[Dict[str, Any]]:
+    """Entidades em formato serializável (taxas arredondadas)"""
+    records = []
+    for row in frame.head(limit).itertuples(index=False):
+        records.append({
+            'kind': row.kind,
+            'name': row.name,
+            'checks': int(row.checks),
+            'compliance_rate': round(float(row.last_rate), 2),
+            'ewma': round(float(row.ewma), 2),
+            'ewma_change': round(float(row.ewma_change), 2),
+            'slope': None if pd.isna(row.slope) else round(float(row.slope), 3)
+        })
+    return records
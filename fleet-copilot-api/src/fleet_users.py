@@ -0,0 +1,251 @@
+"""
+Copiloto Inteligente de Gestão de Frotas
+Diretório de Usuários (userID -> nome) Compartilhado entre Workers
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Iterable
+
+import pandas as pd
+
+try:
+    from src.fleet_cache import SingleFlight
+except ImportError:
+    from fleet_cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Campos lidos da collection /users (projeção na ingestão)
+USER_COLUMNS = ['uid', 'id', '_doc_id', 'display_name']
+
+# Limite de parâmetros por consulta IN (abaixo do limite do SQLite)
+LOOKUP_BATCH = 500
+
+# Campos dos registros que podem conter o userID do motorista
+USER_ID_FIELDS = ['UserString', 'userId', 'driverId', 'motorista']
+
+def default_users_path() -> str:
+    """Caminho padrão do diretório de usuários, compartilhado pelos workers da mesma máquina"""
+    return os.getenv('FLEET_USERS_PATH', os.path.join(tempfile.gettempdir(), 'fleet_copilot_users.sqlite3'))
+
+def users_frame_to_names(users: pd.DataFrame) -> pd.DataFrame:
+    """Pares (user_id, name) válidos: id = uid, id ou _doc_id; nomes ausentes ou 'N/A' são descartados"""
+    if users.empty:
+        return pd.DataFrame(columns=['user_id', 'name'])
+
+    users = users.reindex(columns=USER_COLUMNS)
+    user_id = pd.Series(pd.NA, index=users.index, dtype=object)
+    for column in reversed(['uid', 'id', '_doc_id']):
+        values = users[column]
+        user_id = values.where(values.notna() & (values.astype(str) != ''), user_id)
+
+    names = pd.DataFrame({'user_id': user_id, 'name': users['display_name']})
+    names = names[names['user_id'].notna() & names['name'].notna() & (names['name'] != 'N/A')]
+    names = names.astype({'user_id': str, 'name': str})
+    return names.drop_duplicates('user_id', keep='first')
+
+def enrich_frame(frame: pd.DataFrame, names: Dict[str, str], fields: Iterable[str] = USER_ID_FIELDS) -> pd.DataFrame:
+    """Adiciona {campo}_name para cada campo de id presente, com um join vetorizado contra names
+
+    Como no enriquecimento por registro: ids sem nome recebem 'Motorista
+    <8 primeiros caracteres>...' e ids nulos ou vazios 'N/A'. Campos que não
+    existem no frame não geram coluna {campo}_name.
+    """
+    enriched = frame.copy(deep=False)
+    for field in fields:
+        if field not in frame.columns:
+            continue
+        ids = frame[field].astype(str).where(frame[field].notna(), '')
+        fallback = ('Motorista ' + ids.str[:8] + '...').where(ids != '', 'N/A')
+        enriched[f'{field}_name'] = ids.map(names).fillna(fallback)
+    return enriched
+
+class FleetUserDirectory:
+    """Índice userID -> nome por empresa, em SQLite compartilhado pelos workers
+
+    - Dentro de ttl segundos o índice é usado direto.
+    - Entre ttl e stale_ttl o índice antigo é usado e uma atualização roda em
+      segundo plano (stale-while-revalidate); só um worker a executa.
+    - Sem índice ou além de stale_ttl, a atualização é feita na hora.
+    - Cada empresa guarda no máximo max_users usuários.
+    - A atualização aplica só as diferenças (novos, renomeados e removidos).
+    """
+
+    def __init__(self, connector, path: str = None, ttl: int = 300, stale_ttl: int = 24 * 3600,
+                 max_users: int = 50000):
+        self.connector = connector
+        self.path = path or default_users_path()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_users = max_users
+        self._inflight = SingleFlight()
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Abre uma conexão curta por operação (seguro entre processos e greenlets)"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Cria as tabelas do diretório se necessário"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    enterprise_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    PRIMARY KEY (enterprise_id, user_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS directory_state (
+                    enterprise_id TEXT PRIMARY KEY,
+                    refreshed_at REAL,
+                    user_count INTEGER NOT NULL DEFAULT 0,
+                    refreshing_until REAL
+                )
+            """)
+
+    def state(self, enterprise_id: str) -> Dict[str, Any]:
+        """Horário da última atualização, quantidade de usuários e idade do índice"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT refreshed_at, user_count FROM directory_state WHERE enterprise_id = ?", (enterprise_id,)
+            ).fetchone()
+        refreshed_at = row[0] if row else None
+        age = time.time() - refreshed_at if refreshed_at else None
+        return {
+            'refreshed_at': refreshed_at,
+            'count': row[1] if row else 0,
+            'age': age,
+            'stale': age is None or age > self.ttl
+        }
+
+    def ensure(self, enterprise_id: str):
+        """Garante um índice utilizável, atualizando na hora ou em segundo plano conforme a idade"""
+        age = self.state(enterprise_id)['age']
+        if age is None or age > self.stale_ttl:
+            try:
+                self.refresh(enterprise_id)
+            except Exception as e:
+                if age is None:
+                    raise
+                logger.warning(f"Falha ao atualizar usuários de {enterprise_id}; usando índice antigo: {e}")
+        elif age > self.ttl and self._claim_refresh(enterprise_id):
+            threading.Thread(target=self._background_refresh, args=(enterprise_id,), daemon=True).start()
+
+    def _claim_refresh(self, enterprise_id: str) -> bool:
+        """Reserva a atualização em segundo plano para este worker (os demais seguem com o índice antigo)"""
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute(
+                "UPDATE directory_state SET refreshing_until = ? WHERE enterprise_id = ? "
+                "AND (refreshing_until IS NULL OR refreshing_until < ?)",
+                (now + self.ttl, enterprise_id, now)
+            ).rowcount
+        return claimed == 1
+
+    def _background_refresh(self, enterprise_id: str):
+        try:
+            self.refresh(enterprise_id)
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar usuários de {enterprise_id} em segundo plano: {e}")
+
+    def refresh(self, enterprise_id: str) -> int:
+        """Atualiza o índice da empresa a partir da API; retorna a quantidade de usuários"""
+        return self._inflight.do(enterprise_id, self._refresh, enterprise_id)
+
+    def _refresh(self, enterprise_id: str) -> int:
+        users = self.connector.get_collection_data('/users', enterprise_id, columns=USER_COLUMNS)
+        names = users_frame_to_names(users)
+        if len(names) > self.max_users:
+            logger.warning(f"Empresa {enterprise_id} com {len(names)} usuários; mantendo {self.max_users}")
+            names = names.iloc[:self.max_users]
+        fresh = dict(zip(names['user_id'], names['name']))
+
+        with self._connect() as conn:
+            current = dict(conn.execute(
+                "SELECT user_id, name FROM users WHERE enterprise_id = ?", (enterprise_id,)
+            ).fetchall())
+            if not fresh:
+                # Resposta vazia costuma ser falha da API: o índice atual é mantido e,
+                # sem índice, nada é registrado para que a próxima leitura tente de novo
+                logger.warning(f"API sem usuários para {enterprise_id}; mantendo {len(current)} do índice")
+                return len(current)
+            changed = [(enterprise_id, user_id, name) for user_id, name in fresh.items()
+                       if current.get(user_id) != name]
+            removed = [(enterprise_id, user_id) for user_id in current.keys() - fresh.keys()]
+
+            conn.executemany("INSERT OR REPLACE INTO users (enterprise_id, user_id, name) VALUES (?, ?, ?)", changed)
+            conn.executemany("DELETE FROM users WHERE enterprise_id = ? AND user_id = ?", removed)
+            conn.execute(
+                "INSERT INTO directory_state (enterprise_id, refreshed_at, user_count, refreshing_until) "
+                "VALUES (?, ?, ?, NULL) ON CONFLICT(enterprise_id) DO UPDATE SET "
+                "refreshed_at = excluded.refreshed_at, user_count = excluded.user_count, refreshing_until = NULL",
+                (enterprise_id, time.time(), len(fresh))
+            )
+
+        logger.info(f"Usuários de {enterprise_id}: {len(fresh)} no índice "
+                    f"({len(changed)} novos/alterados, {len(removed)} removidos)")
+        return len(fresh)
+
+    def mapping(self, enterprise_id: str) -> Dict[str, str]:
+        """Mapeamento completo userID -> nome da empresa"""
+        self.ensure(enterprise_id)
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT user_id, name FROM users WHERE enterprise_id = ?", (enterprise_id,)
+            ).fetchall())
+
+    def lookup(self, enterprise_id: str, user_ids: Iterable[Any]) -> Dict[str, str]:
+        """Nomes só dos ids pedidos (consulta em lote); ids sem nome ficam fora do resultado"""
+        ids = list({str(user_id) for user_id in user_ids if user_id is not None and not pd.isna(user_id)})
+        if not ids:
+            return {}
+
+        self.ensure(enterprise_id)
+        names: Dict[str, str] = {}
+        with self._connect() as conn:
+            for start in range(0, len(ids), LOOKUP_BATCH):
+                batch = ids[start:start + LOOKUP_BATCH]
+                names.update(conn.execute(
+                    f"SELECT user_id, name FROM users WHERE enterprise_id = ? "
+                    f"AND user_id IN ({', '.join('?' * len(batch))})",
+                    [enterprise_id, *batch]
+                ).fetchall())
+        return names
+
+    def enrich(self, enterprise_id: str, frame: pd.DataFrame,
+               fields: Iterable[str] = USER_ID_FIELDS) -> pd.DataFrame:
+        """Enriquece o frame com os nomes dos ids únicos presentes (uma consulta em lote por empresa)"""
+        fields = [field for field in fields if field in frame.columns]
+        if frame.empty or not fields:
+            return frame
+        ids = pd.unique(frame[fields].stack().astype(str))
+        return enrich_frame(frame, self.lookup(enterprise_id, ids), fields)
+
+    def invalidate(self, enterprise_id: str = None) -> int:
+        """Descarta o índice de uma empresa (ou de todas); a próxima leitura busca de novo"""
+        with self._connect() as conn:
+            if enterprise_id:
+                conn.execute("DELETE FROM directory_state WHERE enterprise_id = ?", (enterprise_id,))
+                return conn.execute("DELETE FROM users WHERE enterprise_id = ?", (enterprise_id,)).rowcount
+            conn.execute("DELETE FROM directory_state")
+            return conn.execute("DELETE FROM users").rowcount
+
+    def enterprises(self) -> List[str]:
+        """Empresas com índice carregado"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT enterprise_id FROM directory_state ORDER BY enterprise_id")]
@@ -3,37 +3,56 @@ Copiloto Inteligente de Gestão de Frotas
 Sistema de Visualização de Dados e Gráficos
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import seaborn as sns
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
+from concurrent.futures import Future
 import base64
-import io
+import hashlib
+import json
 import warnings
 
-# Configurações de estilo
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+try:
+    from src.fleet_data_connector import run_parallel
+except ImportError:
+    from fleet_data_connector import run_parallel
+
+try:
+    from src.fleet_cache import ResponseCache
+except ImportError:
+    from fleet_cache import ResponseCache
+
+try:
+    from src.fleet_render import CHART_PROFILES, DEFAULT_CHART_PROFILE, RENDERERS, ChartRenderPool, get_render_pool
+except ImportError:
+    from fleet_render import CHART_PROFILES, DEFAULT_CHART_PROFILE, RENDERERS, ChartRenderPool, get_render_pool
+
 warnings.filterwarnings('ignore')
 
-# Configuração para português
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['axes.labelsize'] = 12
-plt.rcParams['xtick.labelsize'] = 10
-plt.rcParams['ytick.labelsize'] = 10
+def chart_digest(data: Dict[str, Any]) -> str:
+    """Hash estável dos dados agregados de um gráfico"""
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
 class FleetVisualizationEngine:
-    """Motor de visualização para dados de gestão de frotas"""
+    """Motor de visualização para dados de gestão de frotas
+
+    Cada gráfico é feito em duas etapas: os dados são agregados aqui e a
+    renderização roda no pool de processos (fleet_render). O resultado é
+    guardado no cache pelo hash dos dados agregados e do perfil, então dados
+    iguais não são desenhados de novo.
+    """
     
-    def __init__(self, data_processor):
+    def __init__(self, data_processor, cache: ResponseCache = None,
+                 default_profile: str = DEFAULT_CHART_PROFILE, render_pool: ChartRenderPool = None):
         self.data_processor = data_processor
+        self.cache = cache or getattr(data_processor.connector, 'cache', None)
+        self.default_profile = default_profile
+        self.render_pool = render_pool or get_render_pool()
         self.colors = {
             'primary': '#2E86AB',
             'secondary': '#A23B72',
@@ -44,214 +63,132 @@ class FleetVisualizationEngine:
             'non_compliant': '#dc3545'
         }
     
-    def create_checklist_summary_chart(self, enterprise_id: str = None, days: int = 7) -> str:
+    def with_processor(self, data_processor) -> 'FleetVisualizationEngine':
+        """Mesmo motor (cache, pool e perfil) lendo de outro processador, ex.: o snapshot de um relatório"""
+        return type(self)(data_processor, self.cache, self.default_profile, self.render_pool)
+    
+    def submit_chart(self, chart: str, data: Dict[str, Any], profile: str = None) -> Future:
+        """Agenda o gráfico no pool de renderização e retorna um Future com a saída do perfil
+        
+        O Future já vem resolvido quando o gráfico está no cache (ou no perfil
+        json, que não desenha nada); renderizações novas são gravadas no cache
+        ao terminar.
+        """
+        profile = profile or self.default_profile
+        if profile not in CHART_PROFILES:
+            raise ValueError(f"Perfil de gráfico inválido: {profile}")
+        if chart not in RENDERERS:
+            raise ValueError(f"Gráfico desconhecido: {chart}")
+        
+        done = Future()
+        if profile == 'json':
+            done.set_result({'chart': chart, 'colors': self.colors, 'data': data})
+            return done
+        
+        key = ResponseCache.make_key(f'/charts/{chart}', {'profile': profile, 'data': chart_digest(data)})
+        if self.cache:
+            # A chave é o próprio conteúdo: uma entrada expirada continua correta
+            cached = self.cache.get(key, allow_stale=True)
+            if cached is not None:
+                done.set_result(cached)
+                return done
+        
+        def finish(future: Future):
+            # Grava no cache antes de liberar quem espera pelo resultado
+            error = future.exception() if not future.cancelled() else RuntimeError("Renderização cancelada")
+            if error is not None:
+                done.set_exception(error)
+                return
+            if self.cache:
+                self.cache.set(key, future.result())
+            done.set_result(future.result())
+        
+        self.render_pool.submit(chart, data, self.colors, profile).add_done_callback(finish)
+        return done
+    
+    def render_chart(self, chart: str, data: Dict[str, Any], profile: str = None) -> Union[str, Dict[str, Any]]:
+        """Renderiza o gráfico no perfil pedido e espera o resultado
+        
+        Retorna PNG em base64 (screen/print), o texto SVG (svg) ou a
+        especificação {'chart', 'colors', 'data'} para desenho no cliente (json).
+        """
+        return self.submit_chart(chart, data, profile).result(timeout=self.render_pool.timeout)
+    
+    def create_checklist_summary_chart(self, enterprise_id: str = None, days: int = 7,
+                                       profile: str = None) -> Union[str, Dict[str, Any]]:
         """Cria gráfico de resumo de checklists"""
         summary = self.data_processor.get_checklist_summary(enterprise_id, days)
-        
-        # Gráfico de pizza para conformidade
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # Pizza de conformidade
-        labels = ['Conformes', 'Não Conformes']
-        sizes = [summary['compliant'], summary['non_compliant']]
-        colors = [self.colors['compliant'], self.colors['non_compliant']]
-        
-        ax1.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        ax1.set_title(f'Conformidade de Checklists\n(Últimos {days} dias)', fontsize=14, fontweight='bold')
-        
-        # Gráfico de barras com métricas
-        metrics = ['Total', 'Conformes', 'Não Conformes', 'Veículos', 'Motoristas']
-        values = [summary['total'], summary['compliant'], summary['non_compliant'], 
-                 summary['vehicles'], summary['drivers']]
-        
-        bars = ax2.bar(metrics, values, color=[self.colors['info'], self.colors['compliant'], 
-                                              self.colors['non_compliant'], self.colors['primary'], 
-                                              self.colors['secondary']])
-        
-        ax2.set_title('Métricas Gerais', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Quantidade')
-        
-        # Adicionar valores nas barras
-        for bar, value in zip(bars, values):
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{value}', ha='center', va='bottom', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+        data = {
+            'days': days,
+            'compliant': int(summary['compliant']),
+            'non_compliant': int(summary['non_compliant']),
+            'total': int(summary['total']),
+            'vehicles': int(summary['vehicles']),
+            'drivers': int(summary['drivers'])
+        }
+        return self.render_chart('checklist_summary', data, profile)
     
-    def create_vehicle_performance_chart(self, enterprise_id: str = None, days: int = 30) -> str:
+    def create_vehicle_performance_chart(self, enterprise_id: str = None, days: int = 30,
+                                         profile: str = None) -> Union[str, Dict[str, Any]]:
         """Cria gráfico de performance de veículos"""
-        df = self.data_processor.get_vehicle_performance(enterprise_id, days)
+        df = pd.DataFrame(self.data_processor.get_vehicle_performance(enterprise_id, days))
         
         if df.empty:
-            return self._create_no_data_chart("Nenhum dado de performance de veículos encontrado")
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
-        
-        # Gráfico de barras - Taxa de conformidade por veículo
-        vehicles = df['vehicle_plate'].tolist()
-        compliance_rates = df['compliance_rate'].tolist()
-        
-        bars1 = ax1.bar(vehicles, compliance_rates, color=self.colors['primary'])
-        ax1.set_title('Taxa de Conformidade por Veículo (%)', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('Taxa de Conformidade (%)')
-        ax1.set_ylim(0, 100)
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # Adicionar valores nas barras
-        for bar, rate in zip(bars1, compliance_rates):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
-                    f'{rate}%', ha='center', va='bottom', fontweight='bold')
-        
-        # Gráfico de barras - Total de verificações por veículo
-        total_checks = df['total_checks'].tolist()
-        bars2 = ax2.bar(vehicles, total_checks, color=self.colors['secondary'])
-        ax2.set_title('Total de Verificações por Veículo', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Número de Verificações')
-        ax2.set_xlabel('Veículos')
-        ax2.tick_params(axis='x', rotation=45)
-        
-        # Adicionar valores nas barras
-        for bar, checks in zip(bars2, total_checks):
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                    f'{checks}', ha='center', va='bottom', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+            return self._create_no_data_chart("Nenhum dado de performance de veículos encontrado", profile)
+        
+        data = {
+            'vehicles': df['vehicle_plate'].astype(str).tolist(),
+            'compliance_rates': df['compliance_rate'].astype(float).tolist(),
+            'total_checks': df['total_checks'].astype(int).tolist()
+        }
+        return self.render_chart('vehicle_performance', data, profile)
     
-    def create_driver_performance_chart(self, enterprise_id: str = None, days: int = 30) -> str:
+    def create_driver_performance_chart(self, enterprise_id: str = None, days: int = 30,
+                                        profile: str = None) -> Union[str, Dict[str, Any]]:
         """Cria gráfico de performance de motoristas"""
-        df = self.data_processor.get_driver_performance(enterprise_id, days)
+        df = pd.DataFrame(self.data_processor.get_driver_performance(enterprise_id, days))
         
         if df.empty:
-            return self._create_no_data_chart("Nenhum dado de performance de motoristas encontrado")
+            return self._create_no_data_chart("Nenhum dado de performance de motoristas encontrado", profile)
         
         # Limitar aos top 10 motoristas
         df_top = df.head(10)
-        
-        fig, ax = plt.subplots(figsize=(15, 8))
-        
-        # Gráfico de barras horizontais
-        drivers = df_top['driver_name'].tolist()
-        compliance_rates = df_top['compliance_rate'].tolist()
-        total_checks = df_top['total_checks'].tolist()
-        
-        # Criar cores baseadas na taxa de conformidade
-        colors = []
-        for rate in compliance_rates:
-            if rate >= 95:
-                colors.append(self.colors['compliant'])
-            elif rate >= 80:
-                colors.append(self.colors['warning'])
-            else:
-                colors.append(self.colors['non_compliant'])
-        
-        bars = ax.barh(drivers, compliance_rates, color=colors)
-        ax.set_title('Top 10 Motoristas - Taxa de Conformidade (%)', fontsize=14, fontweight='bold')
-        ax.set_xlabel('Taxa de Conformidade (%)')
-        ax.set_xlim(0, 100)
-        
-        # Adicionar valores nas barras e número de verificações
-        for i, (bar, rate, checks) in enumerate(zip(bars, compliance_rates, total_checks)):
-            width = bar.get_width()
-            ax.text(width + 1, bar.get_y() + bar.get_height()/2.,
-                    f'{rate}% ({checks} checks)', ha='left', va='center', fontweight='bold')
-        
-        plt.tight_layout()
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+        data = {
+            'drivers': df_top['driver_name'].astype(str).tolist(),
+            'compliance_rates': df_top['compliance_rate'].astype(float).tolist(),
+            'total_checks': df_top['total_checks'].astype(int).tolist()
+        }
+        return self.render_chart('driver_performance', data, profile)
     
-    def create_timeline_chart(self, enterprise_id: str = None, days: int = 30) -> str:
+    def create_timeline_chart(self, enterprise_id: str = None, days: int = 30,
+                              profile: str = None) -> Union[str, Dict[str, Any]]:
         """Cria gráfico de linha temporal de atividades"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Obter dados de checklist
-        checklist_df = self.data_processor.connector.get_checklist_data(
+        # Agregados diários de checklist (já agrupados por data)
+        rollup = self.data_processor.connector.get_checklist_rollup(
             enterprise_id=enterprise_id,
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
         )
         
-        if checklist_df.empty:
-            return self._create_no_data_chart("Nenhum dado temporal encontrado")
+        if rollup.empty:
+            return self._create_no_data_chart("Nenhum dado temporal encontrado", profile)
         
-        # Agrupar por data
-        checklist_df['date'] = checklist_df['timestamp'].dt.date
-        daily_stats = checklist_df.groupby('date').agg({
-            'compliant': ['count', 'sum'],
-            'vehiclePlate': 'nunique'
-        }).reset_index()
+        daily_stats = rollup.days[rollup.days['total'] > 0]
+        compliance_rate = (daily_stats['compliant'] / daily_stats['total'] * 100).round(2)
         
-        daily_stats.columns = ['date', 'total_checks', 'compliant_checks', 'unique_vehicles']
-        daily_stats['non_compliant_checks'] = daily_stats['total_checks'] - daily_stats['compliant_checks']
-        daily_stats['compliance_rate'] = (daily_stats['compliant_checks'] / daily_stats['total_checks'] * 100).round(2)
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
-        
-        # Gráfico de linha - Taxa de conformidade ao longo do tempo
-        ax1.plot(daily_stats['date'], daily_stats['compliance_rate'], 
-                marker='o', linewidth=2, markersize=6, color=self.colors['primary'])
-        ax1.set_title('Taxa de Conformidade ao Longo do Tempo', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('Taxa de Conformidade (%)')
-        ax1.set_ylim(0, 100)
-        ax1.grid(True, alpha=0.3)
-        
-        # Gráfico de barras empilhadas - Verificações por dia
-        ax2.bar(daily_stats['date'], daily_stats['compliant_checks'], 
-               label='Conformes', color=self.colors['compliant'])
-        ax2.bar(daily_stats['date'], daily_stats['non_compliant_checks'], 
-               bottom=daily_stats['compliant_checks'], label='Não Conformes', 
-               color=self.colors['non_compliant'])
-        
-        ax2.set_title('Verificações Diárias', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Número de Verificações')
-        ax2.set_xlabel('Data')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        # Formatar datas no eixo x
-        for ax in [ax1, ax2]:
-            ax.tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+        data = {
+            'dates': daily_stats['day'].tolist(),
+            'compliance_rates': compliance_rate.astype(float).tolist(),
+            'compliant_checks': daily_stats['compliant'].astype(int).tolist(),
+            'non_compliant_checks': daily_stats['non_compliant'].astype(int).tolist()
+        }
+        return self.render_chart('timeline', data, profile)
     
-    def create_temperature_humidity_chart(self, enterprise_id: str = None, days: int = 7) -> str:
+    def create_temperature_humidity_chart(self, enterprise_id: str = None, days: int = 7,
+                                          profile: str = None) -> Union[str, Dict[str, Any]]:
         """Cria gráfico de temperatura e umidade dos veículos"""
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
@@ -264,7 +201,7 @@ class FleetVisualizationEngine:
         )
         
         if telemetry_df.empty or 'temperature' not in telemetry_df.columns:
-            return self._create_no_data_chart("Nenhum dado de temperatura/umidade encontrado")
+            return self._create_no_data_chart("Nenhum dado de temperatura/umidade encontrado", profile)
         
         # Agrupar por hora para reduzir ruído
         telemetry_df['hour'] = telemetry_df['timestamp'].dt.floor('H')
@@ -273,45 +210,24 @@ class FleetVisualizationEngine:
             'humidity': 'mean'
         }).reset_index()
         
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
-        
-        # Gráfico de temperatura
-        ax1.plot(hourly_stats['hour'], hourly_stats['temperature'], 
-                marker='o', linewidth=2, markersize=4, color=self.colors['warning'])
-        ax1.set_title('Temperatura Média dos Veículos', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('Temperatura (°C)')
-        ax1.grid(True, alpha=0.3)
-        
-        # Gráfico de umidade
-        ax2.plot(hourly_stats['hour'], hourly_stats['humidity'], 
-                marker='s', linewidth=2, markersize=4, color=self.colors['info'])
-        ax2.set_title('Umidade Média dos Veículos', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Umidade (%)')
-        ax2.set_xlabel('Data/Hora')
-        ax2.grid(True, alpha=0.3)
-        
-        # Formatar datas
-        for ax in [ax1, ax2]:
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m %H:%M'))
-            ax.tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+        data = {
+            'hours': [hour.isoformat() for hour in hourly_stats['hour']],
+            'temperature': hourly_stats['temperature'].astype(float).round(3).tolist(),
+            'humidity': hourly_stats['humidity'].astype(float).round(3).tolist()
+        }
+        return self.render_chart('temperature_humidity', data, profile)
     
     def create_interactive_dashboard(self, enterprise_id: str = None) -> str:
         """Cria dashboard interativo com Plotly"""
-        # Obter dados
-        summary = self.data_processor.get_checklist_summary(enterprise_id, days=30)
-        vehicle_perf = self.data_processor.get_vehicle_performance(enterprise_id, days=30)
-        driver_perf = self.data_processor.get_driver_performance(enterprise_id, days=30)
+        # Obter dados em paralelo (buscas idênticas são deduplicadas)
+        results = run_parallel({
+            'summary': lambda: self.data_processor.get_checklist_summary(enterprise_id, days=30),
+            'vehicle_perf': lambda: self.data_processor.get_vehicle_performance(enterprise_id, days=30),
+            'driver_perf': lambda: self.data_processor.get_driver_performance(enterprise_id, days=30)
+        })
+        summary = results['summary']
+        vehicle_perf = pd.DataFrame(results['vehicle_perf'])
+        driver_perf = pd.DataFrame(results['driver_perf'])
         
         # Criar subplots
         fig = make_subplots(
@@ -377,23 +293,9 @@ class FleetVisualizationEngine:
         
         return html_str
     
-    def _create_no_data_chart(self, message: str) -> str:
+    def _create_no_data_chart(self, message: str, profile: str = None) -> Union[str, Dict[str, Any]]:
         """Cria gráfico indicando ausência de dados"""
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.text(0.5, 0.5, message, ha='center', va='center', 
-                fontsize=16, fontweight='bold', color=self.colors['info'])
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        ax.axis('off')
-        
-        # Converter para base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
-        plt.close()
-        
-        return image_base64
+        return self.render_chart('no_data', {'message': message}, profile)
     
     def save_chart_to_file(self, chart_base64: str, filename: str) -> str:
         """Salva gráfico em arquivo"""
@@ -1,9 +1,30 @@
 import os
 import sys
-# import requests  # Removido para evitar erro de deploy
 import json
+import pandas as pd
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, Response, stream_with_context
+
+try:
+    from src.fleet_users import FleetUserDirectory, USER_ID_FIELDS
+    from src.fleet_http import ResponseOptimizer
+    from src.fleet_paging import PageRequest, PageError, page_records
+    from src.fleet_data_connector import FleetAPIConfig, FleetDataConnector, FleetDataProcessor, run_parallel
+    from src.fleet_scorecard import FleetScorecardEngine
+    from src.fleet_maintenance import FleetMaintenanceEngine, EQUALITY_FILTERS
+    from src.fleet_fuel import FleetFuelEngine, EQUALITY_FILTERS as FUEL_FILTERS
+    from src.fleet_jobs import ReportJobQueue, JobQueueFull
+    from src.fleet_export import iter_csv, iter_xlsx, frame_rows, iter_stream, stream_format, STREAM_MIMETYPES
+except ImportError:
+    from fleet_users import FleetUserDirectory, USER_ID_FIELDS
+    from fleet_http import ResponseOptimizer
+    from fleet_paging import PageRequest, PageError, page_records
+    from fleet_data_connector import FleetAPIConfig, FleetDataConnector, FleetDataProcessor, run_parallel
+    from fleet_scorecard import FleetScorecardEngine
+    from fleet_maintenance import FleetMaintenanceEngine, EQUALITY_FILTERS
+    from fleet_fuel import FleetFuelEngine, EQUALITY_FILTERS as FUEL_FILTERS
+    from fleet_jobs import ReportJobQueue, JobQueueFull
+    from fleet_export import iter_csv, iter_xlsx, frame_rows, iter_stream, stream_format, STREAM_MIMETYPES
 
 # Configurar caminho para templates (um nível acima de src/)
 template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
@@ -11,125 +32,100 @@ template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templat
 # Criar app Flask com template_folder correto
 app = Flask(__name__, template_folder=template_dir)
 
-# Cache global para usuários (evita múltiplas consultas à API)
-users_cache = {}
-cache_timestamp = {}
-CACHE_DURATION = 300  # 5 minutos
-
 # Configurações da API
 API_BASE_URL = "https://firebase-bi-api.onrender.com"
 
+# Conector compartilhado (cache, streaming e resiliência) para os cálculos no servidor
+fleet_connector = FleetDataConnector(FleetAPIConfig(base_url=API_BASE_URL))
+scorecard_engine = FleetScorecardEngine(fleet_connector)
+maintenance_engine = FleetMaintenanceEngine(fleet_connector)
+fuel_engine = FleetFuelEngine(fleet_connector)
+
+# Diretório userID -> nome compartilhado pelos workers (atualizado em segundo plano antes de expirar)
+user_directory = FleetUserDirectory(fleet_connector, ttl=300)
+
+# Compressão (gzip/br) e ETag/304 das páginas dos BIs e das respostas JSON
+response_optimizer = ResponseOptimizer()
+
+REPORT_FORMATS = ('pdf', 'excel', 'both')
+
+def build_comprehensive_report(output_dir, enterprise_id, days, format_type):
+    """Gera o relatório abrangente (executado pela fila de jobs, fora da requisição)"""
+    # Importação tardia: a pilha de relatórios (matplotlib, openpyxl, plotly) só é carregada no primeiro job
+    try:
+        from src.fleet_data_connector import FleetDataProcessor
+        from src.fleet_insights import FleetInsightsEngine
+        from src.fleet_visualization import FleetVisualizationEngine
+        from src.fleet_reports import FleetReportGenerator
+    except ImportError:
+        from fleet_data_connector import FleetDataProcessor
+        from fleet_insights import FleetInsightsEngine
+        from fleet_visualization import FleetVisualizationEngine
+        from fleet_reports import FleetReportGenerator
+    
+    processor = FleetDataProcessor(fleet_connector)
+    generator = FleetReportGenerator(processor, FleetVisualizationEngine(processor),
+                                     FleetInsightsEngine(processor), output_dir=output_dir)
+    return generator.generate_comprehensive_report(enterprise_id, days, format_type)
+
+# Relatórios demorados rodam em segundo plano: envio, status e download
+report_jobs = ReportJobQueue(max_workers=int(os.environ.get('FLEET_REPORT_WORKERS', 2)))
+report_jobs.register('comprehensive', build_comprehensive_report)
+
 def get_users_mapping(enterprise_id):
     """
     Obter mapeamento de userID para nomes dos motoristas
-    Implementa cache para otimizar performance
+    Lido do diretório compartilhado de usuários (ver FleetUserDirectory)
     """
     try:
-        # Verificar se cache é válido
-        cache_key = f"users_{enterprise_id}"
-        now = datetime.now()
-        
-        if (cache_key in users_cache and 
-            cache_key in cache_timestamp and 
-            (now - cache_timestamp[cache_key]).seconds < CACHE_DURATION):
-            print(f"[DE-PARA] Usando cache para {enterprise_id}")
-            return users_cache[cache_key]
-        
-        # Buscar usuários da API
-        print(f"[DE-PARA] Buscando usuários da API para {enterprise_id}")
-        url = f"{API_BASE_URL}/users?enterpriseId={enterprise_id}"
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            users_data = data.get('data', [])
-            
-            # Criar mapeamento userID -> nome
-            mapping = {}
-            for user in users_data:
-                user_id = user.get('uid') or user.get('id') or user.get('_doc_id')
-                display_name = user.get('display_name', 'N/A')
-                
-                if user_id and display_name != 'N/A':
-                    mapping[user_id] = display_name
-                    print(f"[DE-PARA] Mapeado: {user_id[:10]}... -> {display_name}")
-            
-            # Atualizar cache
-            users_cache[cache_key] = mapping
-            cache_timestamp[cache_key] = now
-            
-            print(f"[DE-PARA] Cache atualizado: {len(mapping)} usuários")
-            return mapping
-            
-        else:
-            print(f"[DE-PARA] Erro na API users: {response.status_code}")
-            return {}
-            
+        return user_directory.mapping(enterprise_id)
     except Exception as e:
         print(f"[DE-PARA] Erro ao buscar usuários: {e}")
         return {}
 
-def enrich_data_with_names(data, enterprise_id, user_fields=['UserString', 'userId', 'driverId', 'motorista']):
+def enrich_frame_with_names(frame, enterprise_id, user_fields=USER_ID_FIELDS):
     """
     Enriquecer dados com nomes reais dos motoristas
     
+    Cada campo de userID presente ganha a coluna {campo}_name, resolvida por
+    um join vetorizado contra o diretório de usuários (só os ids únicos do
+    frame são consultados).
+    
     Args:
-        data: Lista de registros ou registro único
+        frame: DataFrame com os registros
         enterprise_id: ID da empresa
         user_fields: Lista de campos que podem conter userID
     
     Returns:
-        Dados enriquecidos com nomes dos motoristas
+        DataFrame enriquecido (o original quando não há mapeamento)
     """
     try:
-        # Obter mapeamento de usuários
-        users_mapping = get_users_mapping(enterprise_id)
+        enriched = user_directory.enrich(enterprise_id, frame, user_fields)
         
-        if not users_mapping:
+        if not user_directory.state(enterprise_id)['count']:
             print("[DE-PARA] Nenhum mapeamento disponível")
-            return data
-        
-        def enrich_record(record):
-            """Enriquecer um registro individual"""
-            if not isinstance(record, dict):
-                return record
-            
-            enriched = record.copy()
-            
-            # Procurar campos de usuário e adicionar nomes
-            for field in user_fields:
-                if field in record:
-                    user_id = record[field]
-                    if user_id in users_mapping:
-                        # Adicionar campo com nome do motorista
-                        name_field = f"{field}_name"
-                        enriched[name_field] = users_mapping[user_id]
-                        print(f"[DE-PARA] {field}: {user_id[:10]}... -> {users_mapping[user_id]}")
-                    else:
-                        # Adicionar campo indicando que não foi encontrado
-                        name_field = f"{field}_name"
-                        enriched[name_field] = f"Motorista {user_id[:8]}..." if user_id else "N/A"
-            
-            return enriched
+            return frame
         
-        # Processar dados
-        if isinstance(data, list):
-            return [enrich_record(record) for record in data]
-        else:
-            return enrich_record(data)
+        return enriched
             
     except Exception as e:
         print(f"[DE-PARA] Erro ao enriquecer dados: {e}")
-        return data
+        return frame
+
+def with_generated_at(response):
+    """Horário de geração no header X-Generated-At: fora do corpo, não muda o ETag a cada requisição"""
+    response.headers['X-Generated-At'] = datetime.now().isoformat()
+    return response
 
 # Configurações para CORS (necessário para scorecard preditivo)
 @app.after_request
 def after_request(response):
-    """Adicionar headers CORS para compatibilidade com scorecard preditivo"""
+    """Adicionar headers CORS (compatibilidade com scorecard preditivo), compressão e ETag"""
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-    return response
+    response.headers.add('Access-Control-Expose-Headers', 'ETag,X-Generated-At')
+    return response_optimizer.process(response)
 
 # NOVO ENDPOINT: Mapeamento de usuários
 @app.route('/api/users-mapping')
@@ -142,6 +138,7 @@ def users_mapping_endpoint():
     
     try:
         mapping = get_users_mapping(enterprise_id)
+        state = user_directory.state(enterprise_id)
         
         return jsonify({
             'status': 'success',
@@ -149,8 +146,9 @@ def users_mapping_endpoint():
             'mapping': mapping,
             'count': len(mapping),
             'cache_info': {
-                'cached': f"users_{enterprise_id}" in users_cache,
-                'timestamp': cache_timestamp.get(f"users_{enterprise_id}", {}).isoformat() if f"users_{enterprise_id}" in cache_timestamp else None
+                'cached': state['refreshed_at'] is not None,
+                'stale': state['stale'],
+                'timestamp': datetime.fromtimestamp(state['refreshed_at']).isoformat() if state['refreshed_at'] else None
             },
             'timestamp': datetime.now().isoformat()
         })
@@ -168,35 +166,47 @@ def users_mapping_endpoint():
 def trips_enriched():
     """
     Endpoint para obter dados de trips já enriquecidos com nomes dos motoristas
+    
+    Com limit/cursor na query string a resposta é paginada por cursor
+    (mesmos parâmetros das tabelas do BI: limit, cursor, sort, order, fields).
+    Sem paginação a lista completa sai em streaming: JSON em blocos (padrão)
+    ou NDJSON com ?stream=ndjson / Accept: application/x-ndjson.
     """
     enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
     
     try:
-        # Buscar dados de trips da API original
-        url = f"{API_BASE_URL}/trips?enterpriseId={enterprise_id}"
-        response = requests.get(url, timeout=15)
+        paged = 'limit' in request.args or 'cursor' in request.args
+        page = PageRequest.from_args(request.args) if paged else None
+        fmt = stream_format(request.args, request.headers.get('Accept', '')) or 'json'
+    except (PageError, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'enterprise_id': enterprise_id
+        }), 400
+    
+    try:
+        # Trips da API original (ingestão em streaming e cache compartilhado do conector)
+        trips = fleet_connector.get_collection_data('/trips', enterprise_id)
         
-        if response.status_code == 200:
-            trips_data = response.json()
-            original_data = trips_data.get('data', [])
-            
-            # Enriquecer dados com nomes
-            enriched_data = enrich_data_with_names(original_data, enterprise_id)
-            
-            # Retornar dados enriquecidos
-            result = trips_data.copy()
-            result['data'] = enriched_data
-            result['enriched'] = True
-            result['enrichment_timestamp'] = datetime.now().isoformat()
-            
-            return jsonify(result)
-            
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': f'Erro na API trips: {response.status_code}',
-                'enterprise_id': enterprise_id
-            }), response.status_code
+        # Enriquecer dados com nomes
+        trips = enrich_frame_with_names(trips, enterprise_id)
+        
+        result = {
+            'status': 'success',
+            'enterprise_id': enterprise_id,
+            'count': int(len(trips)),
+            'enriched': True
+        }
+        if page:
+            table = page_records(trips, page)
+            result['data'] = table['items']
+            result['pagination'] = table['pagination']
+            return with_generated_at(jsonify(result))
+        
+        # Registros serializados bloco a bloco enquanto a resposta é enviada
+        return with_generated_at(Response(stream_with_context(iter_stream(fmt, trips, result)),
+                                          mimetype=STREAM_MIMETYPES[fmt]))
             
     except Exception as e:
         return jsonify({
@@ -211,16 +221,10 @@ def clear_users_cache():
     """Limpar cache de usuários (útil para desenvolvimento)"""
     enterprise_id = request.args.get('enterpriseId')
     
+    user_directory.invalidate(enterprise_id)
     if enterprise_id:
-        cache_key = f"users_{enterprise_id}"
-        if cache_key in users_cache:
-            del users_cache[cache_key]
-        if cache_key in cache_timestamp:
-            del cache_timestamp[cache_key]
         message = f"Cache limpo para {enterprise_id}"
     else:
-        users_cache.clear()
-        cache_timestamp.clear()
         message = "Cache global limpo"
     
     return jsonify({
@@ -249,8 +253,8 @@ def health():
             'cache_system': True
         },
         'cache_stats': {
-            'cached_enterprises': len(users_cache),
-            'cache_keys': list(users_cache.keys())
+            'cached_enterprises': len(user_directory.enterprises()),
+            'cache_keys': [f"users_{enterprise_id}" for enterprise_id in user_directory.enterprises()]
         }
     }
 
@@ -275,6 +279,56 @@ def bi_combustivel():
     enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
     return render_template('bi_combustivel.html', enterprise_id=enterprise_id)
 
+# Análise de combustível calculada no servidor
+@app.route('/api/copilot/fuel/analytics')
+def fuel_analytics():
+    """
+    Consumo, custo e anomalias dos abastecimentos Alelo (alelo-supply-history)
+    
+    Parâmetros: enterpriseId, startDate, endDate, plate, driver, fuelType, state,
+    page e perPage (abastecimentos, mais recentes primeiro), vehiclePage e
+    vehiclePerPage (ranking de veículos por litros). 0 em perPage retorna tudo.
+    
+    O tamanho da resposta não depende do volume de abastecimentos: só os
+    agregados e as páginas pedidas são enviados. O resultado fica em cache.
+    """
+    enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
+    filters = {name: request.args.get(name, '') for name in ['startDate', 'endDate', *FUEL_FILTERS]}
+    
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('perPage', 50))
+        vehicle_page = int(request.args.get('vehiclePage', 1))
+        vehicle_per_page = int(request.args.get('vehiclePerPage', 20))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Parâmetros inválidos: page, perPage, vehiclePage e vehiclePerPage devem ser numéricos',
+            'enterprise_id': enterprise_id
+        }), 400
+    
+    try:
+        analytics = fuel_engine.analytics(enterprise_id, filters, page, per_page, vehicle_page, vehicle_per_page)
+        
+        print(f"[COMBUSTIVEL] {analytics['metrics']['total_supplies']} abastecimentos analisados para {enterprise_id}")
+        
+        response = jsonify({
+            'status': 'success',
+            'enterprise_id': enterprise_id,
+            'filters': {name: value for name, value in filters.items() if value},
+            **analytics
+        })
+        response.headers['Cache-Control'] = f'private, max-age={fleet_connector.config.cache_ttl}'
+        return response
+        
+    except Exception as e:
+        print(f"[COMBUSTIVEL] Erro ao analisar abastecimentos: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'enterprise_id': enterprise_id
+        }), 500
+
 # BI Checklist
 @app.route('/api/copilot/bi-checklist')
 def bi_checklist():
@@ -314,27 +368,65 @@ def scorecard_preditivo():
     
     return render_template('scorecard_preditivo.html', enterprise_id=enterprise_id)
 
-# Endpoint específico para dados do scorecard preditivo (se necessário)
+# Dados do scorecard preditivo calculados no servidor
 @app.route('/api/copilot/scorecard-preditivo/data')
 def scorecard_preditivo_data():
-    """Endpoint para dados específicos do scorecard preditivo (se necessário)"""
+    """
+    Scorecard preditivo por motorista, calculado no servidor a partir das viagens
+    
+    Parâmetros: enterpriseId, period ('all', '7', '30', '90'), risk ('all', 'low',
+    'medium', 'high'), name, minChance, page, perPage (0 = todos os motoristas)
+    
+    Retorna apenas os scores por motorista e os agregados dos gráficos,
+    sem as viagens brutas.
+    """
     enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
+    period = request.args.get('period', '30')
     
-    # Este endpoint pode ser usado para fornecer dados específicos do scorecard
-    # se necessário no futuro, mas atualmente o scorecard busca dados diretamente
-    # da API Firebase BI
+    try:
+        days = None if period == 'all' else int(period)
+        min_chance = float(request.args.get('minChance', 0) or 0)
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('perPage', 50))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Parâmetros inválidos: period, minChance, page e perPage devem ser numéricos',
+            'enterprise_id': enterprise_id
+        }), 400
     
-    return jsonify({
-        'status': 'success',
-        'message': 'Scorecard preditivo configurado para buscar dados da API Firebase BI',
-        'api_endpoints': {
-            'trips': 'https://firebase-bi-api.onrender.com/trips',
-            'users': 'https://firebase-bi-api.onrender.com/users',
-            'trips_enriched': '/api/trips-enriched',
-            'users_mapping': '/api/users-mapping'
-        },
-        'enterprise_id': enterprise_id
-    })
+    try:
+        # Viagens e mapeamento de nomes buscados em paralelo
+        sources = run_parallel({
+            'trips': lambda: scorecard_engine.load_trips(enterprise_id, days),
+            'names': lambda: get_users_mapping(enterprise_id)
+        })
+        
+        scorecard = scorecard_engine.build_scorecard(
+            sources['trips'], sources['names'], days,
+            risk=request.args.get('risk', 'all'),
+            name=request.args.get('name', ''),
+            min_chance=min_chance,
+            page=page,
+            per_page=per_page
+        )
+        
+        print(f"[SCORECARD] {scorecard['metrics']['total_drivers']} motoristas calculados para {enterprise_id}")
+        
+        return with_generated_at(jsonify({
+            'status': 'success',
+            'enterprise_id': enterprise_id,
+            'period': period,
+            **scorecard
+        }))
+        
+    except Exception as e:
+        print(f"[SCORECARD] Erro ao calcular scorecard: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'enterprise_id': enterprise_id
+        }), 500
 
 # BI Manutenção
 @app.route('/api/copilot/bi-manutencao')
@@ -343,6 +435,51 @@ def bi_manutencao():
     enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
     return render_template('bi_manutencao.html', enterprise_id=enterprise_id)
 
+# Agregados do BI de manutenção calculados no servidor
+@app.route('/api/copilot/maintenance/aggregate')
+def maintenance_aggregate():
+    """
+    KPIs, opções dos filtros, gráficos e alertas do BI de manutenção
+    
+    Parâmetros: enterpriseId, startDate, endDate (abertura da OS), serviceType,
+    assetType, vehiclePlate, garage, branch, costCenter e tableLimit (linhas
+    por tabela, 0 = todas). Retorna só os agregados; o resultado fica em cache
+    por empresa e filtros.
+    """
+    enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
+    filters = {name: request.args.get(name, '') for name in ['startDate', 'endDate', *EQUALITY_FILTERS]}
+    
+    try:
+        table_limit = int(request.args.get('tableLimit', 100))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Parâmetro inválido: tableLimit deve ser numérico',
+            'enterprise_id': enterprise_id
+        }), 400
+    
+    try:
+        aggregate = maintenance_engine.aggregate(enterprise_id, filters, table_limit)
+        
+        print(f"[MANUTENCAO] {aggregate['metrics']['total_services']} ordens agregadas para {enterprise_id}")
+        
+        response = jsonify({
+            'status': 'success',
+            'enterprise_id': enterprise_id,
+            'filters': {name: value for name, value in filters.items() if value},
+            **aggregate
+        })
+        response.headers['Cache-Control'] = f'private, max-age={fleet_connector.config.cache_ttl}'
+        return response
+        
+    except Exception as e:
+        print(f"[MANUTENCAO] Erro ao agregar manutenção: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e),
+            'enterprise_id': enterprise_id
+        }), 500
+
 # BI Gestão de Veículos
 @app.route('/api/copilot/bi-gestao-veiculos')
 def bi_gestao_veiculos():
@@ -450,6 +587,138 @@ def list_bis():
     ]
     return jsonify(bis)
 
+# Relatórios assíncronos (PDF/Excel)
+@app.route('/api/copilot/reports', methods=['POST'])
+def submit_report():
+    """
+    Enfileira o relatório abrangente e retorna o job (202)
+    
+    Parâmetros (JSON ou query string): enterpriseId, days (padrão 30) e
+    format (pdf, excel ou both). Pedidos idênticos em andamento recebem o
+    mesmo job. Acompanhe em /api/copilot/reports/<job_id>.
+    """
+    params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+    enterprise_id = params.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
+    format_type = params.get('format', 'both')
+    
+    try:
+        days = int(params.get('days', 30))
+        if days <= 0 or format_type not in REPORT_FORMATS:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({
+            'status': 'error',
+            'message': f"Parâmetros inválidos: days deve ser positivo e format um de {', '.join(REPORT_FORMATS)}",
+            'enterprise_id': enterprise_id
+        }), 400
+    
+    try:
+        job = report_jobs.submit('comprehensive', {
+            'enterprise_id': enterprise_id, 'days': days, 'format_type': format_type
+        })
+    except JobQueueFull as e:
+        print(f"[RELATORIOS] {e}")
+        return jsonify({'status': 'error', 'message': str(e), 'enterprise_id': enterprise_id}), 503
+    
+    print(f"[RELATORIOS] Job {job.id} ({job.status}) para {enterprise_id}")
+    response = jsonify({'status': 'success', 'job': job.to_dict(),
+                        'status_url': url_for('report_status', job_id=job.id)})
+    response.headers['Location'] = url_for('report_status', job_id=job.id)
+    return response, 202
+
+@app.route('/api/copilot/reports/<job_id>')
+def report_status(job_id):
+    """Status do job de relatório e links de download dos artefatos prontos"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job não encontrado ou expirado'}), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict(),
+        'downloads': {fmt: url_for('report_download', job_id=job.id, fmt=fmt) for fmt in job.artifacts}
+    })
+
+@app.route('/api/copilot/reports/<job_id>/download/<fmt>')
+def report_download(job_id, fmt):
+    """Download do artefato (pdf, md ou excel) de um job concluído"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job não encontrado ou expirado'}), 404
+    if job.status != 'done':
+        return jsonify({'status': 'error', 'message': f'Relatório ainda não disponível ({job.status})',
+                        'job': job.to_dict()}), 409
+    
+    path = report_jobs.artifact_path(job, fmt)
+    if path is None:
+        return jsonify({'status': 'error', 'message': f'Formato não gerado neste job: {fmt}'}), 404
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path))
+
+# Exportação em streaming (CSV/XLSX) das tabelas grandes
+EXPORT_DATASETS = {
+    'checklist': 'Checklists',
+    'vehicles': 'Veículos',
+    'drivers': 'Motoristas'
+}
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+def load_export_frame(dataset, enterprise_id, days):
+    """Tabela a exportar: checklists brutos ou a performance por veículo/motorista"""
+    if dataset == 'checklist':
+        end_date = datetime.now()
+        return fleet_connector.get_checklist_data(enterprise_id=enterprise_id,
+                                                  start_date=(end_date - timedelta(days=days)).isoformat(),
+                                                  end_date=end_date.isoformat())
+    processor = FleetDataProcessor(fleet_connector)
+    if dataset == 'vehicles':
+        return pd.DataFrame(processor.get_vehicle_performance(enterprise_id, days))
+    return pd.DataFrame(processor.get_driver_performance(enterprise_id, days))
+
+@app.route('/api/copilot/export/<dataset>')
+def export_dataset(dataset):
+    """
+    Exporta checklists, veículos ou motoristas em CSV ou XLSX, em streaming
+    
+    Parâmetros: enterpriseId, days (padrão 30) e format (csv ou xlsx). O CSV
+    sai em blocos assim que a tabela é carregada; o XLSX é escrito linha a
+    linha (openpyxl write-only) e enviado em blocos.
+    """
+    enterprise_id = request.args.get('enterpriseId', 'qzDVZ1jB6IC60baxtsDU')
+    fmt = request.args.get('format', 'csv').lower()
+    
+    try:
+        days = int(request.args.get('days', 30))
+        if dataset not in EXPORT_DATASETS or fmt not in EXPORT_MIMETYPES or days <= 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': f"Parâmetros inválidos: dataset um de {', '.join(EXPORT_DATASETS)}, "
+                       f"format um de {', '.join(EXPORT_MIMETYPES)} e days positivo",
+            'enterprise_id': enterprise_id
+        }), 400
+    
+    try:
+        frame = load_export_frame(dataset, enterprise_id, days)
+    except Exception as e:
+        print(f"[EXPORTACAO] Erro ao carregar {dataset}: {e}")
+        return jsonify({'status': 'error', 'message': str(e), 'enterprise_id': enterprise_id}), 500
+    
+    print(f"[EXPORTACAO] {len(frame)} linhas de {dataset} em {fmt} para {enterprise_id}")
+    if fmt == 'csv':
+        body = iter_csv(frame)
+    else:
+        body = iter_xlsx([{'title': EXPORT_DATASETS[dataset], 'header': [str(column) for column in frame.columns],
+                           'rows': frame_rows(frame)}])
+    
+    filename = f"{dataset}_{enterprise_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(stream_with_context(body), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 # Endpoint para configurações do scorecard preditivo
 @app.route('/api/copilot/scorecard-preditivo/config')
 def scorecard_config():
@@ -461,7 +730,8 @@ def scorecard_config():
             'trips_api': 'https://firebase-bi-api.onrender.com/trips',
             'users_api': 'https://firebase-bi-api.onrender.com/users',
             'trips_enriched': '/api/trips-enriched',
-            'users_mapping': '/api/users-mapping'
+            'users_mapping': '/api/users-mapping',
+            'scorecard_data': '/api/copilot/scorecard-preditivo/data'
         },
         'features': {
             'real_data_processing': True,
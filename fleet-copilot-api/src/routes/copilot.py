@@ -7,11 +7,15 @@ import os
 import json
 import logging
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import cross_origin
 
+import pandas as pd
+
 # Importar módulos do copiloto
-from src.fleet_data_connector import FleetDataConnector, FleetDataProcessor
+from src.fleet_data_connector import FleetDataConnector, FleetDataProcessor, run_parallel
+from src.fleet_export import iter_stream, stream_format, STREAM_MIMETYPES
+from src.fleet_paging import to_records
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -82,6 +86,52 @@ def safe_format_message(template, **kwargs):
         logger.warning(f"Erro ao formatar mensagem: {e}")
         return "Informação não disponível"
 
+def vehicles_frame(vehicle_perf):
+    """Performance de veículos no formato do FlutterFlow (colunas convertidas de uma vez)"""
+    frame = pd.DataFrame(vehicle_perf, columns=['vehicle_plate', 'total_checks', 'compliance_rate',
+                                                'last_check', 'status', 'top_items'])
+    return pd.DataFrame({
+        'vehiclePlate': frame['vehicle_plate'].fillna('N/A'),
+        'totalChecks': pd.to_numeric(frame['total_checks'], errors='coerce').fillna(0).astype(int),
+        'complianceRate': pd.to_numeric(frame['compliance_rate'], errors='coerce').fillna(0).astype(float).round(1),
+        'lastActivity': frame['last_check'].where(frame['last_check'].notna() & (frame['last_check'] != ''), 'N/A'),
+        'status': frame['status'].fillna('unknown'),
+        'topItems': frame['top_items'].map(lambda items: items if isinstance(items, list) else [])
+    })
+
+def drivers_frame(driver_perf):
+    """Performance de motoristas no formato do FlutterFlow (colunas convertidas de uma vez)"""
+    frame = pd.DataFrame(driver_perf, columns=['driver_name', 'total_checks', 'compliance_rate',
+                                               'vehicles_operated', 'last_activity'])
+    return pd.DataFrame({
+        'driverName': frame['driver_name'].fillna('N/A'),
+        'totalChecks': pd.to_numeric(frame['total_checks'], errors='coerce').fillna(0).astype(int),
+        'complianceRate': pd.to_numeric(frame['compliance_rate'], errors='coerce').fillna(0).astype(float).round(1),
+        'vehiclesOperated': pd.to_numeric(frame['vehicles_operated'], errors='coerce').fillna(0).astype(int),
+        'lastActivity': frame['last_activity'].where(frame['last_activity'].notna() & (frame['last_activity'] != ''), 'N/A')
+    })
+
+def list_response(frame):
+    """Lista no envelope {success, data, count}: inteira ou em streaming (?stream=json|ndjson)"""
+    try:
+        fmt = stream_format(request.args, request.headers.get('Accept', ''))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Parâmetro stream inválido'
+        }), 400
+    
+    if not fmt:
+        return jsonify({
+            'success': True,
+            'data': to_records(frame, decimals=None),
+            'count': len(frame)
+        })
+    
+    envelope = {'success': True, 'count': len(frame)}
+    return Response(stream_with_context(iter_stream(fmt, frame, envelope)), mimetype=STREAM_MIMETYPES[fmt])
+
 # ============================================================================
 # ROTAS PARA FLUTTERFLOW - API CALLS
 # ============================================================================
@@ -90,11 +140,16 @@ def safe_format_message(template, **kwargs):
 @cross_origin()
 def health_check():
     """Health check para verificar se a API está funcionando"""
+    connector = _copilot_components['connector'] if _copilot_components else None
+    cache = connector.cache if connector else None
+    
     return jsonify({
         'status': 'healthy',
         'service': 'Fleet Copilot API',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0'
+        'version': '1.0',
+        'cache': cache.stats() if cache else None,
+        'circuit_breakers': connector.breakers.stats() if connector else None
     })
 
 @copilot_bp.route('/summary', methods=['GET'])
@@ -158,24 +213,11 @@ def get_vehicles_performance():
         vehicle_perf = processor.get_vehicle_performance(enterprise_id, days)
         
         # Formatar para FlutterFlow com validação
-        vehicles_list = []
-        for vehicle in vehicle_perf:
-            vehicles_list.append({
-                'vehiclePlate': vehicle.get('vehicle_plate', 'N/A'),
-                'totalChecks': int(safe_get(vehicle, 'total_checks', 0)),
-                'complianceRate': float(safe_format_number(safe_get(vehicle, 'compliance_rate', 0))),
-                'lastActivity': vehicle.get('last_check') or 'N/A',
-                'status': vehicle.get('status', 'unknown'),
-                'topItems': vehicle.get('top_items', [])
-            })
+        vehicles = vehicles_frame(vehicle_perf)
         
-        logger.info(f"Performance de {len(vehicles_list)} veículos obtida")
+        logger.info(f"Performance de {len(vehicles)} veículos obtida")
         
-        return jsonify({
-            'success': True,
-            'data': vehicles_list,
-            'count': len(vehicles_list)
-        })
+        return list_response(vehicles)
         
     except Exception as e:
         logger.error(f"Erro em get_vehicles_performance: {e}")
@@ -202,23 +244,11 @@ def get_drivers_performance():
         driver_perf = processor.get_driver_performance(enterprise_id, days)
         
         # Formatar para FlutterFlow com validação
-        drivers_list = []
-        for driver in driver_perf:
-            drivers_list.append({
-                'driverName': driver.get('driver_name', 'N/A'),
-                'totalChecks': int(safe_get(driver, 'total_checks', 0)),
-                'complianceRate': float(safe_format_number(safe_get(driver, 'compliance_rate', 0))),
-                'vehiclesOperated': int(safe_get(driver, 'vehicles_operated', 0)),
-                'lastActivity': driver.get('last_activity') or 'N/A'
-            })
+        drivers = drivers_frame(driver_perf)
         
-        logger.info(f"Performance de {len(drivers_list)} motoristas obtida")
+        logger.info(f"Performance de {len(drivers)} motoristas obtida")
         
-        return jsonify({
-            'success': True,
-            'data': drivers_list,
-            'count': len(drivers_list)
-        })
+        return list_response(drivers)
         
     except Exception as e:
         logger.error(f"Erro em get_drivers_performance: {e}")
@@ -427,11 +457,17 @@ def dashboard_page():
         components = get_copilot_components()
         processor = components['processor']
         
-        # Obter dados
-        summary = processor.get_checklist_summary(enterprise_id, days)
-        vehicles = processor.get_vehicle_performance(enterprise_id, days)
-        drivers = processor.get_driver_performance(enterprise_id, days)
-        alerts = processor.get_maintenance_alerts(enterprise_id)
+        # Obter dados em paralelo (buscas idênticas são deduplicadas)
+        results = run_parallel({
+            'summary': lambda: processor.get_checklist_summary(enterprise_id, days),
+            'vehicles': lambda: processor.get_vehicle_performance(enterprise_id, days),
+            'drivers': lambda: processor.get_driver_performance(enterprise_id, days),
+            'alerts': lambda: processor.get_maintenance_alerts(enterprise_id)
+        })
+        summary = results['summary']
+        vehicles = results['vehicles']
+        drivers = results['drivers']
+        alerts = results['alerts']
         
         # Gerar HTML do dashboard
         html_content = generate_dashboard_html(summary, vehicles, drivers, alerts, enterprise_id)
@@ -0,0 +1,143 @@
+"""
+Fixtures compartilhadas dos testes: API falsa (sessão HTTP em memória),
+geradores de registros e conector isolado em diretório temporário.
+"""
+
+import io
+import os
+import sys
+import json
+import random
+import tempfile
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Estado compartilhado (cache, store, rollups, jobs) fora do /tmp real durante os testes
+_STATE_DIR = tempfile.mkdtemp(prefix='fleet_copilot_tests_')
+for _var, _name in (('FLEET_CACHE_PATH', 'cache.sqlite3'), ('FLEET_STORE_PATH', 'store.sqlite3'),
+                    ('FLEET_ROLLUP_PATH', 'rollups.sqlite3'), ('FLEET_USERS_PATH', 'users.sqlite3'),
+                    ('FLEET_REPORT_JOBS_DIR', 'jobs'), ('FLEET_REPORT_DIR', 'reports')):
+    os.environ.setdefault(_var, os.path.join(_STATE_DIR, _name))
+
+from src.fleet_data_connector import FleetAPIConfig, FleetDataConnector  # noqa: E402
+from src.fleet_stream import record_path_for  # noqa: E402
+
+class FakeResponse:
+    """Resposta HTTP mínima com o que o conector usa (json, raw, iter_content, status)"""
+
+    def __init__(self, payload=None, status_code: int = 200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode() if payload is not None else b''
+        self.raw = io.BytesIO(self.content)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error", response=self)
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), 64):
+            yield self.content[start:start + 64]
+
+class FakeSession:
+    """Substitui requests.Session: responde por caminho e registra as chamadas
+
+    Cada rota aceita uma lista de registros (resposta 200), uma FakeResponse,
+    uma exceção (lançada na chamada) ou uma função (params) -> um desses.
+    Listas de endpoints que a API envolve em {"data": [...]} (RECORD_PATHS)
+    são respondidas nesse formato.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.calls = []
+
+    def get(self, url, params=None, stream=False, timeout=None):
+        path = urlparse(url).path
+        self.calls.append((path, dict(params or {})))
+        route = self.routes.get(path, [])
+        if callable(route):
+            route = route(dict(params or {}))
+        if isinstance(route, Exception):
+            raise route
+        if isinstance(route, FakeResponse):
+            return route
+        if isinstance(route, list) and record_path_for(path) == 'data.item':
+            route = {'data': route}
+        return FakeResponse(route)
+
+    def count(self, path: str) -> int:
+        return sum(1 for called, _ in self.calls if called == path)
+
+def checklist_records(n: int = 400, days: int = 20, seed: int = 1, enterprise_id: str = 'E1'):
+    """Checklists sintéticos espalhados pelos últimos `days` dias"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    records = []
+    for i in range(n):
+        records.append({
+            'id': f'c{i}',
+            'enterpriseId': enterprise_id,
+            'timestamp': (now - timedelta(minutes=rng.randint(30, days * 24 * 60))).isoformat(),
+            'vehiclePlate': rng.choice(['ABC1234', 'XYZ9876', 'QWE5555', None]),
+            'driverName': rng.choice(['Ana', 'Bruno', 'Carla', '']),
+            'itemName': rng.choice(['Pneu', 'Freio', 'Luz']),
+            'noCompliant': rng.random() < 0.3,
+            'compliant': True
+        })
+    return records
+
+def alert_records(n: int = 200, days: int = 10, seed: int = 2):
+    """Alertas de check-in (telemática) sintéticos"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [{
+        'id': f'a{i}',
+        'timestamp': (now - timedelta(minutes=rng.randint(30, days * 24 * 60))).isoformat(),
+        'deviceId': f'd{rng.randint(0, 4)}',
+        'vehiclePlate': rng.choice(['ABC1234', 'XYZ9876']),
+        'location': {'latitude': -23.5 + rng.random(), 'longitude': -46.6 + rng.random()},
+        'temperature': round(rng.uniform(20, 45), 1),
+        'humidity': round(rng.uniform(30, 95), 1),
+        'lowBattery': rng.random() < 0.2
+    } for i in range(n)]
+
+@pytest.fixture
+def upstream():
+    """API falsa com checklist e alertas; rotas podem ser trocadas no teste"""
+    return FakeSession({
+        '/checklist': checklist_records(),
+        '/alerts-checkin': alert_records(),
+        '/driver-trips': [],
+        '/users': []
+    })
+
+@pytest.fixture
+def make_connector(tmp_path, upstream):
+    """Fábrica de conectores ligados à API falsa, com estado em tmp_path"""
+    def factory(session=None, **overrides):
+        settings = dict(base_url='http://fleet.test', cache_ttl=0, backoff_base=0.0, backoff_max=0.0,
+                        cache_path=str(tmp_path / 'cache.sqlite3'),
+                        local_store_path=str(tmp_path / 'store.sqlite3'),
+                        rollup_path=str(tmp_path / 'rollups.sqlite3'), local_store=False)
+        settings.update(overrides)
+        connector = FleetDataConnector(FleetAPIConfig(**settings))
+        connector.session = session or upstream
+        return connector
+    return factory
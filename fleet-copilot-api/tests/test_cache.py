@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+import requests
+
+from src import fleet_cache
+from src.fleet_cache import ResponseCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(fleet_cache, 'time', SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def test_entries_expire_after_ttl_but_stay_available_as_stale(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'c.sqlite3'), ttl=60)
+    cache.set('k', [{'a': 1}])
+
+    clock[0] += 61
+
+    assert cache.get('k') is None
+    assert cache.get('k', allow_stale=True) == [{'a': 1}]
+    assert cache.stats()['stale_hits'] == 1
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'c.sqlite3'), ttl=60, max_entries=2)
+    cache.set('a', 1)
+    clock[0] += 1
+    cache.set('b', 2)
+    clock[0] += 1
+    cache.get('a')
+    clock[0] += 1
+
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+def test_key_ignores_parameter_order():
+    assert (ResponseCache.make_key('/checklist', {'a': 1, 'b': 2})
+            == ResponseCache.make_key('/checklist', {'b': 2, 'a': 1}))
+    assert ResponseCache.make_key('/checklist', {'a': 1}) != ResponseCache.make_key('/checklist', {'a': 2})
+
+def test_entries_are_shared_between_instances_on_the_same_file(tmp_path):
+    path = str(tmp_path / 'c.sqlite3')
+    ResponseCache(path).set('k', {'v': 1})
+
+    assert ResponseCache(path).get('k') == {'v': 1}
+
+def test_connector_serves_repeated_fetches_from_cache(make_connector, upstream):
+    connector = make_connector(cache_ttl=120)
+    start = (datetime.now() - timedelta(days=7)).isoformat()
+
+    first = connector.get_checklist_data('E1', start)
+    second = connector.get_checklist_data('E1', start)
+
+    assert upstream.count('/checklist') == 1
+    assert len(first) == len(second)
+
+def test_rolling_window_keeps_its_cache_key_as_the_clock_moves(make_connector, upstream):
+    connector = make_connector(cache_ttl=120)
+    start = datetime.now().replace(hour=10, minute=0) - timedelta(days=7)
+
+    connector.get_checklist_data('E1', start.isoformat(), datetime.now().isoformat())
+    later = connector.get_checklist_data('E1', (start + timedelta(minutes=3)).isoformat(),
+                                         (datetime.now() + timedelta(minutes=3)).isoformat())
+
+    assert upstream.count('/checklist') == 1
+    assert connector.cache.stats()['hits'] == 1
+    assert (later['timestamp'] >= start + timedelta(minutes=3)).all()
+
+def test_connector_falls_back_to_stale_data_when_upstream_fails(make_connector, upstream):
+    connector = make_connector(cache_ttl=120)
+    start = (datetime.now() - timedelta(days=7)).isoformat()
+    fresh = connector.get_checklist_data('E1', start)
+
+    connector.cache.ttl = -1
+    upstream.routes['/checklist'] = requests.exceptions.ConnectionError('offline')
+    stale = connector.get_checklist_data('E1', start)
+
+    assert len(stale) == len(fresh) > 0
+
+def test_stale_fallback_survives_a_moved_window(make_connector, upstream):
+    connector = make_connector(cache_ttl=120)
+    fresh = connector.get_checklist_data('E1', (datetime.now() - timedelta(days=7)).isoformat())
+
+    upstream.routes['/checklist'] = requests.exceptions.ConnectionError('offline')
+    later = (datetime.now() - timedelta(days=6)).isoformat()
+    stale = connector.get_checklist_data('E1', later)
+
+    assert 0 < len(stale) <= len(fresh)
+    assert (stale['timestamp'] >= pd.Timestamp(later)).all()
+    assert connector.get_checklist_data('E2', later).empty
@@ -0,0 +1,70 @@
+import base64
+from concurrent.futures import Future
+
+import pytest
+
+from src.fleet_cache import ResponseCache
+from src.fleet_render import render_chart_job
+from src.fleet_visualization import FleetVisualizationEngine
+
+DATA = {'days': 7, 'total': 10, 'compliant': 7, 'non_compliant': 3, 'vehicles': 2, 'drivers': 3}
+
+class RecordingPool:
+    """Pool em processo que registra cada renderização pedida"""
+    timeout = 60
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, chart, data, colors, profile):
+        self.jobs.append((chart, profile))
+        future = Future()
+        future.set_result(render_chart_job(chart, data, colors, profile))
+        return future
+
+@pytest.fixture
+def pool():
+    return RecordingPool()
+
+@pytest.fixture
+def engine(make_connector, pool, tmp_path):
+    from src.fleet_data_connector import FleetDataProcessor
+    return FleetVisualizationEngine(FleetDataProcessor(make_connector()),
+                                    cache=ResponseCache(str(tmp_path / 'charts.sqlite3'), ttl=60),
+                                    render_pool=pool)
+
+def test_json_profile_returns_the_spec_without_rendering(engine, pool):
+    spec = engine.render_chart('checklist_summary', DATA, 'json')
+
+    assert spec == {'chart': 'checklist_summary', 'colors': engine.colors, 'data': DATA}
+    assert pool.jobs == []
+
+def test_same_data_and_profile_is_rendered_once(engine, pool):
+    first = engine.render_chart('checklist_summary', DATA)
+    second = engine.render_chart('checklist_summary', dict(DATA))
+
+    assert first == second
+    assert pool.jobs == [('checklist_summary', 'screen')]
+
+def test_each_profile_has_its_own_entry(engine, pool):
+    png = engine.render_chart('checklist_summary', DATA, 'screen')
+    svg = engine.render_chart('checklist_summary', DATA, 'svg')
+    engine.render_chart('checklist_summary', {**DATA, 'compliant': 8})
+
+    assert base64.b64decode(png).startswith(b'\x89PNG')
+    assert svg.lstrip().startswith('<?xml')
+    assert pool.jobs == [('checklist_summary', 'screen'), ('checklist_summary', 'svg'),
+                         ('checklist_summary', 'screen')]
+
+def test_expired_entries_are_still_served(engine, pool):
+    engine.render_chart('checklist_summary', DATA)
+    engine.cache.ttl = -1
+
+    engine.render_chart('checklist_summary', DATA)
+
+    assert len(pool.jobs) == 1
+
+@pytest.mark.parametrize('chart, profile', [('checklist_summary', 'pdf'), ('pizza', 'screen')])
+def test_unknown_profile_or_chart_is_rejected(engine, chart, profile):
+    with pytest.raises(ValueError):
+        engine.render_chart(chart, DATA, profile)
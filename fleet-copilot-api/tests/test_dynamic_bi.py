@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.dynamic_bi_routes import DynamicBIProcessor
+from src.fleet_paging import PageRequest
+
+def supply(plate, days_ago, liters, enterprise_id='E1', odometer=None):
+    when = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return {'enterpriseId': enterprise_id, 'VehiclePlate': plate, 'Timestamp': when.isoformat(),
+            'AmountLiters': liters, 'StockedValue': liters * 6, 'Odometer': odometer}
+
+def test_fuel_is_filtered_by_enterprise_and_period():
+    data = [
+        supply('AAA1111', 40, 50, odometer=10000),
+        supply('AAA1111', 5, 40, odometer=10400),
+        supply('BBB2222', 3, 30),
+        supply('CCC3333', 2, 99, enterprise_id='E2'),
+    ]
+
+    result = DynamicBIProcessor().process_fuel_data(data, 'E1', 30)
+
+    assert result['period_days'] == 30
+    assert result['pagination']['total'] == 2
+    assert sorted(row['vehiclePlate'] for row in result['raw_data']) == ['AAA1111', 'BBB2222']
+    # Km do primeiro abastecimento da janela vem do hodômetro anterior a ela
+    assert [row['kmTraveled'] for row in result['raw_data'] if row['vehiclePlate'] == 'AAA1111'] == [400]
+
+def test_fuel_outside_the_period_gives_the_empty_response():
+    result = DynamicBIProcessor().process_fuel_data([supply('AAA1111', 60, 50)], 'E1', 30)
+
+    assert result['period_days'] == 30 and result['raw_data'] == []
+
+@pytest.mark.parametrize('name', ['checklist', 'trips', 'alerts', 'maintenance', 'fuel'])
+def test_empty_responses_have_the_same_pagination_shape(name):
+    processor = DynamicBIProcessor()
+    process = getattr(processor, f'process_{name}_data')
+    record = {'id': 'a', 'enterpriseId': 'E1', 'vehiclePlate': 'AAA1111',
+              'Timestamp': datetime.now(timezone.utc).isoformat(), 'AmountLiters': 10}
+    full = process([record], 'E1', 30)
+    assert full['pagination']['total'] == 1
+
+    empty = process([], 'E1', 30, PageRequest(limit=10))
+
+    assert empty['raw_data'] == []
+    assert empty['pagination'].keys() == full['pagination'].keys()
+    assert empty['pagination']['next_cursor'] is None and empty['pagination']['limit'] == 10
+    assert 'pagination' not in process([], 'E1', 30, stream=True)
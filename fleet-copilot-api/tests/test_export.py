@@ -0,0 +1,54 @@
+import csv
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from src.fleet_export import frame_rows, iter_csv, iter_xlsx, plain_value
+
+FRAME = pd.DataFrame({
+    'plate': ['ABC1234', 'XYZ9876', None],
+    'rate': [97.5, np.nan, 80.0],
+    'checks': np.array([3, 4, 5], dtype='int64'),
+    'last': pd.to_datetime(['2025-01-02T10:00:00Z', None, '2025-01-03T08:30:00Z'])
+})
+
+def test_plain_value_converts_numpy_pandas_and_nested_values():
+    assert plain_value(np.int64(3)) == 3 and type(plain_value(np.int64(3))) is int
+    assert plain_value(np.nan) is None and plain_value(pd.NaT) is None and plain_value(pd.NA) is None
+    assert plain_value(pd.Timestamp('2025-01-02T10:00:00Z')) == datetime(2025, 1, 2, 10)
+    assert plain_value({'a': 1}) == "{'a': 1}"
+
+def test_frame_rows_are_converted_chunk_by_chunk():
+    rows = list(frame_rows(FRAME, chunk_size=2))
+
+    assert rows[1] == ['XYZ9876', None, 4, None]
+    assert len(rows) == 3
+
+def test_csv_starts_with_the_header_and_matches_the_frame():
+    chunks = list(iter_csv(FRAME, chunk_size=2))
+
+    assert chunks[0] == '\ufeffplate,rate,checks,last\r\n'
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(''.join(chunks).lstrip('\ufeff'))))
+    assert rows[1] == ['ABC1234', '97.5', '3', '2025-01-02 10:00:00']
+    assert rows[2][1] == '' and rows[3][0] == ''
+
+def test_xlsx_is_streamed_in_blocks_and_opens_with_every_sheet():
+    sheets = [
+        {'title': 'Veículos', 'header': list(FRAME.columns), 'rows': frame_rows(FRAME), 'heading': 'Frota'},
+        {'title': 'Resumo', 'header': ['Métrica', 'Valor'], 'rows': [['total', 3]]}
+    ]
+
+    blocks = list(iter_xlsx(sheets, chunk_bytes=1024))
+
+    assert len(blocks) > 1 and all(len(block) <= 1024 for block in blocks)
+    workbook = load_workbook(io.BytesIO(b''.join(blocks)))
+    assert workbook.sheetnames == ['Veículos', 'Resumo']
+    values = list(workbook['Veículos'].values)
+    assert values[0][0] == 'Frota'
+    assert values[1] == ('plate', 'rate', 'checks', 'last')
+    assert values[2] == ('ABC1234', 97.5, 3, datetime(2025, 1, 2, 10))
+    assert list(workbook['Resumo'].values)[1] == ('total', 3)
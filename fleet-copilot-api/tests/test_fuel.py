@@ -0,0 +1,64 @@
+import json
+
+import pandas as pd
+
+from src.fleet_fuel import FleetFuelEngine, filter_supplies, normalize_supplies, parse_decimal
+
+def supply(plate, date, liters, cost, odometer=None, km=None, fuel='Diesel', state='SP'):
+    return {'VehiclePlate': plate, 'Timestamp': date, 'AmountLiters': liters, 'StockedValue': cost,
+            'Odometer': odometer, 'KmTraveled': km, 'FuelType': fuel, 'MerchantState': state}
+
+SUPPLIES = [
+    supply('AAA1111', '2025-01-01T08:00:00Z', '50,0', '300,00', odometer=10000),
+    supply('AAA1111', '2025-01-05T08:00:00Z', '50,0', '300,00', odometer=10500),
+    supply('AAA1111', '2025-01-09T08:00:00Z', '40,0', '240,00', odometer=10900, km='400'),
+    supply('AAA1111', '2025-01-09T09:00:00Z', '200,0', '1.200,00', odometer=10400),
+    supply('BBB2222', '2025-02-01T08:00:00Z', 30, 270, fuel='Gasolina', state='RJ'),
+]
+
+def test_parse_decimal_reads_brazilian_numbers():
+    values = pd.Series(['1.234,56', '12.5', 7, None, 'x'], dtype=object)
+
+    assert parse_decimal(values).tolist() == [1234.56, 12.5, 7.0, 0.0, 0.0]
+
+def test_km_is_rebuilt_from_reported_value_or_odometer_sequence():
+    supplies = normalize_supplies(pd.DataFrame(SUPPLIES))
+    first_vehicle = supplies[supplies['vehiclePlate'] == 'AAA1111']
+
+    assert first_vehicle['kmSource'].tolist() == ['none', 'sequence', 'reported', 'none']
+    assert first_vehicle['kmTraveled'].tolist() == [0.0, 500.0, 400.0, 0.0]
+    assert first_vehicle['kmPerLiter'].tolist()[1:3] == [10.0, 10.0]
+
+def test_anomaly_rules_flag_suspicious_supplies():
+    supplies = normalize_supplies(pd.DataFrame(SUPPLIES))
+    last = supplies[supplies['vehiclePlate'] == 'AAA1111'].iloc[-1]
+
+    assert last['odometer_regression'] and last['liters_outlier'] and last['rapid_refuel']
+    assert set(last['anomalies']) >= {'odometer_regression', 'liters_outlier', 'rapid_refuel'}
+
+def test_date_filter_keeps_whole_days():
+    supplies = normalize_supplies(pd.DataFrame(SUPPLIES))
+
+    filtered = filter_supplies(supplies, {'startDate': '2025-01-05', 'endDate': '2025-01-09'})
+
+    assert len(filtered) == 3
+
+def test_analytics_totals_pages_and_json():
+    engine = FleetFuelEngine(connector=None, cache=object())
+
+    result = engine.build_analytics(pd.DataFrame(SUPPLIES), {'state': 'SP'}, per_page=2)
+
+    json.dumps(result)
+    assert result['metrics']['total_supplies'] == 4
+    assert result['metrics']['total_liters'] == 340.0
+    assert result['metrics']['total_cost'] == 2040.0
+    assert result['pagination'] == {'page': 1, 'per_page': 2, 'total': 4, 'pages': 2}
+    assert result['facets']['state'] == ['RJ', 'SP']
+    assert result['vehicles'][0]['vehiclePlate'] == 'AAA1111'
+
+def test_analytics_works_without_the_shared_cache(make_connector, upstream):
+    upstream.routes['/alelo-supply-history'] = {'data': SUPPLIES}
+    engine = FleetFuelEngine(make_connector())
+
+    assert engine.cache is None
+    assert engine.analytics('E1')['pagination']['total'] == len(SUPPLIES)
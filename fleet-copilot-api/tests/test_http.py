@@ -0,0 +1,96 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from src import fleet_http
+from src.fleet_http import ResponseOptimizer
+
+BIG = {'rows': [{'plate': f'ABC{i:04d}', 'rate': i / 10} for i in range(200)]}
+
+@pytest.fixture
+def optimizer(monkeypatch):
+    monkeypatch.setattr(fleet_http, 'brotli', None)
+    return ResponseOptimizer()
+
+@pytest.fixture
+def client(optimizer):
+    app = Flask(__name__)
+    app.after_request(optimizer.process)
+
+    @app.route('/big')
+    def big():
+        return jsonify(BIG)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((f'{{"n":{i}}}\n' for i in range(500)), mimetype='application/x-ndjson')
+
+    @app.route('/png')
+    def png():
+        return Response(b'\x89PNG' + b'\0' * 4096, mimetype='image/png')
+
+    @app.route('/big', methods=['POST'])
+    def big_post():
+        return jsonify(BIG)
+
+    return app.test_client()
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+def test_large_json_is_gzipped_with_an_encoding_specific_etag(client):
+    plain = client.get('/big')
+    zipped = client.get('/big', headers=GZIP)
+
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert zipped.headers['Cache-Control'] == 'no-cache'
+
+def test_small_bodies_and_binary_files_are_not_compressed(client):
+    assert 'Content-Encoding' not in client.get('/small', headers=GZIP).headers
+    png = client.get('/png', headers=GZIP)
+    assert 'Content-Encoding' not in png.headers and png.data.startswith(b'\x89PNG')
+
+def test_matching_etag_gives_304_without_body(client):
+    etag = client.get('/big', headers=GZIP).headers['ETag']
+
+    revalidated = client.get('/big', headers={**GZIP, 'If-None-Match': etag})
+
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+def test_non_get_requests_pass_through(client):
+    response = client.post('/big', headers=GZIP)
+
+    assert 'ETag' not in response.headers and 'Content-Encoding' not in response.headers
+
+def test_streamed_bodies_are_compressed_block_by_block(client):
+    response = client.get('/stream', headers=GZIP)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'ETag' not in response.headers
+    lines = gzip.decompress(response.data).decode().splitlines()
+    assert lines[0] == '{"n":0}' and len(lines) == 500
+
+def test_stream_blocks_are_flushed_as_they_arrive(optimizer):
+    decompressor = zlib.decompressobj(31)
+    blocks = optimizer.compress_stream(iter([b'primeiro bloco', b'segundo']), 'gzip')
+
+    assert decompressor.decompress(next(blocks)) == b'primeiro bloco'
+
+def test_compressed_bodies_are_reused(optimizer, monkeypatch, client):
+    calls = []
+    compress = optimizer.compress
+    monkeypatch.setattr(optimizer, 'compress', lambda data, encoding: calls.append(1) or compress(data, encoding))
+
+    client.get('/big', headers=GZIP)
+    client.get('/big', headers=GZIP)
+
+    assert len(calls) == 1
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from flask import Flask, jsonify
+
+from src.fleet_data_connector import FleetDataProcessor
+from src.fleet_insights import FleetInsightsEngine
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+@pytest.fixture
+def engine(make_connector):
+    return FleetInsightsEngine(FleetDataProcessor(make_connector()))
+
+def to_json(app, value):
+    """Serializa como a rota da API (jsonify rejeita tipos numpy como int64)"""
+    with app.app_context():
+        return json.loads(jsonify(value).get_data())
+
+def test_safety_metrics_are_json_serializable(app, engine, upstream):
+    low_battery = sum(record['lowBattery'] for record in upstream.routes['/alerts-checkin'])
+
+    safety = to_json(app, engine._analyze_safety_metrics('E1', 30))
+
+    assert safety['battery_alerts'] == low_battery > 0
+    assert safety['insights'][-1]['data'] == {'low_battery_alerts': low_battery}
+
+def test_performance_analyses_are_json_serializable(app, engine):
+    vehicles = to_json(app, engine._analyze_vehicle_performance('E1', 30))
+    drivers = to_json(app, engine._analyze_driver_performance('E1', 30))
+
+    assert isinstance(vehicles['average_compliance'], float) and vehicles['total_vehicles_analyzed'] > 0
+    assert isinstance(drivers['average_compliance'], float) and drivers['total_drivers_analyzed'] > 0
+
+@pytest.mark.parametrize('local_store', [False, True])
+def test_comprehensive_analysis_is_json_serializable(app, make_connector, local_store):
+    engine = FleetInsightsEngine(FleetDataProcessor(make_connector(local_store=local_store, sync_interval=0)))
+
+    analysis = to_json(app, engine.generate_comprehensive_analysis('E1', 30))
+
+    maintenance = analysis['maintenance_insights']
+    top = maintenance['insights'][0]['data']
+    assert top['count'] == maintenance['common_issues'][top['item']] == max(maintenance['common_issues'].values())
+    assert sum(maintenance['issues_trend'].values()) == maintenance['total_issues'] > 0
+    assert analysis['safety_insights']['battery_alerts'] > 0
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.fleet_cache import ResponseCache
+from src.fleet_jobs import DONE, FAILED, RUNNING, ReportJob, ReportJobQueue
+
+PARAMS = {'enterprise_id': 'E1', 'days': 30}
+
+def write_report(output_dir, **params):
+    path = os.path.join(output_dir, 'relatorio.md')
+    with open(path, 'w') as f:
+        f.write(str(params))
+    return {'markdown': path}
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job.status in (DONE, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} não terminou")
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = ReportJobQueue(str(tmp_path), lease_timeout=60)
+    queue.register('comprehensive', write_report)
+    return queue
+
+def orphan(queue, **fields):
+    """Grava um job 'running' de outro worker, como se ele tivesse sido reciclado"""
+    job = ReportJob(id='orfao', kind='comprehensive', key=ResponseCache.make_key('/reports/comprehensive', PARAMS),
+                    params=PARAMS, status=RUNNING, started_at=time.time(), **fields)
+    with queue._connect() as conn:
+        queue._save(conn, job)
+    return job
+
+def test_job_runs_in_background_and_exposes_its_artifact(queue):
+    job = wait_for(queue, queue.submit('comprehensive', PARAMS).id)
+
+    assert job.status == DONE
+    assert os.path.isfile(queue.artifact_path(job, 'markdown'))
+    assert 'worker_pid' not in job.to_dict()
+
+def test_identical_requests_share_the_job_in_flight(queue):
+    release = threading.Event()
+    queue.register('comprehensive', lambda output_dir, **params: release.wait(5) and {})
+
+    first = queue.submit('comprehensive', PARAMS)
+    second = queue.submit('comprehensive', PARAMS)
+    release.set()
+
+    assert second.id == first.id
+
+def test_job_of_a_dead_worker_does_not_block_new_requests(queue):
+    orphan(queue, worker_pid=dead_pid(), heartbeat_at=time.time())
+
+    job = queue.submit('comprehensive', PARAMS)
+
+    assert job.id != 'orfao'
+    assert queue.get('orfao').status == FAILED
+    assert wait_for(queue, job.id).status == DONE
+
+def test_job_with_an_expired_lease_is_marked_failed(queue):
+    orphan(queue, worker_pid=os.getppid(), heartbeat_at=time.time() - 120)
+
+    job = queue.get('orfao')
+
+    assert job.status == FAILED
+    assert job.error == "Worker do job parou de responder"
+
+def test_job_with_a_live_lease_is_kept(queue):
+    orphan(queue, worker_pid=os.getppid(), heartbeat_at=time.time())
+
+    assert queue.submit('comprehensive', PARAMS).id == 'orfao'
+
+def test_running_jobs_renew_their_lease(tmp_path):
+    queue = ReportJobQueue(str(tmp_path), lease_timeout=0.2)
+    release = threading.Event()
+    queue.register('comprehensive', lambda output_dir, **params: release.wait(5) and {})
+
+    job = queue.submit('comprehensive', PARAMS)
+    time.sleep(0.5)
+    running = queue.get(job.id)
+    release.set()
+
+    assert running.status == RUNNING
+    assert running.heartbeat_at > running.started_at
+
+def test_databases_without_the_lease_columns_are_migrated(tmp_path):
+    with sqlite3.connect(str(tmp_path / 'jobs.sqlite3')) as conn:
+        conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, key TEXT NOT NULL, "
+                     "params TEXT NOT NULL, status TEXT NOT NULL, created_at REAL NOT NULL, started_at REAL, "
+                     "finished_at REAL, artifacts TEXT NOT NULL, error TEXT)")
+        conn.execute("INSERT INTO jobs VALUES ('antigo', 'comprehensive', 'k', '{}', 'done', 1, 1, 1, '{}', NULL)")
+
+    queue = ReportJobQueue(str(tmp_path), retention=10 ** 12)
+
+    assert queue.get('antigo').worker_pid is None
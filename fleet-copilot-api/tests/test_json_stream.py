@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fleet_export import iter_json, iter_ndjson, stream_format
+
+FRAME = pd.DataFrame({
+    'id': ['a', 'b', 'c'],
+    'value': [1.5, np.nan, 3.0],
+    'count': np.array([1, 2, 3], dtype='int64'),
+    'when': pd.to_datetime(['2025-01-01T00:00:00', None, '2025-01-03T12:00:00'])
+})
+RECORDS = [
+    {'id': 'a', 'value': 1.5, 'count': 1, 'when': '2025-01-01T00:00:00'},
+    {'id': 'b', 'value': None, 'count': 2, 'when': None},
+    {'id': 'c', 'value': 3.0, 'count': 3, 'when': '2025-01-03T12:00:00'},
+]
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 10])
+def test_json_stream_is_the_whole_document(chunk_size):
+    envelope = {'success': True, 'total': np.int64(3)}
+
+    chunks = list(iter_json(FRAME, envelope, chunk_size=chunk_size))
+
+    assert json.loads(''.join(chunks)) == {'success': True, 'total': 3, 'data': RECORDS}
+    assert chunks[0].endswith('[') and '"a"' not in chunks[0]
+
+def test_rows_can_sit_at_a_nested_path():
+    document = json.loads(''.join(iter_json(FRAME.head(1), {'meta': {'page': 1}}, path=('result', 'items'))))
+
+    assert document == {'meta': {'page': 1}, 'result': {'items': RECORDS[:1]}}
+
+def test_empty_rows_give_an_empty_array():
+    assert json.loads(''.join(iter_json([], {'success': True}))) == {'success': True, 'data': []}
+
+def test_ndjson_has_the_envelope_then_one_record_per_line():
+    lines = ''.join(iter_ndjson(RECORDS, {'total': 3}, chunk_size=2)).splitlines()
+
+    assert [json.loads(line) for line in lines] == [{'total': 3}, *RECORDS]
+
+@pytest.mark.parametrize('args, accept, expected', [
+    ({}, '', None),
+    ({'stream': '1'}, '', 'json'),
+    ({'stream': 'ndjson'}, '', 'ndjson'),
+    ({'stream': 'false'}, 'application/x-ndjson', None),
+    ({}, 'application/x-ndjson', 'ndjson'),
+])
+def test_stream_format_from_query_or_accept(args, accept, expected):
+    assert stream_format(args, accept) == expected
+
+def test_unknown_stream_format_is_rejected():
+    with pytest.raises(ValueError):
+        stream_format({'stream': 'xml'})
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src import main
+
+def trip(user, days_ago=1):
+    timestamp = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return {'id': f'{user}-{days_ago}', 'UserString': user, 'driverId': user,
+            'TimeStamp': int(timestamp.timestamp() * 1000), 'TripDistance': 10.0, 'score': 80}
+
+@pytest.fixture
+def client(monkeypatch, upstream):
+    upstream.routes['/trips'] = [trip('u1'), trip('u2', 3)]
+    upstream.routes['/users'] = [{'id': 'u1', 'name': 'Ana'}]
+    monkeypatch.setattr(main.fleet_connector, 'session', upstream)
+    if main.fleet_connector.cache:
+        main.fleet_connector.cache.invalidate()
+    return main.app.test_client()
+
+@pytest.mark.parametrize('url', ['/api/copilot/scorecard-preditivo/data?enterpriseId=E1',
+                                 '/api/trips-enriched?enterpriseId=E1&limit=10'])
+def test_repeated_requests_keep_the_etag_and_date_the_response_in_a_header(client, url):
+    first = client.get(url)
+    second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert 'X-Generated-At' in first.headers
+    assert 'generated_at' not in first.get_json() and 'enrichment_timestamp' not in first.get_json()
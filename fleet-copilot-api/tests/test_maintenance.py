@@ -0,0 +1,88 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.fleet_maintenance import FleetMaintenanceEngine, count_by, is_truthy, parse_dates
+
+ORDERS = [
+    {'osNumber': 1, 'osType': 'Preventiva', 'vehiclePlate': 'AAA1111', 'osOpenDate': '2025-01-05T10:00:00Z',
+     'estimatedCompletionDate': '2025-01-10T00:00:00Z', 'actualCompletionDate': '2025-01-08T00:00:00Z',
+     'openOS': False, 'ItemsPreventive': [{'serviceItem': 'Óleo'}, {'serviceItem': 'Filtro'}]},
+    {'osNumber': 2, 'osType': 'Corretiva', 'vehiclePlate': 'AAA1111', 'osOpenDate': '2025-02-01T10:00:00Z',
+     'estimatedCompletionDate': '2025-02-02T00:00:00Z', 'actualCompletionDate': '2025-02-05T00:00:00Z',
+     'openOS': False, 'serviceGroup': 'Freios', 'IssueSource': 'Checklist'},
+    {'osNumber': 3, 'osType': 'Corretiva', 'vehiclePlate': 'BBB2222', 'osOpenDate': '2025-02-10T10:00:00Z',
+     'openOS': True, 'priority': 'Alta', 'serviceGroup': 'Motor'},
+    {'osNumber': 4, 'osType': 'Inspeção', 'vehiclePlate': 'BBB2222', 'osOpenDate': '2025-02-11T10:00:00Z'},
+]
+VEHICLES = [
+    {'vehiclePlate': 'AAA1111', 'currentMileage': 20000, 'lastPreventiveMaintenanceMileage': 10000,
+     'maximumMileageAllowance': 10000, 'garage': 'Centro'},
+    {'vehiclePlate': 'BBB2222', 'currentMileage': 9600, 'lastPreventiveMaintenanceMileage': 0,
+     'garage': 'Norte'},
+    {'vehiclePlate': 'AAA1111', 'currentMileage': 1, 'garage': 'Duplicado'},
+]
+
+def aggregate(filters=None):
+    engine = FleetMaintenanceEngine(connector=None, cache=object())
+    return engine.build_aggregate(pd.DataFrame(ORDERS), pd.DataFrame(VEHICLES), filters)
+
+def test_is_truthy_follows_javascript():
+    values = pd.Series([None, '', 0, '0', False, 'x', 1, True], dtype=object)
+
+    assert is_truthy(values).tolist() == [False, False, False, False, False, True, True, True]
+
+def test_parse_dates_accepts_epoch_and_iso():
+    dates = parse_dates(pd.Series([1735732800000, '2025-01-01T12:00:00Z', 'lixo'], dtype=object))
+
+    assert dates.iloc[0] == dates.iloc[1] == pd.Timestamp('2025-01-01T12:00:00Z')
+    assert pd.isna(dates.iloc[2])
+
+def test_count_by_keeps_order_and_groups_blanks():
+    assert count_by(pd.Series(['b', None, 'a', 'b', ''])) == {'b': 2, 'Outros': 2, 'a': 1}
+
+def test_kpis_and_monthly_trend_only_count_maintenance_orders():
+    result = aggregate()
+
+    metrics = result['metrics']
+    assert metrics['total_services'] == 3
+    assert metrics['preventive_services'] == 1 and metrics['corrective_services'] == 2
+    assert metrics['completed_services'] == 2 and metrics['on_time_services'] == 1
+    assert metrics['pending_services'] == 1
+    assert result['monthly']['labels'] == ['2025-01', '2025-02']
+    assert result['monthly']['corrective'] == [0, 2]
+
+def test_charts_tables_and_alerts():
+    result = aggregate()
+
+    assert result['charts']['preventive_by_item'] == {'Óleo': 1, 'Filtro': 1}
+    assert result['charts']['pending_by_priority'] == {'Alta': 1}
+    assert result['tables']['corrective_pending']['total'] == 1
+    assert result['alerts']['summary'] == {'Vencida': 1, 'Alerta': 1, 'Normal': 1}
+
+def test_filters_use_the_first_vehicle_with_the_plate():
+    result = aggregate({'garage': 'Centro'})
+
+    assert result['metrics']['total_services'] == 2
+    assert result['facets']['garage'] == ['Centro', 'Norte']
+
+def test_aggregate_is_json_serializable():
+    json.dumps(aggregate())
+
+def test_aggregate_works_without_the_shared_cache(make_connector, upstream):
+    upstream.routes.update({'/checklist': {'data': ORDERS}, '/vehicles': {'data': VEHICLES}})
+    engine = FleetMaintenanceEngine(make_connector())
+
+    assert engine.cache is None
+    assert engine.aggregate('E1')['metrics']['total_services'] == aggregate()['metrics']['total_services']
+
+@pytest.mark.parametrize('local_store', [False, True])
+def test_orders_and_checklist_read_the_same_response_shape(make_connector, upstream, local_store):
+    upstream.routes['/checklist'] = [dict(order, id=str(order['osNumber'])) for order in ORDERS]
+    connector = make_connector(local_store=local_store, sync_interval=0)
+
+    orders = FleetMaintenanceEngine(connector).load_sources('E1')['orders']
+
+    assert orders['osNumber'].tolist() == [1, 2, 3, 4]
+    assert len(connector.get_checklist_data('E1')) == len(ORDERS)
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from src.fleet_data_connector import (CHECKLIST_SCHEMA, add_compliance_column, clean_string_series,
+                                      coerce_bool_series, normalize_frame, safe_bool, safe_string)
+
+MIXED_BOOLS = [True, False, 'true', 'false', 'Sim', 'yes', '1', '0', 1, 0, 2.5, None, '']
+
+def test_coerce_bool_series_matches_safe_bool():
+    coerced = coerce_bool_series(pd.Series(MIXED_BOOLS, dtype=object))
+
+    for value, result in zip(MIXED_BOOLS, coerced):
+        if value is None:
+            assert result is pd.NA
+        else:
+            assert bool(result) == safe_bool(value), value
+
+def test_clean_string_series_matches_safe_string():
+    values = ['  ABC1234 ', '', '   ', None, 'Ana']
+
+    cleaned = clean_string_series(pd.Series(values, dtype=object))
+
+    assert [None if pd.isna(v) else v for v in cleaned] == [
+        safe_string(v, '').strip() or None for v in values]
+
+def test_normalize_frame_applies_the_checklist_schema():
+    df = pd.DataFrame({
+        'timestamp': ['2025-01-02T10:00:00', 'inválido'],
+        'noCompliant': ['true', None],
+        'vehiclePlate': [' ABC1234 ', ''],
+        'extra': [1, 2]
+    })
+
+    df = normalize_frame(df, CHECKLIST_SCHEMA)
+
+    assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+    assert df['timestamp'].isna().tolist() == [False, True]
+    assert str(df['noCompliant'].dtype) == 'boolean'
+    assert isinstance(df['vehiclePlate'].dtype, pd.CategoricalDtype)
+    assert df['vehiclePlate'].tolist()[0] == 'ABC1234' and pd.isna(df['vehiclePlate'].tolist()[1])
+    assert df['extra'].tolist() == [1, 2]
+
+def test_no_compliant_takes_precedence_over_compliant():
+    df = pd.DataFrame({
+        'noCompliant': pd.array([True, False, None], dtype='boolean'),
+        'compliant': pd.array([True, False, False], dtype='boolean')
+    })
+
+    assert add_compliance_column(df)['is_compliant'].tolist() == [False, True, True]
+
+def test_compliant_is_used_without_no_compliant():
+    df = pd.DataFrame({'compliant': pd.array([True, False, None], dtype='boolean')})
+
+    assert add_compliance_column(df)['is_compliant'].tolist() == [True, False, True]
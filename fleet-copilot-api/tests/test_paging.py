@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from src.fleet_paging import PageError, PageRequest, decode_cursor, encode_cursor, page_records
+
+def walk(frame, **request):
+    """Percorre todas as páginas seguindo next_cursor"""
+    seen, cursor = [], None
+    while True:
+        result = page_records(frame, PageRequest(cursor=cursor, **request))
+        seen.extend(result['items'])
+        cursor = result['pagination']['next_cursor']
+        if not cursor:
+            return seen
+
+FRAME = pd.DataFrame({
+    'id': [f'doc-{i:02d}' for i in range(11)],
+    'score': [5, 3, None, 5, 1, 9, 3, None, 7, 5, 2],
+    'plate': list('KJIHGFEDCBA')
+})
+
+def test_cursor_round_trip():
+    payload = {'sort': 'score', 'order': 'desc', 'value': 5.0, 'id': 'doc-03'}
+
+    assert decode_cursor(encode_cursor(payload)) == payload
+
+@pytest.mark.parametrize('cursor', ['%%%', encode_cursor({'sort': None})[:-2], 'W10'])
+def test_corrupted_cursor_is_rejected(cursor):
+    with pytest.raises(PageError):
+        decode_cursor(cursor)
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_walking_the_cursor_visits_every_row_once_in_order(order):
+    rows = walk(FRAME, limit=3, sort='score', order=order)
+
+    assert sorted(row['id'] for row in rows) == FRAME['id'].tolist()
+    scores = [row['score'] for row in rows]
+    known = [score for score in scores if score is not None]
+    assert known == sorted(known, reverse=order == 'desc')
+    assert scores[-2:] == [None, None]
+
+def test_cursor_continues_after_earlier_rows_are_removed():
+    first = page_records(FRAME, PageRequest(limit=4, sort='plate'))
+
+    shrunk = FRAME[~FRAME['id'].isin([row['id'] for row in first['items']][:2])]
+    second = page_records(shrunk, PageRequest(limit=4, sort='plate', cursor=first['pagination']['next_cursor']))
+
+    assert [row['plate'] for row in second['items']] == ['E', 'F', 'G', 'H']
+
+def test_cursor_must_match_the_requested_sort():
+    first = page_records(FRAME, PageRequest(limit=2, sort='score'))
+
+    with pytest.raises(PageError):
+        page_records(FRAME, PageRequest(limit=2, sort='plate', cursor=first['pagination']['next_cursor']))
+
+def test_fields_are_projected():
+    result = page_records(FRAME, PageRequest(limit=2, fields=['plate', 'missing']))
+
+    assert result['items'] == [{'plate': 'K'}, {'plate': 'J'}]
+
+def test_query_string_parsing():
+    request = PageRequest.from_args({'limit': '10', 'sort': '-timestamp', 'fields': 'a, b,'})
+
+    assert (request.limit, request.sort, request.order, request.fields) == (10, 'timestamp', 'desc', ['a', 'b'])
+    with pytest.raises(PageError):
+        PageRequest.from_args({'limit': '0'})
+    with pytest.raises(PageError):
+        PageRequest.from_args({'order': 'up'})
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from src.fleet_data_connector import FleetDataProcessor, run_parallel
+from src.fleet_insights import FleetInsightsEngine
+from src.fleet_render import configure_style, render_chart_job
+from src.fleet_reports import FleetReportGenerator
+from src.fleet_visualization import FleetVisualizationEngine
+
+class InlineRenderPool:
+    """Renderiza no próprio processo (o pool de processos não é o foco aqui)"""
+    timeout = 60
+
+    def submit(self, chart, data, colors, profile):
+        configure_style()
+        future = Future()
+        future.set_result(render_chart_job(chart, data, colors, profile))
+        return future
+
+def test_run_parallel_returns_results_by_key_and_overlaps_tasks():
+    started = time.perf_counter()
+
+    results = run_parallel({'a': lambda: time.sleep(0.2) or 1, 'b': lambda: time.sleep(0.2) or 2})
+
+    assert results == {'a': 1, 'b': 2}
+    assert time.perf_counter() - started < 0.35
+
+def test_run_parallel_propagates_errors():
+    def boom():
+        raise RuntimeError('falhou')
+
+    with pytest.raises(RuntimeError):
+        run_parallel({'ok': lambda: 1, 'boom': boom})
+
+def test_fetch_many_returns_empty_frames_for_failed_collections(make_connector, upstream):
+    upstream.routes['/alerts-checkin'] = lambda params: (_ for _ in ()).throw(KeyError('x'))
+
+    frames = make_connector().fetch_many({'checklist': 'checklist', 'alerts': 'alerts_checkin'},
+                                         enterprise_id='E1')
+
+    assert not frames['checklist'].empty
+    assert frames['alerts'].empty
+
+def test_comprehensive_report_loads_the_checklist_once(make_connector, upstream, tmp_path):
+    processor = FleetDataProcessor(make_connector())
+    generator = FleetReportGenerator(processor,
+                                     FleetVisualizationEngine(processor, render_pool=InlineRenderPool()),
+                                     FleetInsightsEngine(processor), output_dir=str(tmp_path))
+
+    files = generator.generate_comprehensive_report('E1', 30, 'excel')
+
+    assert upstream.count('/checklist') == 1
+    assert upstream.count('/alerts-checkin') == 1
+    assert (tmp_path / files['excel'].split('/')[-1]).exists()
+
+def test_report_without_the_pdf_converter_is_published_as_markdown(make_connector, upstream, tmp_path):
+    processor = FleetDataProcessor(make_connector())
+    generator = FleetReportGenerator(processor,
+                                     FleetVisualizationEngine(processor, render_pool=InlineRenderPool()),
+                                     FleetInsightsEngine(processor), output_dir=str(tmp_path))
+    generator.pdf_converter = 'conversor-inexistente'
+
+    files = generator.generate_comprehensive_report('E1', 30, 'pdf')
+
+    assert list(files) == ['md']
+    assert files['md'].endswith('.md')
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.fleet_data_connector import FleetDataProcessor
+
+def record(i, plate, driver, item, failed, hours_ago=1):
+    return {'id': f'c{i}', 'timestamp': (datetime.now() - timedelta(hours=hours_ago)).isoformat(),
+            'vehiclePlate': plate, 'driverName': driver, 'itemName': item,
+            'noCompliant': failed, 'compliant': not failed}
+
+@pytest.fixture
+def processor(make_connector, upstream):
+    upstream.routes['/checklist'] = [
+        record(1, 'AAA0001', 'Ana', 'Pneu', False, hours_ago=5),
+        record(2, 'AAA0001', 'Ana', 'Pneu', True, hours_ago=3),
+        record(3, 'AAA0001', 'Bruno', 'Freio', False, hours_ago=2),
+        record(4, 'BBB0002', 'Bruno', 'Luz', False, hours_ago=4),
+        record(5, None, 'Carla', 'Luz', True),
+        record(6, 'N/A', None, 'Luz', True),
+    ]
+    return FleetDataProcessor(make_connector())
+
+def test_vehicle_performance_aggregates_per_plate(processor):
+    vehicles = {v['vehicle_plate']: v for v in processor.get_vehicle_performance('E1', 7)}
+
+    assert set(vehicles) == {'AAA0001', 'BBB0002'}
+    assert vehicles['AAA0001']['total_checks'] == 3
+    assert vehicles['AAA0001']['compliance_rate'] == pytest.approx(66.67)
+    assert vehicles['AAA0001']['top_items'] == [{'item': 'Pneu', 'count': 2}, {'item': 'Freio', 'count': 1}]
+    assert vehicles['BBB0002']['compliance_rate'] == 100.0
+
+def test_vehicle_performance_is_sorted_by_compliance(processor):
+    rates = [v['compliance_rate'] for v in processor.get_vehicle_performance('E1', 7)]
+
+    assert rates == sorted(rates, reverse=True)
+
+def test_driver_performance_counts_distinct_vehicles(processor):
+    drivers = {d['driver_name']: d for d in processor.get_driver_performance('E1', 7)}
+
+    assert drivers['Bruno']['vehicles_operated'] == 2
+    assert drivers['Bruno']['total_checks'] == 2
+    assert drivers['Carla']['vehicles_operated'] == 0
+    assert drivers['Ana']['last_activity'] is not None
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+def test_rolling_window_is_sent_aligned_to_the_day(make_connector, upstream):
+    start = datetime.now() - timedelta(days=7)
+    end = datetime.now()
+
+    make_connector().get_checklist_data('E1', start.isoformat(), end.isoformat())
+
+    params = upstream.calls[-1][1]
+    assert params['enterpriseId'] == 'E1'
+    assert pd.to_datetime(params['startDate']) == pd.Timestamp(start).floor('D')
+    assert 'endDate' not in params
+    assert params['days'] == (datetime.now() - pd.Timestamp(start).floor('D')).days + 1
+
+def test_closed_window_is_sent_rounded_to_the_minute(make_connector, upstream):
+    start = datetime.now() - timedelta(days=30)
+    end = datetime.now() - timedelta(days=20)
+
+    make_connector().get_checklist_data('E1', start.isoformat(), end.isoformat())
+
+    params = upstream.calls[-1][1]
+    assert pd.to_datetime(params['startDate']) == pd.Timestamp(start).floor('min')
+    assert pd.to_datetime(params['endDate']) == pd.Timestamp(end).ceil('min')
+
+def test_pushdown_can_be_disabled(make_connector, upstream):
+    make_connector(pushdown_filters=False).get_checklist_data(
+        'E1', (datetime.now() - timedelta(days=7)).isoformat())
+
+    assert upstream.calls[-1][1] == {'enterpriseId': 'E1'}
+
+def test_window_is_enforced_when_the_server_ignores_it(make_connector):
+    start = datetime.now() - timedelta(days=5)
+
+    df = make_connector().get_checklist_data('E1', start.isoformat())
+
+    assert not df.empty
+    assert (df['timestamp'] >= start).all()
+
+def test_invalid_dates_fall_back_to_no_pushdown(make_connector):
+    params = make_connector()._build_query_params('E1', 'não é data')
+
+    assert params == {'enterpriseId': 'E1'}
@@ -0,0 +1,41 @@
+import base64
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.fleet_render import ChartRenderPool
+
+DATA = {'message': 'Sem dados'}
+COLORS = {'info': '#5D737E'}
+
+def is_png(output):
+    return base64.b64decode(output).startswith(b'\x89PNG')
+
+def test_charts_render_in_a_separate_process():
+    pool = ChartRenderPool(max_workers=1, timeout=120)
+    try:
+        assert is_png(pool.render('no_data', DATA, COLORS, 'screen'))
+        assert pool._pid is not None
+    finally:
+        pool.shutdown()
+
+def test_falls_back_to_rendering_in_process_when_the_pool_is_broken(monkeypatch):
+    pool = ChartRenderPool(max_workers=1)
+
+    def broken():
+        raise BrokenProcessPool('processo morreu')
+    monkeypatch.setattr(pool, '_get_executor', broken)
+
+    assert is_png(pool.submit('no_data', DATA, COLORS, 'screen').result())
+
+def test_in_process_render_errors_reach_the_future(monkeypatch):
+    pool = ChartRenderPool(max_workers=1)
+    monkeypatch.setattr(pool, '_get_executor', lambda: (_ for _ in ()).throw(OSError('sem processos')))
+
+    future = pool.submit('checklist_summary', {}, COLORS, 'screen')
+
+    assert isinstance(future.exception(), KeyError)
+
+def test_unknown_chart_is_rejected_before_scheduling():
+    with pytest.raises(ValueError):
+        ChartRenderPool(max_workers=1).submit('pizza', DATA, COLORS, 'screen')
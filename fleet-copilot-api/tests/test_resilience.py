@@ -0,0 +1,64 @@
+import pytest
+import requests
+
+from src.fleet_resilience import CircuitBreaker, RetryPolicy, is_retryable
+
+from conftest import FakeResponse
+
+def http_error(status):
+    return requests.exceptions.HTTPError(response=FakeResponse(status_code=status))
+
+def test_only_transient_errors_are_retryable():
+    assert is_retryable(requests.exceptions.ConnectionError())
+    assert is_retryable(http_error(503))
+    assert is_retryable(http_error(429))
+    assert not is_retryable(http_error(404))
+
+def test_retry_after_header_bounds_the_delay():
+    error = requests.exceptions.HTTPError(response=FakeResponse(status_code=429, headers={'Retry-After': '2'}))
+
+    assert RetryPolicy(backoff_max=8).delay(0, error) == 2
+    assert RetryPolicy(backoff_max=1).delay(0, error) == 1
+    assert 0 <= RetryPolicy(backoff_base=0.5, backoff_max=8).delay(3) <= 4
+
+def test_breaker_opens_then_lets_a_single_probe_through():
+    breaker = CircuitBreaker('/checklist', failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.parametrize('probe', [
+    FakeResponse(status_code=404),
+    KeyError('resposta inesperada'),
+])
+def test_probe_that_ends_without_a_transient_failure_does_not_wedge_the_breaker(make_connector, upstream,
+                                                                               probe):
+    connector = make_connector(max_retries=1, breaker_failure_threshold=1, breaker_reset_timeout=0)
+    breaker = connector.breakers.get('/checklist')
+    upstream.routes['/checklist'] = requests.exceptions.ConnectionError('offline')
+    connector.get_checklist_data('E1')
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    upstream.routes['/checklist'] = probe
+    try:
+        connector.get_checklist_data('E1')
+    except KeyError:
+        pass
+
+    assert breaker.allow_request()
+
+def test_open_breaker_skips_the_upstream(make_connector, upstream):
+    connector = make_connector(max_retries=1, breaker_failure_threshold=1, breaker_reset_timeout=60)
+    upstream.routes['/checklist'] = requests.exceptions.ConnectionError('offline')
+
+    connector.get_checklist_data('E1')
+    connector.get_checklist_data('E1')
+
+    assert upstream.count('/checklist') == 1
+    assert connector.breakers.get('/checklist').stats()['rejected'] == 1
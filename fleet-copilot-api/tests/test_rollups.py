@@ -0,0 +1,61 @@
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+
+from src.fleet_rollups import FleetRollupStore, checklist_rollup, to_day
+
+def whole_days(days_back: int, days_to: int = 1):
+    """Janela de dias inteiros: da meia-noite de days_back dias atrás ao fim de days_to dias atrás"""
+    today = datetime.now().date()
+    start = datetime.combine(today - timedelta(days=days_back), time.min)
+    end = datetime.combine(today - timedelta(days=days_to), time.max)
+    return start.isoformat(), end.isoformat()
+
+def frame_totals(frame: pd.DataFrame):
+    failures = frame.loc[~frame['is_compliant'].astype(bool), 'itemName'].astype(str).value_counts()
+    return {
+        'total': len(frame),
+        'compliant': int(frame['is_compliant'].sum()),
+        'vehicles': int(frame['vehiclePlate'].dropna().nunique()),
+        'drivers': int(frame['driverName'].dropna().nunique()),
+    }, failures.to_dict()
+
+def test_rollup_totals_match_the_frame_over_whole_days(make_connector, upstream):
+    start, end = whole_days(12, 2)
+    stored = make_connector(local_store=True, sync_interval=0)
+    raw = make_connector()
+
+    rollup = stored.get_checklist_rollup('E1', start, end)
+    totals, failures = frame_totals(raw.get_checklist_data('E1', start, end))
+
+    summary = rollup.summary()
+    assert {key: summary[key] for key in totals} == totals
+    assert summary['non_compliant'] == totals['total'] - totals['compliant']
+    assert rollup.item_failures()[rollup.item_failures() > 0].to_dict() == failures
+    assert stored.rollups is not None and raw.rollups is None
+
+def test_stored_and_frame_rollups_use_the_same_day_aligned_window(make_connector, upstream):
+    start = (datetime.now() - timedelta(days=9, hours=5)).isoformat()
+    end = (datetime.now() - timedelta(days=2, hours=7)).isoformat()
+    stored = make_connector(local_store=True, sync_interval=0)
+    raw = make_connector()
+
+    from_store = stored.get_checklist_rollup('E1', start, end)
+    from_frame = raw.get_checklist_rollup('E1', start, end)
+
+    assert from_store.summary() == from_frame.summary()
+    assert from_store.item_failures().to_dict() == from_frame.item_failures().to_dict()
+    assert from_frame.days['day'].min() == to_day(start) and from_frame.days['day'].max() == to_day(end)
+
+def test_incremental_updates_match_a_full_rebuild(tmp_path, upstream):
+    records = pd.DataFrame(upstream.routes['/checklist'])
+    records['timestamp'] = pd.to_datetime(records['timestamp'])
+    records['is_compliant'] = ~records['noCompliant']
+    store = FleetRollupStore(str(tmp_path / 'rollups.sqlite3'))
+    days = sorted(records['timestamp'].dt.strftime('%Y-%m-%d').unique())
+
+    for day in days:
+        store.replace('E1', checklist_rollup(records[records['timestamp'].dt.strftime('%Y-%m-%d') == day]), [day])
+    store.replace('E1', checklist_rollup(records), days[:3])
+
+    assert store.read('E1').summary() == checklist_rollup(records).summary()
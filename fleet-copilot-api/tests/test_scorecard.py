@@ -0,0 +1,63 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from src.fleet_scorecard import FleetScorecardEngine, first_truthy, parse_trip_dates
+
+def trip(user, days_ago=1, score=80, distance=10.0, **events):
+    timestamp = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return {'UserString': user, 'TimeStamp': int(timestamp.timestamp() * 1000), 'TripDistance': distance,
+            'score': score, **events}
+
+def test_first_truthy_mirrors_javascript_or():
+    a = pd.Series([0, None, 3, '0'])
+    b = pd.Series([5, 6, 7, None])
+
+    assert first_truthy(a, b).tolist() == [5, 6, 3, 0]
+
+def test_trip_dates_accept_epoch_milliseconds_and_iso_text():
+    trips = pd.DataFrame({'TimeStamp': [1735732800000, None],
+                          'TimestampDate': [None, '2025-01-01T12:00:00Z']})
+
+    dates = parse_trip_dates(trips)
+
+    assert dates.tolist() == [pd.Timestamp('2025-01-01T12:00:00Z')] * 2
+
+def test_accident_chance_adds_critical_incidents_per_trip():
+    trips = pd.DataFrame([
+        trip('driver-a', score=90, AmountOfSmartphoneUsageEvents=2),
+        trip('driver-a', score=70),
+        trip('driver-b', score=95),
+    ])
+
+    drivers = FleetScorecardEngine(None).score_drivers(trips, {'driver-a': 'Ana'})
+
+    first = drivers.iloc[0]
+    assert first['driverName'] == 'Ana'
+    assert first['totalTrips'] == 2
+    assert first['accidentChance'] == 100 - 80 + 2 / 2 * 15
+    assert drivers.iloc[1]['driverName'] == 'Motorista driver-b...'
+
+def test_days_filter_drops_old_trips():
+    trips = pd.DataFrame([trip('driver-a', days_ago=1), trip('driver-a', days_ago=40)])
+
+    drivers = FleetScorecardEngine(None).score_drivers(trips, days=30)
+
+    assert drivers['totalTrips'].tolist() == [1]
+
+def test_scorecard_is_json_serializable_and_paginated():
+    trips = pd.DataFrame([trip(f'driver-{i}', score=50 + i) for i in range(5)])
+
+    scorecard = FleetScorecardEngine(None).build_scorecard(trips, per_page=2, page=3)
+
+    json.dumps(scorecard)
+    assert scorecard['metrics']['total_drivers'] == 5
+    assert scorecard['pagination'] == {'page': 3, 'per_page': 2, 'total': 5, 'pages': 3}
+    assert [row['userString'] for row in scorecard['drivers']] == ['driver-4']
+
+def test_empty_trips_give_an_empty_scorecard():
+    scorecard = FleetScorecardEngine(None).build_scorecard(pd.DataFrame())
+
+    assert scorecard['metrics']['total_drivers'] == 0
+    assert scorecard['drivers'] == []
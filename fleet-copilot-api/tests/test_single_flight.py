@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.fleet_cache import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'rows': 10}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, 'k', fetch) for _ in range(5)]
+        while flight.deduplicated < 4:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('upstream')
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(flight.do, 'k', failing) for _ in range(3)]
+        while flight.deduplicated < 2:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+
+def test_key_is_released_after_the_call():
+    flight = SingleFlight()
+
+    assert flight.do('k', lambda: 1) == 1
+    assert flight.do('k', lambda: 2) == 2
+    assert flight.deduplicated == 0
+
+def test_concurrent_identical_fetches_hit_upstream_once(make_connector, upstream):
+    connector = make_connector()
+    start = (datetime.now() - timedelta(days=7)).isoformat()
+    records = upstream.routes['/checklist']
+    release = threading.Event()
+
+    def slow(params):
+        release.wait(5)
+        return records
+    upstream.routes['/checklist'] = slow
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(connector.get_checklist_data, 'E1', start) for _ in range(4)]
+        while connector._inflight.deduplicated < 3:
+            time.sleep(0.01)
+        release.set()
+        frames = [future.result() for future in futures]
+
+    assert upstream.count('/checklist') == 1
+    assert len({len(frame) for frame in frames}) == 1
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from src.fleet_data_connector import FleetDataProcessor, FleetDataSnapshot
+from src.fleet_insights import FleetInsightsEngine
+
+def test_comprehensive_analysis_fetches_each_collection_once(make_connector, upstream):
+    engine = FleetInsightsEngine(FleetDataProcessor(make_connector()))
+
+    engine.generate_comprehensive_analysis('E1', 30)
+
+    assert upstream.count('/checklist') == 1
+    assert upstream.count('/alerts-checkin') == 1
+
+def test_narrower_window_is_cut_from_the_snapshot_frame(make_connector, upstream):
+    snapshot = FleetDataSnapshot(make_connector(), 'E1', days=30)
+    full = snapshot.get_checklist_data()
+
+    start = datetime.now() - timedelta(days=7)
+    recent = snapshot.get_checklist_data(start_date=start.isoformat())
+
+    assert upstream.count('/checklist') == 1
+    assert 0 < len(recent) < len(full)
+    assert (recent['timestamp'] >= start).all()
+
+def test_snapshot_frames_are_isolated_copies(make_connector):
+    snapshot = FleetDataSnapshot(make_connector(), 'E1', days=30)
+
+    first = snapshot.get_checklist_data()
+    first['vehiclePlate'] = 'ALTERADO'
+
+    assert (snapshot.get_checklist_data()['vehiclePlate'] != 'ALTERADO').any()
+
+def test_other_enterprise_goes_to_the_connector(make_connector, upstream):
+    snapshot = FleetDataSnapshot(make_connector(), 'E1', days=30)
+    snapshot.get_checklist_data()
+
+    snapshot.get_checklist_data(enterprise_id='E2')
+
+    assert [params.get('enterpriseId') for path, params in upstream.calls if path == '/checklist'] == ['E1', 'E2']
@@ -0,0 +1,80 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src import fleet_stream
+from src.fleet_stream import iter_json_array, records_to_frame, select_records
+
+from conftest import FakeResponse
+
+def chunked(data, size):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+RECORDS = [
+    {'id': 1, 'driverName': 'João', 'value': 12.5, 'location': {'latitude': -23.5, 'longitude': -46.6}},
+    {'id': 2, 'driverName': 'Márcia', 'value': -3e10, 'location': None},
+    {'id': 3, 'driverName': 'Zé', 'value': 7, 'nested': [1, {'a': '],'}]},
+]
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 4096])
+def test_array_is_decoded_item_by_item_across_any_chunk_boundary(size):
+    assert list(iter_json_array(chunked(RECORDS, size))) == RECORDS
+
+def test_non_array_body_is_decoded_whole():
+    assert list(iter_json_array(chunked({'data': RECORDS}, 5))) == [{'data': RECORDS}]
+
+@pytest.mark.parametrize('size', [1, 3, 7, 4096])
+def test_array_under_keys_is_decoded_item_by_item(size):
+    body = {'meta': {'total': 3, 'tags': ['a', '}']}, 'count': 12.5, 'data': RECORDS, 'after': 1}
+
+    assert list(iter_json_array(chunked(body, size), ['data'])) == RECORDS
+    assert list(iter_json_array(chunked({'page': {'data': RECORDS}}, size), ['page', 'data'])) == RECORDS
+
+def test_missing_or_non_array_path_yields_nothing():
+    assert list(iter_json_array(chunked({'other': RECORDS}, 5), ['data'])) == []
+    assert list(iter_json_array(chunked({'data': {'id': 1}}, 5), ['data'])) == []
+    assert list(iter_json_array(chunked(RECORDS, 5), ['data'])) == []
+
+def test_truncated_array_raises():
+    body = json.dumps(RECORDS).encode()[:-10]
+
+    with pytest.raises(ValueError):
+        list(iter_json_array([body]))
+
+def test_select_records_follows_the_record_path():
+    assert list(select_records({'data': RECORDS}, 'data.item')) == RECORDS
+    assert list(select_records(RECORDS, 'item')) == RECORDS
+    assert list(select_records({'other': []}, 'data.item')) == []
+
+def test_records_to_frame_projects_columns_and_flattens_nested_fields():
+    df = records_to_frame(RECORDS, ['id', 'location.latitude', 'missing'], chunk_size=2)
+
+    assert list(df.columns) == ['id', 'location.latitude']
+    assert df['id'].tolist() == [1, 2, 3]
+    assert df['location.latitude'].iloc[0] == -23.5
+    assert df['location.latitude'].iloc[1:].isna().all()
+
+def test_flattened_records_from_the_cache_keep_their_values():
+    cached = [{'id': 1, 'location.latitude': -10.0}]
+
+    df = records_to_frame(cached, ['id', 'location.latitude'])
+
+    assert df['location.latitude'].tolist() == [-10.0]
+
+def test_connector_streams_wrapped_responses_without_ijson(make_connector, upstream, monkeypatch):
+    monkeypatch.setattr(fleet_stream, 'ijson', None)
+    upstream.routes['/vehicles'] = FakeResponse({'data': RECORDS})
+
+    df = make_connector().get_collection_data('/vehicles', 'E1', columns=['id', 'driverName'],
+                                              record_path='data.item')
+
+    assert df.to_dict('records') == [{'id': r['id'], 'driverName': r['driverName']} for r in RECORDS]
+
+def test_wrapped_responses_are_not_loaded_whole_without_ijson(monkeypatch):
+    monkeypatch.setattr(fleet_stream, 'ijson', None)
+    # Só iter_content: ler response.content falharia
+    response = SimpleNamespace(iter_content=lambda chunk_size: iter(chunked({'data': RECORDS}, chunk_size)))
+
+    assert list(fleet_stream.iter_response_records(response, 'data.item', chunk_size=4)) == RECORDS
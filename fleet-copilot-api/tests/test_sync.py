@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+import requests
+
+from src import fleet_stream
+from src.fleet_sync import FleetDeltaSync, FleetLocalStore
+
+from conftest import FakeResponse
+
+def test_first_sync_asks_for_the_initial_window(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=0, sync_initial_days=30)
+
+    connector.delta_sync.sync('/checklist', 'E1')
+
+    expected = pd.Timestamp(datetime.utcnow() - timedelta(days=30))
+    assert abs(pd.to_datetime(upstream.calls[-1][1]['startDate']) - expected) < timedelta(minutes=2)
+
+def test_first_sync_is_full_and_later_syncs_ask_for_the_delta(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=0, sync_initial_days=None)
+    sync = connector.delta_sync
+
+    sync.sync('/checklist', 'E1')
+    high_water_mark = sync.store.get_state('/checklist', 'E1')['high_water_mark']
+    sync.sync('/checklist', 'E1')
+
+    first, second = [params for path, params in upstream.calls if path == '/checklist']
+    assert 'startDate' not in first
+    expected = pd.Timestamp(datetime.fromisoformat(high_water_mark) - sync.overlap).floor('min')
+    assert pd.to_datetime(second['startDate']) == expected
+
+def test_resyncing_the_same_records_does_not_duplicate_them(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=0)
+
+    connector.delta_sync.sync('/checklist', 'E1', force=True)
+    connector.delta_sync.sync('/checklist', 'E1', force=True)
+
+    assert len(connector.delta_sync.store.read('/checklist', 'E1')) == len(upstream.routes['/checklist'])
+
+def test_min_interval_skips_recent_syncs(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=3600)
+
+    connector.delta_sync.sync('/checklist', 'E1')
+    assert connector.delta_sync.sync('/checklist', 'E1') == 0
+
+    assert upstream.count('/checklist') == 1
+
+def test_reads_come_from_the_local_store_within_the_window(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=3600)
+    start = datetime.now() - timedelta(days=3)
+
+    connector.get_checklist_data('E1', (datetime.now() - timedelta(days=10)).isoformat())
+    recent = connector.get_checklist_data('E1', start.isoformat())
+
+    assert upstream.count('/checklist') == 1
+    assert 0 < len(recent) < len(upstream.routes['/checklist'])
+
+def test_high_water_mark_never_moves_back(tmp_path):
+    store = FleetLocalStore(str(tmp_path / 'store.sqlite3'))
+
+    store.set_state('/checklist', 'E1', '2025-02-01T00:00:00.000000')
+    store.set_state('/checklist', 'E1', '2025-01-01T00:00:00.000000')
+
+    assert store.get_state('/checklist', 'E1')['high_water_mark'] == '2025-02-01T00:00:00.000000'
+
+def test_listeners_receive_the_synced_days(make_connector, upstream):
+    upstream.routes['/checklist'] = [
+        {'id': '1', 'timestamp': '2025-03-01T10:00:00'},
+        {'id': '2', 'timestamp': '2025-03-03T08:00:00'},
+    ]
+    connector = make_connector()
+    sync = FleetDeltaSync(connector, FleetLocalStore(connector.config.local_store_path), min_interval=0)
+    received = []
+    sync.add_listener('/checklist', lambda enterprise_id, days: received.append((enterprise_id, days)))
+
+    sync.sync('/checklist', 'E1')
+
+    assert received == [('E1', ['2025-03-01', '2025-03-03'])]
+
+def test_sync_streams_the_response_in_batches(make_connector, upstream, monkeypatch):
+    monkeypatch.setattr(fleet_stream, 'ijson', None)
+    response = FakeResponse({'data': upstream.routes['/checklist']})
+    response.json = lambda: pytest.fail('corpo lido inteiro')
+    upstream.routes['/checklist'] = response
+    connector = make_connector()
+    sync = FleetDeltaSync(connector, FleetLocalStore(connector.config.local_store_path), batch_size=7)
+    batches = []
+    upsert = sync.store.upsert
+    monkeypatch.setattr(sync.store, 'upsert', lambda *args: batches.append(len(args[2])) or upsert(*args))
+
+    assert sync.sync('/checklist', 'E1') == 400
+    assert max(batches) == 7
+    assert len(sync.store.read('/checklist', 'E1')) == sum(batches) == 400
+
+def test_failed_sync_keeps_the_store_and_retries(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=3600)
+    connector.delta_sync.sync('/checklist', 'E1')
+    upstream.routes['/checklist'] = requests.exceptions.ConnectionError('offline')
+
+    assert connector.delta_sync.sync('/checklist', 'E1', force=True) == 0
+    assert len(connector.delta_sync.store.read('/checklist', 'E1')) == 400
+
+def test_retention_prunes_old_days_and_older_windows_go_to_the_api(make_connector, upstream):
+    connector = make_connector(local_store=True, sync_interval=3600, store_retention_days=5)
+    start = datetime.now() - timedelta(days=3)
+
+    recent = connector.get_checklist_data('E1', start.isoformat())
+    stored = connector.delta_sync.store.read('/checklist', 'E1')
+    older = connector.get_checklist_data('E1', (datetime.now() - timedelta(days=15)).isoformat())
+
+    cutoff = (datetime.utcnow() - timedelta(days=5)).strftime('%Y-%m-%d')
+    assert min(pd.to_datetime([r['timestamp'] for r in stored])).strftime('%Y-%m-%d') >= cutoff
+    assert 0 < len(stored) < len(upstream.routes['/checklist'])
+    assert upstream.count('/checklist') == 2
+    assert len(older) > len(recent) > 0
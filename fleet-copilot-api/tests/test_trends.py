@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fleet_rollups import ChecklistRollup
+from src.fleet_trends import (FleetTrendEngine, entity_records, linear_forecast, seasonal_forecast,
+                              week_label, weekly_compliance)
+
+def rollup_from(daily, entities=()):
+    """Rollup a partir de {dia: (total, conformes)} e linhas (dia, tipo, nome, total, conformes)"""
+    days = pd.DataFrame([(day, total, compliant, total - compliant, 1, 1)
+                         for day, (total, compliant) in daily.items()],
+                        columns=['day', 'total', 'compliant', 'non_compliant', 'vehicles', 'drivers'])
+    return ChecklistRollup(days=days,
+                           entities=pd.DataFrame(list(entities), columns=['day', 'kind', 'name', 'total', 'compliant']))
+
+def test_week_keys_follow_the_iso_year_across_new_year():
+    rollup = rollup_from({
+        '2024-12-24': (10, 9),   # 2024-W52
+        '2024-12-31': (10, 8),   # terça da 2025-W01
+        '2025-01-02': (10, 7),   # 2025-W01
+        '2025-01-15': (10, 6),   # 2025-W03, com a W02 vazia
+    })
+
+    weekly = weekly_compliance(rollup)
+
+    assert weekly['week'].tolist() == ['2024-W52', '2025-W01', '2025-W02', '2025-W03']
+    assert weekly['total'].tolist() == [10, 20, 0, 10]
+    assert weekly['compliance_rate'].iloc[1] == 75.0
+    assert np.isnan(weekly['compliance_rate'].iloc[2])
+    assert weekly['rolling_rate'].iloc[-1] == 30 / 40 * 100
+
+def test_week_53_is_kept_apart_from_week_1():
+    assert week_label(2020, 53) == '2020-W53'
+    weekly = weekly_compliance(rollup_from({'2020-12-31': (4, 4), '2021-01-04': (4, 2)}))
+
+    assert weekly['week'].tolist() == ['2020-W53', '2021-W01']
+
+def test_linear_forecast_on_a_perfect_line_has_no_band():
+    forecast = linear_forecast(pd.Series([60.0, 62.0, 64.0, 66.0]))
+
+    assert forecast['method'] == 'linear'
+    assert forecast['value'] == forecast['lower'] == forecast['upper'] == 68.0
+    assert forecast['slope'] == 2.0
+
+def test_linear_forecast_band_contains_the_value_and_widens_with_the_horizon():
+    series = pd.Series([70.0, 74.0, 69.0, np.nan, 77.0, 73.0, 79.0])
+
+    near = linear_forecast(series, horizon=1)
+    far = linear_forecast(series, horizon=6)
+
+    assert near['lower'] < near['value'] < near['upper']
+    assert far['upper'] - far['lower'] > near['upper'] - near['lower']
+
+def test_linear_forecast_is_bounded_to_percentages_and_falls_back_to_the_mean():
+    assert linear_forecast(pd.Series([90.0, 95.0, 99.0, 100.0]), horizon=5)['upper'] == 100.0
+    short = linear_forecast(pd.Series([80.0, np.nan, 90.0]))
+    assert (short['method'], short['value']) == ('mean', 85.0)
+    assert linear_forecast(pd.Series([np.nan])) == {}
+
+def test_seasonal_forecast_repeats_the_weekday_pattern():
+    days = pd.date_range('2025-03-03', periods=28, freq='D')
+    rollup = rollup_from({day.strftime('%Y-%m-%d'): (10, 6 if day.weekday() >= 5 else 9) for day in days})
+
+    forecast = seasonal_forecast(rollup, horizon=7)
+
+    by_date = {pd.Timestamp(item['date']).weekday(): item['value'] for item in forecast}
+    assert forecast[0]['date'] == '2025-03-31'
+    assert by_date[5] == pytest.approx(60.0, abs=0.5) and by_date[0] == pytest.approx(90.0, abs=0.5)
+    assert all(item['lower'] <= item['value'] <= item['upper'] for item in forecast)
+
+def test_seasonal_forecast_needs_two_cycles():
+    days = pd.date_range('2025-03-03', periods=10, freq='D')
+
+    assert seasonal_forecast(rollup_from({day.strftime('%Y-%m-%d'): (10, 9) for day in days})) == []
+
+def test_engine_flags_entities_whose_last_week_and_slope_agree():
+    weeks = pd.date_range('2025-03-03', periods=4, freq='7D').strftime('%Y-%m-%d')
+    entities = [(day, 'vehicle', 'ABC1234', 10, rate) for day, rate in zip(weeks, [10, 9, 8, 3])]
+    entities += [(day, 'driver', 'Ana', 10, rate) for day, rate in zip(weeks, [4, 5, 7, 10])]
+    entities += [(day, 'driver', 'Bruno', 10, 9) for day in weeks]
+    rollup = rollup_from({day: (30, 20) for day in weeks}, entities)
+
+    analysis = FleetTrendEngine().analyze(rollup)
+
+    assert analysis['declining']['name'].tolist() == ['ABC1234']
+    assert analysis['improving']['name'].tolist() == ['Ana']
+    record = entity_records(analysis['declining'])[0]
+    assert record['compliance_rate'] == 30.0 and record['slope'] < 0
+
+def test_seasonal_forecast_separates_trend_from_the_weekday_pattern():
+    days = pd.date_range('2025-03-03', periods=21, freq='D')
+    rate = {day: 50 + (day - days[0]).days * 0.5 - (10 if day.weekday() >= 5 else 0) for day in days}
+    rollup = rollup_from({day.strftime('%Y-%m-%d'): (200, int(value * 2)) for day, value in rate.items()
+                          if day.day not in (12, 19)})
+
+    forecast = seasonal_forecast(rollup, horizon=7)
+
+    expected = [50 + step * 0.5 - (10 if step % 7 >= 5 else 0) for step in range(21, 28)]
+    assert [item['value'] for item in forecast] == pytest.approx(expected, abs=0.01)
+    assert all(item['upper'] - item['lower'] < 0.1 for item in forecast)
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+import requests
+
+from src.fleet_users import FleetUserDirectory, enrich_frame, users_frame_to_names
+
+USERS = [
+    {'uid': 'u1', 'display_name': 'Ana'},
+    {'id': 'u2', 'display_name': 'Bruno'},
+    {'_doc_id': 'u3', 'display_name': 'N/A'},
+    {'uid': '', 'id': 'u4', 'display_name': 'Carla'},
+]
+
+@pytest.fixture
+def directory(make_connector, tmp_path):
+    return FleetUserDirectory(make_connector(max_retries=1), str(tmp_path / 'users.sqlite3'))
+
+def test_names_use_the_first_filled_id_and_skip_missing_names():
+    names = users_frame_to_names(pd.DataFrame(USERS))
+
+    assert dict(zip(names['user_id'], names['name'])) == {'u1': 'Ana', 'u2': 'Bruno', 'u4': 'Carla'}
+
+def test_lookup_loads_the_index_once(directory, upstream):
+    upstream.routes['/users'] = {'data': USERS}
+
+    assert directory.lookup('E1', ['u1', 'u9']) == {'u1': 'Ana'}
+    assert directory.lookup('E1', ['u2']) == {'u2': 'Bruno'}
+    assert upstream.count('/users') == 1
+
+def test_cold_users_failure_is_not_cached(directory, upstream):
+    upstream.routes['/users'] = requests.exceptions.ConnectionError('offline')
+
+    assert directory.lookup('E1', ['u1']) == {}
+    assert directory.state('E1')['refreshed_at'] is None
+
+    upstream.routes['/users'] = {'data': USERS}
+    assert directory.lookup('E1', ['u1']) == {'u1': 'Ana'}
+    assert directory.state('E1')['count'] == 3
+
+def test_empty_response_keeps_the_current_index(directory, upstream):
+    upstream.routes['/users'] = {'data': USERS}
+    directory.refresh('E1')
+
+    upstream.routes['/users'] = {'data': []}
+    assert directory.refresh('E1') == 3
+
+    assert directory.mapping('E1')['u2'] == 'Bruno'
+
+def test_refresh_applies_renames_and_removals(directory, upstream):
+    upstream.routes['/users'] = {'data': USERS}
+    directory.refresh('E1')
+
+    upstream.routes['/users'] = {'data': [{'uid': 'u1', 'display_name': 'Ana Maria'}]}
+    directory.refresh('E1')
+
+    assert directory.mapping('E1') == {'u1': 'Ana Maria'}
+
+def test_enrich_frame_matches_the_per_record_enrichment():
+    trips = pd.DataFrame({'UserString': ['u1', 'abcdefghijkl', None, ''], 'other': [1, 2, 3, 4]})
+
+    enriched = enrich_frame(trips, {'u1': 'Ana'}, fields=['UserString', 'driverId'])
+
+    assert enriched['UserString_name'].tolist() == ['Ana', 'Motorista abcdefgh...', 'N/A', 'N/A']
+    assert 'driverId_name' not in enriched.columns